@@ -1,7 +1,12 @@
 """Database configuration and session management."""
 
+import asyncio
+
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import StaticPool
+from sqlalchemy import event, inspect, text
+from sqlalchemy.sql import sqltypes
 from app.config.settings import get_settings
 
 settings = get_settings()
@@ -14,12 +19,33 @@ database_url = settings.database_url or "sqlite+aiosqlite:///./media_mind.db"
 # For cleaner logs, we'll suppress via logging instead
 # Configure SQLite for better async handling with longer timeout
 connect_args = {}
+engine_kwargs = {}
 if "sqlite" in database_url:
     # SQLite-specific configuration for async operations
     connect_args = {
         "timeout": 30.0,  # Increase timeout to 30 seconds
         "check_same_thread": False,  # Allow multi-threaded access
     }
+    # QueuePool sizing does not apply to SQLite; an in-memory database must
+    # share a single connection or every new connection sees an empty DB
+    if ":memory:" in database_url:
+        engine_kwargs["poolclass"] = StaticPool
+else:
+    # Size the pool so pool_size + max_overflow covers the expected number of
+    # concurrent requests; otherwise requests queue for up to pool_timeout
+    engine_kwargs = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+    }
+    if "asyncpg" in database_url:
+        # Reuse prepared statements for the repeated search/chunk lookups instead
+        # of re-parsing them: asyncpg's own cache plus SQLAlchemy's adapter cache
+        connect_args = {
+            "statement_cache_size": settings.db_statement_cache_size,
+            "prepared_statement_cache_size": settings.db_statement_cache_size,
+        }
 
 engine = create_async_engine(
     database_url,
@@ -27,8 +53,21 @@ engine = create_async_engine(
     future=True,
     connect_args=connect_args,
     pool_pre_ping=True,  # Verify connections before using
+    query_cache_size=settings.db_query_cache_size,  # Reuse compiled SQL for repeated statement shapes
+    **engine_kwargs,
 )
 
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Enable WAL so readers don't block the writer, and skip the per-commit fsync."""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        cursor.close()
+
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -51,8 +90,44 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+def _create_missing_indexes(connection):
+    """Create model indexes added after their table already existed (create_all skips them)."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def _convert_chunk_text_to_binary(connection):
+    """
+    Switch an existing document_chunks.text column from TEXT to bytea (PostgreSQL).
+    
+    Chunk text is now stored compressed as bytes; existing rows become plain UTF-8
+    bytes, which still read back correctly. SQLite stores either in place as-is.
+    """
+    if connection.dialect.name != "postgresql":
+        return
+    inspector = inspect(connection)
+    if not inspector.has_table("document_chunks"):
+        return
+    columns = {column["name"]: column["type"] for column in inspector.get_columns("document_chunks")}
+    if isinstance(columns.get("text"), sqltypes.String):
+        connection.execute(text(
+            "ALTER TABLE document_chunks ALTER COLUMN text TYPE bytea USING convert_to(text, 'UTF8')"
+        ))
+
+
 async def init_db():
     """Initialize database tables."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_create_missing_indexes)
+        await conn.run_sync(_convert_chunk_text_to_binary)
+
+
 
+async def warmup_pool(n: int):
+    """Open n pooled connections concurrently and return them to the pool idle."""
+    if n <= 0 or engine.dialect.name == "sqlite":
+        return
+    conns = await asyncio.gather(*[engine.connect() for _ in range(n)])
+    await asyncio.gather(*[conn.close() for conn in conns])
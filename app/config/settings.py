@@ -1,7 +1,7 @@
 """Application settings and configuration."""
 
-from functools import lru_cache
-from typing import List
+from functools import cached_property
+from typing import FrozenSet, List
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -23,6 +23,13 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str = ""  # Defaults to SQLite if empty
+    # Connection pool (PostgreSQL only); keep pool_size + max_overflow >= expected concurrent requests
+    db_pool_size: int = 20  # Persistent connections kept open in the pool
+    db_max_overflow: int = 30  # Extra connections allowed under burst load
+    db_pool_timeout: int = 30  # Seconds to wait for a free connection
+    db_pool_recycle: int = 1800  # Recycle connections older than this many seconds
+    db_statement_cache_size: int = 1024  # Prepared statements cached per connection (asyncpg only)
+    db_query_cache_size: int = 1200  # Compiled SQL statements cached per engine
     
     # AI/ML Services
     openai_api_key: str = ""
@@ -38,11 +45,21 @@ class Settings(BaseSettings):
     chunk_size: int = 1000  # Characters per chunk
     chunk_overlap: int = 200  # Character overlap between chunks
     chunking_strategy: str = "fixed"  # "fixed" or "sentence" or "paragraph"
+    pdf_extraction_workers: int = 0  # Processes for parallel PDF page extraction; 0 means CPU count
+    pdf_parallel_min_pages: int = 8  # PDFs with fewer pages are extracted in one thread instead
     
     # Vector Search
     faiss_index_path: str = "faiss_index"  # Path to store FAISS index
     search_top_k: int = 5  # Number of results to return in semantic search
     embedding_batch_size: int = 100  # Batch size for generating embeddings
+    embedding_concurrency: int = 4  # Embedding batches sent to the API at once
+    faiss_ivf_min_vectors: int = 10000  # Below this many vectors use an exact flat index
+    faiss_nlist: int = 0  # IVF clusters; 0 picks ~4*sqrt(N) at build time
+    faiss_ivf_encoding: str = "pq"  # IVF vector codes: "pq" (smallest) or "sq8" (int8 per dimension, higher recall)
+    faiss_pq_m: int = 64  # PQ sub-quantizers (8-bit codes); must divide the embedding dimension
+    faiss_nprobe: int = 16  # IVF clusters scanned per query (recall vs. speed)
+    faiss_omp_threads: int = 0  # OpenMP threads per FAISS call; 0 means min(4, CPU count)
+    faiss_mmap: bool = True  # Memory-map the saved index read-only so workers share it via the page cache
     
     # LLM / Q&A
     llm_model: str = "gpt-4o-mini"  # LLM model for Q&A
@@ -50,8 +67,17 @@ class Settings(BaseSettings):
     rag_context_chunks: int = 5  # Number of chunks to use as context for RAG
     rag_max_context_length: int = 4000  # Maximum context length in tokens
     
+    # Concurrency Limits
+    max_transcription_concurrency: int = 2  # Whisper runs allowed at once (GPU/RAM bound)
+    max_llm_concurrency: int = 4  # Q&A generations allowed at once
+    concurrency_queue_timeout: float = 60.0  # Seconds to wait for a slot before returning 503
+    
+    # Background Jobs
+    redis_url: str = ""  # e.g. redis://:password@redis:6379/0; runs jobs in-process if empty
+    
     # File Storage
     max_file_size_mb: int = 100
+    file_write_buffer_bytes: int = 8 * 1024 * 1024  # Write buffer for saved uploads; fewer, larger write syscalls
     allowed_file_types: List[str] = [
         "pdf", "txt", "docx", "pptx", "xlsx",
         "jpg", "jpeg", "png", "gif", "mp4", "mp3", "wav"
@@ -67,10 +93,18 @@ class Settings(BaseSettings):
         case_sensitive=False,
         extra="ignore"
     )
+    
+    @cached_property
+    def allowed_file_types_set(self) -> FrozenSet[str]:
+        """allowed_file_types as a frozenset of lowercase extensions, for O(1) membership checks."""
+        return frozenset(ext.lower().lstrip(".") for ext in self.allowed_file_types)
+
+
+# Settings are built once at import; get_settings() hands out the same instance
+settings: Settings = Settings()
 
 
-@lru_cache()
 def get_settings() -> Settings:
-    """Get cached settings instance."""
-    return Settings()
+    """Get the application settings instance."""
+    return settings
 
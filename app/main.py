@@ -1,22 +1,27 @@
 """Main FastAPI application entry point."""
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 
 from app.config.settings import get_settings
-from app.config.database import init_db
+from app.config.database import init_db, warmup_pool
+from app.services.task_queue import close_queue
+from app.services.openai_client import close_async_openai_client
+from app.services.pdf_service import shutdown_pdf_executor
+from app.utils.responses import ORJSONResponse
+from app.utils.middleware import SelectiveGZipMiddleware, UnhandledErrorMiddleware
+from app.utils.concurrency import ServiceBusyError
+from app.utils.errors import InvalidRequestError
 from app.routes import health, files, transcription, document_processing, vector_search, qa, summarization, timestamp_extraction, media_playback
 
 settings = get_settings()
 
 # Configure logging based on environment
 log_level = logging.DEBUG if settings.debug else logging.INFO
-logging.basicConfig(
-    level=log_level,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
 logger = logging.getLogger(__name__)
 
 # Reduce SQLAlchemy verbosity (only show warnings and errors, not INFO)
@@ -28,18 +33,49 @@ logging.getLogger("sqlalchemy.dialects").setLevel(logging.WARNING)
 logging.getLogger("aiosqlite").setLevel(logging.WARNING)
 
 
+def setup_logging() -> tuple[QueueHandler, QueueListener]:
+    """
+    Route root logging through a queue so handler IO runs on a background thread.
+    
+    Returns the installed queue handler and the started listener; stop the
+    listener on shutdown to flush pending records.
+    """
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    )
+    
+    log_queue = queue.Queue(-1)
+    root_logger = logging.getLogger()
+    root_logger.setLevel(log_level)
+    queue_handler = QueueHandler(log_queue)
+    root_logger.addHandler(queue_handler)
+    
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    return queue_handler, listener
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events."""
+    log_handler, log_listener = setup_logging()
     # Startup
     logger.info("Starting Media Mind AI Backend...")
     logger.info(f"Environment: {settings.environment}")
     # Initialize database
     await init_db()
     logger.info("Database initialized")
+    # Open pooled connections up front so the first requests skip connect latency
+    await warmup_pool(settings.db_pool_size)
     yield
     # Shutdown
     logger.info("Shutting down Media Mind AI Backend...")
+    await close_queue()
+    await close_async_openai_client()
+    shutdown_pdf_executor()
+    log_listener.stop()
+    logging.getLogger().removeHandler(log_handler)
 
 
 # Create FastAPI application
@@ -48,10 +84,23 @@ app = FastAPI(
     description="AI-powered document and multimedia Q&A system",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     docs_url="/docs" if settings.environment != "production" else None,
     redoc_url="/redoc" if settings.environment != "production" else None,
 )
 
+# Innermost, so 500 responses for unexpected errors still get CORS headers
+app.add_middleware(UnhandledErrorMiddleware)
+
+# Compress responses over 1 KB (chunk listings can be megabytes of text);
+# the streaming endpoints are excluded so each event reaches the client immediately
+app.add_middleware(
+    SelectiveGZipMiddleware,
+    minimum_size=1024,
+    compresslevel=5,
+    exclude_paths=("/api/v1/ask/stream", "/api/v1/search/stream")
+)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -61,6 +110,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.exception_handler(InvalidRequestError)
+async def invalid_request_handler(request: Request, exc: InvalidRequestError) -> ORJSONResponse:
+    """Map service-level request errors (bad input, missing prerequisites) to 400."""
+    return ORJSONResponse({"detail": str(exc)}, status_code=400)
+
+
+@app.exception_handler(ServiceBusyError)
+async def service_busy_handler(request: Request, exc: ServiceBusyError) -> ORJSONResponse:
+    """Shed load with 503 when a model-backed service has no free slot."""
+    return ORJSONResponse({"detail": str(exc)}, status_code=503, headers={"Retry-After": "5"})
+
+
 # Include routers
 app.include_router(health.router, prefix="/api/v1", tags=["Health"])
 app.include_router(files.router, prefix="/api/v1/files", tags=["Files"])
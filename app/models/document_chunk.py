@@ -1,22 +1,74 @@
 """Document chunk database model for PDF text extraction."""
 
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Integer as SQLInteger
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index, LargeBinary, insert, Integer as SQLInteger
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, backref
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 
 from app.config.database import Base
 
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Magic number at the start of every zstd frame; valid UTF-8 text never starts with it
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text column stored as zstd-compressed bytes; reads back as str.
+    
+    Values under COMPRESS_MIN_BYTES, values that don't shrink, and everything when
+    zstandard is not installed are stored as plain UTF-8 bytes; the zstd frame magic
+    tells the two apart on read. Rows written while the column was still TEXT come
+    back from the driver as str and pass through unchanged.
+    """
+    
+    impl = LargeBinary
+    cache_ok = True
+    
+    COMPRESS_MIN_BYTES = 128
+    COMPRESS_LEVEL = 3
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        data = value.encode("utf-8")
+        if ZSTD_AVAILABLE and len(data) >= self.COMPRESS_MIN_BYTES:
+            compressed = zstandard.compress(data, self.COMPRESS_LEVEL)
+            if len(compressed) < len(data):
+                return compressed
+        return data
+    
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, str):
+            return value
+        value = bytes(value)
+        if value.startswith(ZSTD_MAGIC):
+            if not ZSTD_AVAILABLE:
+                raise ImportError("zstandard not installed; cannot read compressed chunk text. Install with: pip install zstandard")
+            value = zstandard.decompress(value)
+        return value.decode("utf-8")
+
 
 class DocumentChunk(Base):
     """Document chunk model for storing extracted and chunked text from PDFs."""
     
     __tablename__ = "document_chunks"
+    __table_args__ = (
+        # Serves file_id lookups and ORDER BY chunk_index pagination without a sort
+        Index("ix_chunks_file_order", "file_id", "chunk_index"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    file_id = Column(Integer, ForeignKey("file_metadata.id"), nullable=False, index=True)
+    file_id = Column(Integer, ForeignKey("file_metadata.id"), nullable=False)
     chunk_index = Column(SQLInteger, nullable=False)  # Order of chunk in document
-    text = Column(Text, nullable=False)  # Chunk text content
+    text = Column(CompressedText, nullable=False)  # Chunk text content (zstd-compressed at rest)
     char_count = Column(SQLInteger, nullable=False)  # Character count
     token_count = Column(SQLInteger, nullable=True)  # Token count (for embeddings)
     page_number = Column(SQLInteger, nullable=True)  # Page number in PDF (if applicable)
@@ -26,8 +78,58 @@ class DocumentChunk(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     
-    # Relationship to file
-    file = relationship("FileMetadata", backref="chunks")
+    # Relationship to file (lazy="raise": load explicitly with selectinload when needed)
+    file = relationship("FileMetadata", backref=backref("chunks", lazy="raise"), lazy="raise")
+    
+    # Columns written by bulk_insert; created_at/updated_at come from server defaults
+    COPY_COLUMNS = (
+        "file_id", "chunk_index", "text", "char_count", "token_count",
+        "page_number", "start_char", "end_char", "chunk_metadata"
+    )
+    
+    @classmethod
+    async def bulk_insert(cls, session: AsyncSession, rows: list[dict]) -> None:
+        """
+        Insert chunk rows without loading them back.
+        
+        On PostgreSQL (asyncpg) the rows are streamed with COPY in the session's
+        transaction: one round trip and no per-row parse/plan. Other databases get a
+        single executemany INSERT.
+        """
+        if not rows:
+            return
+        connection = await session.connection()
+        if connection.dialect.driver == "asyncpg":
+            # COPY bypasses SQLAlchemy, so apply column bind processing (e.g. text compression) here
+            processors = [
+                cls.__table__.c[column].type.bind_processor(connection.dialect)
+                for column in cls.COPY_COLUMNS
+            ]
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(
+                cls.__tablename__,
+                records=[
+                    tuple(
+                        process(row.get(column)) if process else row.get(column)
+                        for column, process in zip(cls.COPY_COLUMNS, processors)
+                    )
+                    for row in rows
+                ],
+                columns=list(cls.COPY_COLUMNS)
+            )
+        else:
+            await session.execute(insert(cls), rows)
+    
+    @classmethod
+    async def bulk_create(cls, session: AsyncSession, rows: list[dict]) -> list["DocumentChunk"]:
+        """Insert chunk rows in a single multi-row INSERT ... RETURNING and return the persisted chunks."""
+        if not rows:
+            return []
+        result = await session.scalars(
+            insert(cls).returning(cls, sort_by_parameter_order=True),
+            rows
+        )
+        return list(result.all())
     
     def __repr__(self):
         return f"<DocumentChunk(id={self.id}, file_id={self.file_id}, chunk_index={self.chunk_index})>"
@@ -1,10 +1,12 @@
 """Embedding model for storing vector embeddings."""
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, LargeBinary, Float, insert
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, backref
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 import json
+import numpy as np
 
 from app.config.database import Base
 
@@ -17,22 +19,57 @@ class ChunkEmbedding(Base):
     id = Column(Integer, primary_key=True, index=True)
     chunk_id = Column(Integer, ForeignKey("document_chunks.id"), nullable=False, unique=True, index=True)
     embedding_model = Column(String, nullable=False)  # e.g., "text-embedding-ada-002"
-    embedding_vector = Column(Text, nullable=False)  # JSON array of floats
+    embedding_vector = Column(LargeBinary, nullable=False)  # Packed int8 bytes (float32 if scale is NULL)
+    scale = Column(Float, nullable=True)  # Per-vector int8 dequantization scale
     embedding_dimension = Column(Integer, nullable=False)  # Dimension of the embedding vector
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     
-    # Relationship to chunk
-    chunk = relationship("DocumentChunk", backref="embedding")
+    # Relationship to chunk (lazy="raise": load explicitly with selectinload when needed)
+    chunk = relationship("DocumentChunk", backref=backref("embedding", lazy="raise"), lazy="raise")
     
-    def get_embedding_vector(self) -> list[float]:
-        """Parse and return embedding vector as list of floats."""
-        return json.loads(self.embedding_vector)
+    def get_embedding_vector(self) -> np.ndarray:
+        """Return embedding vector as a float32 array, dequantizing int8 storage."""
+        return self.decode_embedding_vector(self.embedding_vector, self.scale)
     
-    def set_embedding_vector(self, vector: list[float]):
-        """Set embedding vector from list of floats."""
-        self.embedding_vector = json.dumps(vector)
-        self.embedding_dimension = len(vector)
+    @staticmethod
+    def decode_embedding_vector(raw, scale) -> np.ndarray:
+        """Decode stored column values (vector bytes and scale) to a float32 array."""
+        if isinstance(raw, str):
+            # Rows written before the binary format stored a JSON array
+            return np.asarray(json.loads(raw), dtype=np.float32)
+        if scale is None:
+            # Unquantized float32 rows
+            return np.frombuffer(raw, dtype=np.float32)
+        return np.frombuffer(raw, dtype=np.int8).astype(np.float32) * np.float32(scale)
+    
+    def set_embedding_vector(self, vector):
+        """Quantize a list or array of floats to int8 with a per-vector scale and store it."""
+        for key, value in self.pack_embedding_vector(vector).items():
+            setattr(self, key, value)
+    
+    @staticmethod
+    def pack_embedding_vector(vector) -> dict:
+        """Quantize a vector to int8 and return the column values (vector bytes, scale, dimension)."""
+        v = np.asarray(vector, dtype=np.float32)
+        max_abs = float(np.max(np.abs(v))) if v.size else 0.0
+        scale = max_abs / 127.0 if max_abs > 0 else 1.0
+        return {
+            "embedding_vector": np.round(v / scale).astype(np.int8).tobytes(),
+            "scale": scale,
+            "embedding_dimension": len(v),
+        }
+    
+    @classmethod
+    async def bulk_create(cls, session: AsyncSession, rows: list[dict]) -> list["ChunkEmbedding"]:
+        """Insert embedding rows in a single executemany and return the persisted embeddings."""
+        if not rows:
+            return []
+        result = await session.scalars(
+            insert(cls).returning(cls, sort_by_parameter_order=True),
+            rows
+        )
+        return list(result.all())
     
     def __repr__(self):
         return f"<ChunkEmbedding(id={self.id}, chunk_id={self.chunk_id}, model='{self.embedding_model}')>"
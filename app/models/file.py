@@ -1,6 +1,6 @@
 """File metadata database model."""
 
-from sqlalchemy import Column, Integer, String, DateTime, Float, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, DateTime, Float, Index, Enum as SQLEnum
 from sqlalchemy.sql import func
 from datetime import datetime
 import enum
@@ -26,7 +26,7 @@ class FileMetadata(Base):
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String, nullable=False, index=True)
     original_filename = Column(String, nullable=False)
-    file_type = Column(SQLEnum(FileType), nullable=False, index=True)
+    file_type = Column(SQLEnum(FileType), nullable=False)
     file_path = Column(String, nullable=False, unique=True)
     file_size = Column(Integer, nullable=False)  # Size in bytes
     file_size_mb = Column(Float, nullable=False)  # Size in MB
@@ -35,6 +35,13 @@ class FileMetadata(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     
+    __table_args__ = (
+        # Newest-first listing, with and without a file_type filter, read in
+        # index order so LIMIT/OFFSET pages need no sort
+        Index("ix_file_type_upload_time", "file_type", upload_time.desc()),
+        Index("ix_file_upload_time", upload_time.desc()),
+    )
+    
     def __repr__(self):
         return f"<FileMetadata(id={self.id}, filename='{self.filename}', type='{self.file_type}')>"
 
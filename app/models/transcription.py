@@ -2,7 +2,7 @@
 
 from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON, Float
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, backref
 from datetime import datetime
 
 from app.config.database import Base
@@ -12,6 +12,9 @@ class Transcription(Base):
     """Transcription database model."""
     
     __tablename__ = "transcriptions"
+    # Fetch created_at/updated_at via RETURNING in the INSERT/UPDATE itself, so
+    # callers never need a follow-up refresh() SELECT to read them
+    __mapper_args__ = {"eager_defaults": True}
     
     id = Column(Integer, primary_key=True, index=True)
     file_id = Column(Integer, ForeignKey("file_metadata.id"), nullable=False, index=True)
@@ -24,8 +27,8 @@ class Transcription(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     
-    # Relationship to file
-    file = relationship("FileMetadata", backref="transcriptions")
+    # Relationship to file (lazy="raise": load explicitly with selectinload when needed)
+    file = relationship("FileMetadata", backref=backref("transcriptions", lazy="raise"), lazy="raise")
     
     def __repr__(self):
         return f"<Transcription(id={self.id}, file_id={self.file_id}, status='{self.status}')>"
@@ -1,17 +1,19 @@
 """Document processing endpoints for PDF text extraction and chunking."""
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
 from app.config.database import get_db
-from app.services.pdf_service import PDFService
+from app.services.pdf_service import PDFService, PDF_PROGRESS_CHANNEL
 from app.services.file_service import FileService
+from app.services import task_queue
 from app.schemas.document_chunk import (
     DocumentChunkResponse,
     DocumentChunkListResponse,
     ProcessPDFRequest,
-    ProcessPDFResponse
+    ProcessPDFResponse,
+    ProcessPDFJobResponse
 )
 from app.models.file import FileType
 
@@ -48,7 +50,7 @@ async def process_pdf(
         )
     
     try:
-        chunks = await PDFService.process_pdf(
+        stats = await PDFService.process_pdf(
             file_metadata,
             db,
             chunk_size=request.chunk_size,
@@ -56,15 +58,11 @@ async def process_pdf(
             strategy=request.strategy
         )
         
-        # Calculate statistics
-        total_chars = sum(chunk.char_count for chunk in chunks)
-        total_tokens = sum(chunk.token_count for chunk in chunks if chunk.token_count)
-        
         return ProcessPDFResponse(
             file_id=file_id,
-            chunks_created=len(chunks),
-            total_characters=total_chars,
-            total_tokens=total_tokens if total_tokens else None,
+            chunks_created=stats["chunks_created"],
+            total_characters=stats["total_characters"],
+            total_tokens=stats["total_tokens"] or None,
             message="PDF processed successfully"
         )
     except ValueError as e:
@@ -75,6 +73,57 @@ async def process_pdf(
         raise HTTPException(status_code=500, detail=f"PDF processing failed: {str(e)}")
 
 
+@router.post("/files/{file_id}/process/async", response_model=ProcessPDFJobResponse, status_code=202)
+async def process_pdf_async(
+    file_id: int,
+    request: ProcessPDFRequest,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Start PDF text extraction and chunking in the background (asynchronous).
+    
+    - **file_id**: ID of the uploaded PDF file
+    - **chunk_size**: Optional characters per chunk (defaults to settings)
+    - **chunk_overlap**: Optional character overlap (defaults to settings)
+    - **strategy**: Optional chunking strategy: 'fixed', 'sentence', or 'paragraph'
+    
+    Returns immediately. With a worker queue configured, progress is published on
+    the returned Redis channel; chunks are available from the chunks endpoint once done.
+    """
+    file_metadata = await FileService.get_file_by_id(file_id, db)
+    
+    if not file_metadata:
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    if file_metadata.file_type != FileType.PDF:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File type '{file_metadata.file_type}' is not supported. Only PDF files can be processed."
+        )
+    
+    # Hand off to the worker queue if configured; otherwise run in-process,
+    # passing the already-loaded (and validated) file metadata through
+    if not await task_queue.enqueue(
+        "process_pdf_job", file_id, request.chunk_size, request.chunk_overlap, request.strategy
+    ):
+        background_tasks.add_task(
+            PDFService.run_processing_job,
+            file_id,
+            request.chunk_size,
+            request.chunk_overlap,
+            request.strategy,
+            file_metadata
+        )
+    
+    return ProcessPDFJobResponse(
+        file_id=file_id,
+        status="queued",
+        progress_channel=PDF_PROGRESS_CHANNEL.format(file_id),
+        message="PDF processing started"
+    )
+
+
 @router.get("/files/{file_id}/chunks", response_model=DocumentChunkListResponse)
 async def get_file_chunks(
     file_id: int,
@@ -94,28 +143,14 @@ async def get_file_chunks(
     if not file_metadata:
         raise HTTPException(status_code=404, detail="File not found")
     
-    chunks = await PDFService.get_chunks_by_file_id(file_id, db, limit=limit, offset=offset)
-    
     # Get total count
-    all_chunks = await PDFService.get_chunks_by_file_id(file_id, db)
-    total = len(all_chunks)
+    total = await PDFService.count_chunks_by_file_id(file_id, db)
     
+    # Stream rows in batches so only the response models are held in memory
     return DocumentChunkListResponse(
         chunks=[
-            DocumentChunkResponse(
-                id=chunk.id,
-                file_id=chunk.file_id,
-                chunk_index=chunk.chunk_index,
-                text=chunk.text,
-                char_count=chunk.char_count,
-                token_count=chunk.token_count,
-                page_number=chunk.page_number,
-                start_char=chunk.start_char,
-                end_char=chunk.end_char,
-                chunk_metadata=chunk.chunk_metadata,
-                created_at=chunk.created_at
-            )
-            for chunk in chunks
+            DocumentChunkResponse.model_validate(chunk)
+            async for chunk in PDFService.stream_chunks_by_file_id(file_id, db, limit=limit, offset=offset)
         ],
         total=total,
         file_id=file_id
@@ -137,19 +172,7 @@ async def get_chunk(
     if not chunk:
         raise HTTPException(status_code=404, detail="Chunk not found")
     
-    return DocumentChunkResponse(
-        id=chunk.id,
-        file_id=chunk.file_id,
-        chunk_index=chunk.chunk_index,
-        text=chunk.text,
-        char_count=chunk.char_count,
-        token_count=chunk.token_count,
-        page_number=chunk.page_number,
-        start_char=chunk.start_char,
-        end_char=chunk.end_char,
-        metadata=chunk.metadata,
-        created_at=chunk.created_at
-    )
+    return DocumentChunkResponse.model_validate(chunk)
 
 
 @router.delete("/files/{file_id}/chunks", status_code=204)
@@ -1,5 +1,6 @@
 """File upload and management endpoints."""
 
+import asyncio
 import logging
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query
 from fastapi.responses import FileResponse
@@ -9,6 +10,7 @@ from pathlib import Path
 
 from app.config.database import get_db
 from app.services.file_service import FileService
+from app.services.media_playback_service import MediaPlaybackService
 from app.schemas.file import FileUploadResponse, FileListResponse, FileListPaginated
 from app.models.file import FileType
 
@@ -18,8 +20,7 @@ router = APIRouter()
 
 @router.post("/upload", response_model=FileUploadResponse, status_code=201)
 async def upload_file(
-    file: UploadFile = File(...),
-    db: AsyncSession = Depends(get_db)
+    file: UploadFile = File(...)
 ):
     """
     Upload a file (PDF, audio, or video).
@@ -28,7 +29,7 @@ async def upload_file(
     - Returns file metadata including ID, filename, type, and size
     """
     try:
-        file_metadata = await FileService.save_file(file, db)
+        file_metadata = await FileService.save_file(file)
         
         return FileUploadResponse(
             id=file_metadata.id,
@@ -53,8 +54,7 @@ async def upload_file(
 
 @router.post("/upload/multiple", response_model=List[FileUploadResponse], status_code=201)
 async def upload_multiple_files(
-    files: List[UploadFile] = File(...),
-    db: AsyncSession = Depends(get_db)
+    files: List[UploadFile] = File(...)
 ):
     """
     Upload multiple files at once.
@@ -62,25 +62,37 @@ async def upload_multiple_files(
     - **files**: List of files to upload
     - Returns list of file metadata for each uploaded file
     """
+    # Save files concurrently; their metadata rows are batched by the service's
+    # writer, but the disk copies still need a bound so a large batch can't
+    # exhaust file descriptors or the thread pool
+    semaphore = asyncio.Semaphore(8)
+    
+    async def save_one(upload: UploadFile):
+        async with semaphore:
+            try:
+                return await FileService.save_file(upload), None
+            except Exception as e:
+                return None, f"{upload.filename}: {str(e)}"
+    
+    results = await asyncio.gather(*(save_one(f) for f in files))
+    
     uploaded_files = []
     errors = []
-    
-    for file in files:
-        try:
-            file_metadata = await FileService.save_file(file, db)
-            uploaded_files.append(FileUploadResponse(
-                id=file_metadata.id,
-                filename=file_metadata.filename,
-                original_filename=file_metadata.original_filename,
-                file_type=file_metadata.file_type,
-                file_size=file_metadata.file_size,
-                file_size_mb=file_metadata.file_size_mb,
-                mime_type=file_metadata.mime_type,
-                upload_time=file_metadata.upload_time,
-                message="File uploaded successfully"
-            ))
-        except Exception as e:
-            errors.append(f"{file.filename}: {str(e)}")
+    for file_metadata, error in results:
+        if error:
+            errors.append(error)
+            continue
+        uploaded_files.append(FileUploadResponse(
+            id=file_metadata.id,
+            filename=file_metadata.filename,
+            original_filename=file_metadata.original_filename,
+            file_type=file_metadata.file_type,
+            file_size=file_metadata.file_size,
+            file_size_mb=file_metadata.file_size_mb,
+            mime_type=file_metadata.mime_type,
+            upload_time=file_metadata.upload_time,
+            message="File uploaded successfully"
+        ))
     
     if errors and not uploaded_files:
         raise HTTPException(
@@ -110,16 +122,7 @@ async def list_files(
     total_pages = (total + page_size - 1) // page_size if total > 0 else 0
     
     return FileListPaginated(
-        files=[FileListResponse(
-            id=f.id,
-            filename=f.filename,
-            original_filename=f.original_filename,
-            file_type=f.file_type,
-            file_size=f.file_size,
-            file_size_mb=f.file_size_mb,
-            mime_type=f.mime_type,
-            upload_time=f.upload_time
-        ) for f in files],
+        files=[FileListResponse.model_validate(f) for f in files],
         total=total,
         page=page,
         page_size=page_size,
@@ -142,16 +145,7 @@ async def get_file_metadata(
     if not file_metadata:
         raise HTTPException(status_code=404, detail="File not found")
     
-    return FileListResponse(
-        id=file_metadata.id,
-        filename=file_metadata.filename,
-        original_filename=file_metadata.original_filename,
-        file_type=file_metadata.file_type,
-        file_size=file_metadata.file_size,
-        file_size_mb=file_metadata.file_size_mb,
-        mime_type=file_metadata.mime_type,
-        upload_time=file_metadata.upload_time
-    )
+    return FileListResponse.model_validate(file_metadata)
 
 
 @router.get("/{file_id}/download")
@@ -196,5 +190,7 @@ async def delete_file(
     if not success:
         raise HTTPException(status_code=404, detail="File not found")
     
+    MediaPlaybackService.invalidate_cache(file_id)
+    
     return None
 
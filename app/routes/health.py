@@ -1,17 +1,16 @@
 """Health check endpoints."""
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from datetime import datetime, UTC
 from typing import Dict, Any
 
-from app.config.settings import get_settings
+from app.config.settings import Settings, get_settings
 
 router = APIRouter()
-settings = get_settings()
 
 
 @router.get("/health", response_model=Dict[str, Any])
-async def health_check() -> Dict[str, Any]:
+async def health_check(settings: Settings = Depends(get_settings)) -> Dict[str, Any]:
     """
     Health check endpoint.
     
@@ -19,7 +18,7 @@ async def health_check() -> Dict[str, Any]:
     """
     return {
         "status": "healthy",
-        "timestamp": datetime.now(UTC).isoformat(),
+        "timestamp": datetime.now(UTC),
         "service": settings.app_name,
         "version": "1.0.0",
         "environment": settings.environment
@@ -27,7 +26,7 @@ async def health_check() -> Dict[str, Any]:
 
 
 @router.get("/health/ready")
-async def readiness_check() -> Dict[str, str]:
+async def readiness_check() -> Dict[str, Any]:
     """
     Readiness check endpoint.
     
@@ -41,7 +40,7 @@ async def readiness_check() -> Dict[str, str]:
 
 
 @router.get("/health/live")
-async def liveness_check() -> Dict[str, str]:
+async def liveness_check() -> Dict[str, Any]:
     """
     Liveness check endpoint.
     
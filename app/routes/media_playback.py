@@ -1,19 +1,51 @@
 """Media playback endpoints."""
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Path
+from fastapi import APIRouter, Depends, Query, Path, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
 from app.config.database import get_db
 from app.services.media_playback_service import MediaPlaybackService
 from app.schemas.media_playback import PlaybackInfoResponse, PlaybackRequest
+from app.utils.etag import content_etag, etag_matches, not_modified
+from app.utils.responses import ORJSONResponse
 
 router = APIRouter()
 
+PLAYBACK_CACHE_CONTROL = "private, max-age=5"
+
+
+async def _playback_response(
+    file_id: int,
+    timestamp: Optional[float],
+    request: Request,
+    db: AsyncSession
+):
+    """
+    Build playback info, answering conditional GETs with 304 when the ETag is current.
+    
+    The service dict already has exactly the PlaybackInfoResponse fields, so it is
+    serialized directly with orjson; response_model is kept for the OpenAPI schema.
+    """
+    result = await MediaPlaybackService.get_playback_info(
+        file_id=file_id,
+        db=db,
+        timestamp=timestamp
+    )
+    
+    if request.method != "GET":
+        return ORJSONResponse(result)
+    
+    etag = content_etag(result)
+    if etag_matches(request, etag):
+        return not_modified(etag, PLAYBACK_CACHE_CONTROL)
+    return ORJSONResponse(result, headers={"ETag": etag, "Cache-Control": PLAYBACK_CACHE_CONTROL})
+
 
 @router.get("/files/{file_id}/playback", response_model=PlaybackInfoResponse)
 async def get_media_playback_info(
     file_id: int,
+    request: Request,
     timestamp: Optional[float] = Query(None, ge=0, description="Start timestamp in seconds"),
     db: AsyncSession = Depends(get_db)
 ):
@@ -25,33 +57,14 @@ async def get_media_playback_info(
     
     Returns file URL and timestamp for frontend media player integration.
     """
-    try:
-        result = await MediaPlaybackService.get_playback_info(
-            file_id=file_id,
-            db=db,
-            timestamp=timestamp
-        )
-        
-        return PlaybackInfoResponse(
-            file_id=result["file_id"],
-            file_name=result["file_name"],
-            file_type=result["file_type"],
-            file_url=result["file_url"],
-            timestamp=result["timestamp"],
-            formatted_timestamp=result["formatted_timestamp"],
-            mime_type=result.get("mime_type"),
-            file_size_mb=result["file_size_mb"]
-        )
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get playback info: {str(e)}")
+    return await _playback_response(file_id, timestamp, request, db)
 
 
 @router.post("/files/{file_id}/playback", response_model=PlaybackInfoResponse)
 async def get_media_playback_info_post(
     file_id: int,
-    request: PlaybackRequest,
+    request: Request,
+    body: PlaybackRequest,
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -62,32 +75,13 @@ async def get_media_playback_info_post(
     
     Returns file URL and timestamp for frontend media player integration.
     """
-    try:
-        result = await MediaPlaybackService.get_playback_info(
-            file_id=file_id,
-            timestamp=request.timestamp,
-            db=db
-        )
-        
-        return PlaybackInfoResponse(
-            file_id=result["file_id"],
-            file_name=result["file_name"],
-            file_type=result["file_type"],
-            file_url=result["file_url"],
-            timestamp=result["timestamp"],
-            formatted_timestamp=result["formatted_timestamp"],
-            mime_type=result.get("mime_type"),
-            file_size_mb=result["file_size_mb"]
-        )
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get playback info: {str(e)}")
+    return await _playback_response(file_id, body.timestamp, request, db)
 
 
 @router.get("/files/{file_id}/playback/from-timestamp/{start_time}", response_model=PlaybackInfoResponse)
 async def get_media_playback_from_timestamp(
     file_id: int,
+    request: Request,
     start_time: float = Path(..., ge=0, description="Start timestamp in seconds"),
     db: AsyncSession = Depends(get_db)
 ):
@@ -99,25 +93,4 @@ async def get_media_playback_from_timestamp(
     
     Convenient endpoint for starting playback from a specific time.
     """
-    try:
-        result = await MediaPlaybackService.get_playback_info_from_timestamp(
-            file_id=file_id,
-            db=db,
-            start_time=start_time
-        )
-        
-        return PlaybackInfoResponse(
-            file_id=result["file_id"],
-            file_name=result["file_name"],
-            file_type=result["file_type"],
-            file_url=result["file_url"],
-            timestamp=result["timestamp"],
-            formatted_timestamp=result["formatted_timestamp"],
-            mime_type=result.get("mime_type"),
-            file_size_mb=result["file_size_mb"]
-        )
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get playback info: {str(e)}")
-
+    return await _playback_response(file_id, start_time, request, db)
@@ -1,16 +1,20 @@
 """Q&A chatbot endpoints using RAG."""
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-import json
+import orjson
 
 from app.config.database import get_db
 from app.services.rag_service import RAGService
-from app.schemas.qa import QuestionRequest, AnswerResponse, SourceInfo, TimestampInfo
+from app.schemas.qa import QuestionRequest, AnswerResponse
 
 router = APIRouter()
 
+# Server-sent event framing, pre-encoded so each event is a single bytes concat
+SSE_PREFIX = b"data: "
+SSE_SUFFIX = b"\n\n"
+
 
 @router.post("/ask", response_model=AnswerResponse)
 async def ask_question(
@@ -28,75 +32,17 @@ async def ask_question(
     
     Returns an answer based only on the uploaded document content.
     """
-    if not request.question or not request.question.strip():
-        raise HTTPException(status_code=400, detail="Question cannot be empty")
+    result = await RAGService.answer_question(
+        question=request.question,
+        db=db,
+        top_k=request.top_k,
+        file_id=request.file_id,
+        model=request.model,
+        temperature=request.temperature
+    )
     
-    try:
-        result = await RAGService.answer_question(
-            question=request.question,
-            db=db,
-            top_k=request.top_k,
-            file_id=request.file_id,
-            model=request.model,
-            temperature=request.temperature
-        )
-        
-        # Convert timestamps if present
-        timestamps = None
-        if result.get("timestamps"):
-            timestamps = [
-                TimestampInfo(
-                    start=ts["start"],
-                    end=ts["end"],
-                    text=ts["text"],
-                    duration=ts["duration"],
-                    formatted_start=ts["formatted_start"],
-                    formatted_end=ts["formatted_end"]
-                )
-                for ts in result["timestamps"]
-            ]
-        
-        # Convert sources with timestamps
-        sources_list = []
-        for s in result["sources"]:
-            source_timestamps = None
-            if s.get("timestamps"):
-                source_timestamps = [
-                    TimestampInfo(
-                        start=ts["start"],
-                        end=ts["end"],
-                        text=ts["text"],
-                        duration=ts["duration"],
-                        formatted_start=ts["formatted_start"],
-                        formatted_end=ts["formatted_end"]
-                    )
-                    for ts in s["timestamps"]
-                ]
-            
-            sources_list.append(
-                SourceInfo(
-                    chunk_id=s["chunk_id"],
-                    file_id=s["file_id"],
-                    chunk_index=s["chunk_index"],
-                    text_preview=s["text_preview"],
-                    score=s["score"],
-                    page_number=s.get("page_number"),
-                    timestamps=source_timestamps
-                )
-            )
-        
-        return AnswerResponse(
-            answer=result["answer"],
-            sources=sources_list,
-            confidence=result["confidence"],
-            chunks_used=result["chunks_used"],
-            model=result["model"],
-            timestamps=timestamps
-        )
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to answer question: {str(e)}")
+    # Service keys mirror the response schema; validate nested sources in one pass
+    return AnswerResponse.model_validate(result)
 
 
 @router.post("/ask/stream")
@@ -109,9 +55,6 @@ async def ask_question_streaming(
     
     Returns a streaming response with answer chunks and sources.
     """
-    if not request.question or not request.question.strip():
-        raise HTTPException(status_code=400, detail="Question cannot be empty")
-    
     async def generate_stream():
         try:
             async for chunk in RAGService.answer_question_with_streaming(
@@ -122,13 +65,13 @@ async def ask_question_streaming(
                 model=request.model,
                 temperature=request.temperature
             ):
-                yield f"data: {json.dumps(chunk)}\n\n"
+                yield SSE_PREFIX + orjson.dumps(chunk) + SSE_SUFFIX
         except Exception as e:
             error_chunk = {
                 "type": "error",
                 "content": str(e)
             }
-            yield f"data: {json.dumps(error_chunk)}\n\n"
+            yield SSE_PREFIX + orjson.dumps(error_chunk) + SSE_SUFFIX
     
     return StreamingResponse(
         generate_stream(),
@@ -158,73 +101,15 @@ async def ask_question_about_file(
     
     Returns an answer based only on the specified file's content.
     """
-    if not request.question or not request.question.strip():
-        raise HTTPException(status_code=400, detail="Question cannot be empty")
+    result = await RAGService.answer_question(
+        question=request.question,
+        db=db,
+        top_k=request.top_k,
+        file_id=file_id,  # Override with path parameter
+        model=request.model,
+        temperature=request.temperature
+    )
     
-    try:
-        result = await RAGService.answer_question(
-            question=request.question,
-            db=db,
-            top_k=request.top_k,
-            file_id=file_id,  # Override with path parameter
-            model=request.model,
-            temperature=request.temperature
-        )
-        
-        # Convert timestamps if present
-        timestamps = None
-        if result.get("timestamps"):
-            timestamps = [
-                TimestampInfo(
-                    start=ts["start"],
-                    end=ts["end"],
-                    text=ts["text"],
-                    duration=ts["duration"],
-                    formatted_start=ts["formatted_start"],
-                    formatted_end=ts["formatted_end"]
-                )
-                for ts in result["timestamps"]
-            ]
-        
-        # Convert sources with timestamps
-        sources_list = []
-        for s in result["sources"]:
-            source_timestamps = None
-            if s.get("timestamps"):
-                source_timestamps = [
-                    TimestampInfo(
-                        start=ts["start"],
-                        end=ts["end"],
-                        text=ts["text"],
-                        duration=ts["duration"],
-                        formatted_start=ts["formatted_start"],
-                        formatted_end=ts["formatted_end"]
-                    )
-                    for ts in s["timestamps"]
-                ]
-            
-            sources_list.append(
-                SourceInfo(
-                    chunk_id=s["chunk_id"],
-                    file_id=s["file_id"],
-                    chunk_index=s["chunk_index"],
-                    text_preview=s["text_preview"],
-                    score=s["score"],
-                    page_number=s.get("page_number"),
-                    timestamps=source_timestamps
-                )
-            )
-        
-        return AnswerResponse(
-            answer=result["answer"],
-            sources=sources_list,
-            confidence=result["confidence"],
-            chunks_used=result["chunks_used"],
-            model=result["model"],
-            timestamps=timestamps
-        )
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to answer question: {str(e)}")
+    # Service keys mirror the response schema; validate nested sources in one pass
+    return AnswerResponse.model_validate(result)
 
@@ -1,6 +1,6 @@
 """Summarization endpoints."""
 
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, Body
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
@@ -37,29 +37,24 @@ async def summarize_file(
     if request is None:
         request = SummarizeRequest()
     
-    try:
-        result = await SummarizationService.summarize_file(
-            file_id=file_id,
-            db=db,
-            model=request.model,
-            temperature=request.temperature,
-            max_length=request.max_length
-        )
-        
-        return SummaryResponse(
-            file_id=result["file_id"],
-            file_name=result["file_name"],
-            file_type=result["file_type"],
-            content_type=result["content_type"],
-            summary=result["summary"],
-            model=result["model"],
-            content_length=result["content_length"],
-            summary_length=result["summary_length"]
-        )
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Summarization failed: {str(e)}")
+    result = await SummarizationService.summarize_file(
+        file_id=file_id,
+        db=db,
+        model=request.model,
+        temperature=request.temperature,
+        max_length=request.max_length
+    )
+    
+    return SummaryResponse(
+        file_id=result["file_id"],
+        file_name=result["file_name"],
+        file_type=result["file_type"],
+        content_type=result["content_type"],
+        summary=result["summary"],
+        model=result["model"],
+        content_length=result["content_length"],
+        summary_length=result["summary_length"]
+    )
 
 
 @router.post("/files/{file_id}/summarize/custom", response_model=SummaryResponse)
@@ -78,31 +73,23 @@ async def summarize_file_custom(
     
     Allows for custom summarization styles (bullet points, structured format, etc.).
     """
-    if not request.custom_prompt or not request.custom_prompt.strip():
-        raise HTTPException(status_code=400, detail="custom_prompt is required")
+    result = await SummarizationService.summarize_with_custom_prompt(
+        file_id=file_id,
+        custom_prompt=request.custom_prompt,
+        db=db,
+        model=request.model,
+        temperature=request.temperature
+    )
     
-    try:
-        result = await SummarizationService.summarize_with_custom_prompt(
-            file_id=file_id,
-            custom_prompt=request.custom_prompt,
-            db=db,
-            model=request.model,
-            temperature=request.temperature
-        )
-        
-        return SummaryResponse(
-            file_id=result["file_id"],
-            file_name=result["file_name"],
-            file_type=result["file_type"],
-            content_type=result["content_type"],
-            summary=result["summary"],
-            model=result["model"],
-            content_length=result["content_length"],
-            summary_length=result["summary_length"],
-            custom_prompt=result.get("custom_prompt")
-        )
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Custom summarization failed: {str(e)}")
+    return SummaryResponse(
+        file_id=result["file_id"],
+        file_name=result["file_name"],
+        file_type=result["file_type"],
+        content_type=result["content_type"],
+        summary=result["summary"],
+        model=result["model"],
+        content_length=result["content_length"],
+        summary_length=result["summary_length"],
+        custom_prompt=result.get("custom_prompt")
+    )
 
@@ -1,23 +1,40 @@
 """Timestamp extraction endpoints."""
 
+from dataclasses import dataclass
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict, StringConstraints
+from typing import List, Optional, Annotated
 
 from app.config.database import get_db
 from app.services.timestamp_service import TimestampService
 from app.schemas.qa import TimestampInfo
+from app.utils.responses import ORJSONResponse
 
 router = APIRouter()
 
 
+@dataclass(slots=True)
+class TimestampRow:
+    """Plain timestamp row with the TimestampInfo fields; serialized natively by orjson."""
+    
+    start: float
+    end: float
+    text: str
+    duration: float
+    formatted_start: str
+    formatted_end: str
+
+
 class ExtractTimestampsRequest(BaseModel):
     """Request schema for timestamp extraction."""
     
-    text: str = Field(..., description="Text to find timestamps for")
+    text: Annotated[str, StringConstraints(min_length=1, strip_whitespace=True)] = Field(
+        ..., description="Text to find timestamps for"
+    )
     
     model_config = ConfigDict(
+        frozen=True,
         json_schema_extra={
             "example": {
                 "text": "This is the text to find in the transcript"
@@ -35,6 +52,7 @@ class ExtractTimestampsResponse(BaseModel):
     total_segments: int
     
     model_config = ConfigDict(
+        frozen=True,
         json_schema_extra={
             "example": {
                 "file_id": 1,
@@ -68,40 +86,33 @@ async def extract_timestamps(
     - **text**: Text to find timestamps for
     
     Returns timestamps where the text appears in the transcript.
+    Empty or whitespace-only text is rejected by request validation (422).
     """
-    if not request.text or not request.text.strip():
-        raise HTTPException(status_code=400, detail="Text cannot be empty")
+    timestamps = await TimestampService.extract_timestamps_for_text(
+        file_id=file_id,
+        text=request.text,
+        db=db
+    )
     
-    try:
-        timestamps = await TimestampService.extract_timestamps_for_text(
-            file_id=file_id,
-            text=request.text,
-            db=db
+    # Format timestamps; rows skip Pydantic since orjson encodes dataclasses directly
+    rows = [
+        TimestampRow(
+            start=ts["start"],
+            end=ts["end"],
+            text=ts["text"],
+            duration=ts["duration"],
+            formatted_start=TimestampService.format_timestamp(ts["start"]),
+            formatted_end=TimestampService.format_timestamp(ts["end"])
         )
-        
-        # Format timestamps
-        formatted_timestamps = [
-            TimestampInfo(
-                start=ts["start"],
-                end=ts["end"],
-                text=ts["text"],
-                duration=ts["duration"],
-                formatted_start=TimestampService.format_timestamp(ts["start"]),
-                formatted_end=TimestampService.format_timestamp(ts["end"])
-            )
-            for ts in timestamps
-        ]
-        
-        return ExtractTimestampsResponse(
-            file_id=file_id,
-            text=request.text,
-            timestamps=formatted_timestamps,
-            total_segments=len(formatted_timestamps)
-        )
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Timestamp extraction failed: {str(e)}")
+        for ts in timestamps
+    ]
+    
+    return ORJSONResponse({
+        "file_id": file_id,
+        "text": request.text,
+        "timestamps": rows,
+        "total_segments": len(rows)
+    })
 
 
 @router.get("/files/{file_id}/timestamps/answer/{answer_id}", response_model=ExtractTimestampsResponse)
@@ -1,21 +1,42 @@
 """Transcription endpoints."""
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Body
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Body, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
 from app.config.database import get_db
 from app.services.transcription_service import TranscriptionService
 from app.services.file_service import FileService
+from app.services import task_queue
+from app.models.file import FileType
 from app.models.transcription import Transcription
 from app.schemas.transcription import (
     TranscriptionResponse,
     TranscriptionRequest,
     TranscriptionStatusResponse
 )
+from app.utils.etag import weak_etag, etag_matches, not_modified
 
 router = APIRouter()
 
+# File types that carry an audio track Whisper can transcribe
+_TRANSCRIBABLE = frozenset((FileType.AUDIO, FileType.VIDEO))
+
+
+def _transcription_etag(transcription: Transcription) -> str:
+    """Weak ETag that changes whenever the transcription row is updated."""
+    version = transcription.updated_at or transcription.created_at
+    return weak_etag(
+        transcription.id,
+        transcription.status,
+        int(version.timestamp() * 1000) if version else 0
+    )
+
+
+def _transcription_cache_control(transcription: Transcription) -> str:
+    """Completed transcriptions can be briefly cached; in-progress ones must revalidate."""
+    return "private, max-age=5" if transcription.status == "completed" else "private, no-cache"
+
 
 @router.post("/files/{file_id}/transcribe", response_model=TranscriptionResponse, status_code=201)
 async def transcribe_file(
@@ -36,44 +57,40 @@ async def transcribe_file(
     if request is None:
         request = TranscriptionRequest()
     
-    # Get file metadata
-    file_metadata = await FileService.get_file_by_id(file_id, db)
+    # Get file metadata and any existing transcription in one round-trip
+    file_metadata, transcription = await FileService.get_file_with_transcription(file_id, db)
     
     if not file_metadata:
         raise HTTPException(status_code=404, detail="File not found")
     
     # Check if file is audio or video
-    from app.models.file import FileType
-    if file_metadata.file_type not in [FileType.AUDIO, FileType.VIDEO]:
+    if file_metadata.file_type not in _TRANSCRIBABLE:
         raise HTTPException(
             status_code=400,
             detail=f"File type '{file_metadata.file_type}' is not supported for transcription. Only audio and video files are supported."
         )
     
-    try:
+    # Completed transcriptions are returned as-is; only run the service otherwise
+    if transcription is None or transcription.status != "completed":
         transcription = await TranscriptionService.transcribe_file(
             file_metadata,
             db,
             language=request.language if request else None,
             task=request.task if request else "transcribe"
         )
-        
-        return TranscriptionResponse(
-            id=transcription.id,
-            file_id=transcription.file_id,
-            full_text=transcription.full_text,
-            language=transcription.language,
-            duration=transcription.duration,
-            segments=transcription.segments,
-            status=transcription.status,
-            error_message=transcription.error_message,
-            created_at=transcription.created_at,
-            updated_at=transcription.updated_at
-        )
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
+    
+    return TranscriptionResponse.model_construct(
+        id=transcription.id,
+        file_id=transcription.file_id,
+        full_text=transcription.full_text,
+        language=transcription.language,
+        duration=transcription.duration,
+        segments=transcription.segments,
+        status=transcription.status,
+        error_message=transcription.error_message,
+        created_at=transcription.created_at,
+        updated_at=transcription.updated_at
+    )
 
 
 @router.post("/files/{file_id}/transcribe/async", response_model=TranscriptionStatusResponse, status_code=202)
@@ -92,44 +109,20 @@ async def transcribe_file_async(
     
     Returns transcription status. Use GET endpoint to check progress.
     """
-    # Get file metadata
-    file_metadata = await FileService.get_file_by_id(file_id, db)
+    # Get file metadata and any existing transcription in one round-trip
+    file_metadata, transcription = await FileService.get_file_with_transcription(file_id, db)
     
     if not file_metadata:
         raise HTTPException(status_code=404, detail="File not found")
     
     # Check if file is audio or video
-    from app.models.file import FileType
-    if file_metadata.file_type not in [FileType.AUDIO, FileType.VIDEO]:
+    if file_metadata.file_type not in _TRANSCRIBABLE:
         raise HTTPException(
             status_code=400,
             detail=f"File type '{file_metadata.file_type}' is not supported for transcription."
         )
     
-    # Start transcription in background
-    async def transcribe_background():
-        from app.config.database import AsyncSessionLocal
-        async with AsyncSessionLocal() as db_session:
-            try:
-                file_meta = await FileService.get_file_by_id(file_id, db_session)
-                if file_meta:
-                    await TranscriptionService.transcribe_file(
-                        file_meta,
-                        db_session,
-                        language=request.language or None,
-                        task=request.task
-                    )
-            except Exception as e:
-                # Update transcription status on error
-                transcription = await TranscriptionService.get_transcription_by_file_id(file_id, db_session)
-                if transcription:
-                    transcription.status = "failed"
-                    transcription.error_message = str(e)
-                    await db_session.commit()
-    
-    # Get or create transcription record
-    transcription = await TranscriptionService.get_transcription_by_file_id(file_id, db)
-    
+    # Create transcription record if none exists
     if not transcription:
         transcription = Transcription(
             file_id=file_id,
@@ -138,36 +131,56 @@ async def transcribe_file_async(
         )
         db.add(transcription)
         await db.commit()
-        await db.refresh(transcription)
     
-    # Add background task
-    background_tasks.add_task(transcribe_background)
+    # Hand off to the worker queue if configured; otherwise run in-process,
+    # passing the already-loaded (and validated) file metadata through
+    language = request.language or None
+    if not await task_queue.enqueue("transcribe_job", file_id, language, request.task):
+        background_tasks.add_task(
+            TranscriptionService.run_transcription_job,
+            file_id,
+            language,
+            request.task,
+            file_metadata
+        )
     
     return TranscriptionStatusResponse(
         id=transcription.id,
         file_id=transcription.file_id,
         status=transcription.status,
         error_message=transcription.error_message,
-        created_at=transcription.created_at
+        created_at=transcription.created_at,
+        updated_at=transcription.updated_at
     )
 
 
 @router.get("/files/{file_id}/transcription", response_model=TranscriptionResponse)
 async def get_transcription(
     file_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db)
 ):
     """
     Get transcription for a file.
     
     - **file_id**: ID of the file
+    
+    Supports conditional GET: send the returned ETag in If-None-Match to get a 304.
     """
     transcription = await TranscriptionService.get_transcription_by_file_id(file_id, db)
     
     if not transcription:
         raise HTTPException(status_code=404, detail="Transcription not found")
     
-    return TranscriptionResponse(
+    etag = _transcription_etag(transcription)
+    cache_control = _transcription_cache_control(transcription)
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    
+    return TranscriptionResponse.model_construct(
         id=transcription.id,
         file_id=transcription.file_id,
         full_text=transcription.full_text,
@@ -184,19 +197,30 @@ async def get_transcription(
 @router.get("/transcriptions/{transcription_id}", response_model=TranscriptionResponse)
 async def get_transcription_by_id(
     transcription_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db)
 ):
     """
     Get transcription by ID.
     
     - **transcription_id**: ID of the transcription
+    
+    Supports conditional GET: send the returned ETag in If-None-Match to get a 304.
     """
     transcription = await TranscriptionService.get_transcription_by_id(transcription_id, db)
     
     if not transcription:
         raise HTTPException(status_code=404, detail="Transcription not found")
     
-    return TranscriptionResponse(
+    etag = _transcription_etag(transcription)
+    cache_control = _transcription_cache_control(transcription)
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    
+    return TranscriptionResponse.model_construct(
         id=transcription.id,
         file_id=transcription.file_id,
         full_text=transcription.full_text,
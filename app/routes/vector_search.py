@@ -1,22 +1,77 @@
 """Vector search and embedding endpoints."""
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+import logging
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
+from typing import Any, Dict, Optional
 
 from app.config.database import get_db
 from app.services.semantic_search_service import SemanticSearchService
 from app.services.vector_store import get_vector_store
+from app.services.embedding_service import EmbeddingService
 from app.schemas.vector_search import (
     SearchRequest,
     SearchResponse,
-    SearchResult,
     GenerateEmbeddingsRequest,
     GenerateEmbeddingsResponse
 )
+from app.utils.etag import content_etag, etag_matches, not_modified
+from app.utils.responses import ORJSONResponse
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Results change whenever the index does, so clients must always revalidate
+SEARCH_CACHE_CONTROL = "private, no-cache"
+
+NDJSON_SEPARATOR = b"\n"
+
+
+def _require_query(query: str):
+    """Reject blank search queries with 400."""
+    if not query or not query.strip():
+        raise HTTPException(status_code=400, detail="Query text is required")
+
+
+async def _search_payload(
+    query: str,
+    top_k: Optional[int],
+    file_id: Optional[int],
+    db: AsyncSession
+) -> Dict[str, Any]:
+    """Run a semantic search and build the SearchResponse payload."""
+    _require_query(query)
+    
+    results = await SemanticSearchService.search(
+        query_text=query,
+        db=db,
+        top_k=top_k,
+        file_id=file_id
+    )
+    
+    # Service dicts already have exactly the SearchResult fields; they are
+    # serialized directly with orjson (response_model is kept for the OpenAPI schema)
+    return {
+        "query": query,
+        "results": results,
+        "total_results": len(results)
+    }
+
+
+async def _search_etag(query: str, top_k: Optional[int], file_id: Optional[int], db: AsyncSession) -> str:
+    """ETag for a search, keyed on its parameters, the index version and the searched rows."""
+    return content_etag({
+        "index_version": get_vector_store().version,
+        "data_version": await SemanticSearchService.data_version(db, file_id),
+        "query": query,
+        "top_k": top_k,
+        "file_id": file_id
+    })
+
 
 @router.post("/search", response_model=SearchResponse)
 async def semantic_search(
@@ -32,36 +87,71 @@ async def semantic_search(
     
     Returns relevant chunks ranked by similarity.
     """
-    if not request.query or not request.query.strip():
-        raise HTTPException(status_code=400, detail="Query text is required")
+    return ORJSONResponse(
+        await _search_payload(request.query, request.top_k, request.file_id, db)
+    )
+
+
+@router.get("/search", response_model=SearchResponse)
+async def semantic_search_get(
+    request: Request,
+    query: str = Query(..., description="Search query text"),
+    top_k: Optional[int] = Query(None, description="Number of results to return"),
+    file_id: Optional[int] = Query(None, description="Optional file ID to filter results"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Perform semantic search with query parameters.
     
-    try:
-        results = await SemanticSearchService.search(
-            query_text=request.query,
-            db=db,
-            top_k=request.top_k,
-            file_id=request.file_id
-        )
-        
-        return SearchResponse(
-            query=request.query,
-            results=[
-                SearchResult(
-                    chunk_id=r["chunk_id"],
-                    file_id=r["file_id"],
-                    chunk_index=r["chunk_index"],
-                    text=r["text"],
-                    score=r["score"],
-                    distance=r["distance"],
-                    char_count=r["char_count"],
-                    page_number=r.get("page_number")
-                )
-                for r in results
-            ],
-            total_results=len(results)
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+    Same as POST /search, but cacheable: responses carry an ETag tied to the
+    index version and the stored chunks and embeddings, and a matching
+    If-None-Match is answered with 304 without running the search.
+    """
+    etag = await _search_etag(query, top_k, file_id, db)
+    if etag_matches(request, etag):
+        return not_modified(etag, SEARCH_CACHE_CONTROL)
+    
+    payload = await _search_payload(query, top_k, file_id, db)
+    return ORJSONResponse(payload, headers={"ETag": etag, "Cache-Control": SEARCH_CACHE_CONTROL})
+
+
+@router.post("/search/stream", response_class=StreamingResponse)
+async def semantic_search_stream(
+    request: SearchRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Perform semantic search, streaming results as newline-delimited JSON.
+    
+    The first line is {"query": ...}, then one SearchResult object per line,
+    best first, and finally {"total_results": n}. An error after streaming
+    has started is reported as a final {"error": ...} line.
+    """
+    _require_query(request.query)
+    
+    async def generate_lines():
+        yield orjson.dumps({"query": request.query}) + NDJSON_SEPARATOR
+        total = 0
+        try:
+            async for result in SemanticSearchService.search_iter(
+                query_text=request.query,
+                db=db,
+                top_k=request.top_k,
+                file_id=request.file_id
+            ):
+                total += 1
+                yield orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY) + NDJSON_SEPARATOR
+        except Exception as e:
+            logger.error(f"Streaming search failed: {str(e)}")
+            yield orjson.dumps({"error": str(e)}) + NDJSON_SEPARATOR
+            return
+        yield orjson.dumps({"total_results": total}) + NDJSON_SEPARATOR
+    
+    return StreamingResponse(
+        generate_lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.post("/files/{file_id}/embeddings", response_model=GenerateEmbeddingsResponse, status_code=201)
@@ -84,15 +174,14 @@ async def generate_embeddings_for_file(
             db=db,
             model=request.model if request else None
         )
-        
-        return GenerateEmbeddingsResponse(
-            embeddings_created=count,
-            message=f"Generated {count} embeddings successfully"
-        )
     except ValueError as e:
+        # The file has no chunks; other errors go to the app-level handlers
         raise HTTPException(status_code=404, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Embedding generation failed: {str(e)}")
+    
+    return GenerateEmbeddingsResponse.model_construct(
+        embeddings_created=count,
+        message=f"Generated {count} embeddings successfully"
+    )
 
 
 @router.post("/chunks/embeddings", response_model=GenerateEmbeddingsResponse, status_code=201)
@@ -109,19 +198,16 @@ async def generate_embeddings_for_chunks(
     if not request.chunk_ids:
         raise HTTPException(status_code=400, detail="chunk_ids is required")
     
-    try:
-        embeddings = await SemanticSearchService.generate_embeddings_for_chunks(
-            chunk_ids=request.chunk_ids,
-            db=db,
-            model=request.model
-        )
-        
-        return GenerateEmbeddingsResponse(
-            embeddings_created=len(embeddings),
-            message=f"Generated {len(embeddings)} embeddings successfully"
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Embedding generation failed: {str(e)}")
+    embeddings = await SemanticSearchService.generate_embeddings_for_chunks(
+        chunk_ids=request.chunk_ids,
+        db=db,
+        model=request.model
+    )
+    
+    return GenerateEmbeddingsResponse.model_construct(
+        embeddings_created=len(embeddings),
+        message=f"Generated {len(embeddings)} embeddings successfully"
+    )
 
 
 @router.post("/vector-store/rebuild", status_code=200)
@@ -133,34 +219,46 @@ async def rebuild_vector_store(
     
     Useful after bulk updates or when the index becomes out of sync.
     """
-    try:
-        vector_store = get_vector_store()
-        await vector_store.build_index(db)
-        
-        return {
-            "message": "Vector store rebuilt successfully",
-            "index_size": vector_store.index.ntotal if vector_store.index else 0
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to rebuild vector store: {str(e)}")
+    vector_store = get_vector_store()
+    await vector_store.build_index(db)
+    
+    return {
+        "message": "Vector store rebuilt successfully",
+        "index_size": vector_store.index.ntotal if vector_store.index else 0
+    }
 
 
 @router.get("/vector-store/status", status_code=200)
-async def get_vector_store_status():
+async def get_vector_store_status(request: Request):
     """
     Get status of the vector store.
     
-    Returns information about the current index state.
+    Returns information about the current index state. Responses carry an
+    ETag, so pollers sending If-None-Match get an empty 304 while the index is unchanged.
     """
-    try:
-        vector_store = get_vector_store()
-        
-        return {
-            "index_loaded": vector_store.index is not None,
-            "index_size": vector_store.index.ntotal if vector_store.index else 0,
-            "dimension": vector_store.dimension,
-            "index_path": str(vector_store.index_path)
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get vector store status: {str(e)}")
-
+    vector_store = get_vector_store()
+    
+    status = {
+        "index_loaded": vector_store.index is not None,
+        "index_size": vector_store.index.ntotal if vector_store.index else 0,
+        "index_type": type(vector_store.index).__name__ if vector_store.index else None,
+        "is_trained": vector_store.index.is_trained if vector_store.index else None,
+        "nprobe": vector_store.nprobe,
+        "code_size_bytes": vector_store.index.sa_code_size() if vector_store.index else None,
+        "dimension": vector_store.dimension,
+        "is_mmapped": vector_store.is_mmapped,
+        "index_path": str(vector_store.index_path),
+        "query_cache": EmbeddingService.query_cache_stats()
+    }
+    
+    # Keyed on the index identity only: the query-cache counters move on every
+    # search, and hashing them would defeat conditional polling
+    etag = content_etag({
+        "index_version": vector_store.version,
+        "index_size": status["index_size"],
+        "nprobe": status["nprobe"],
+        "dimension": status["dimension"]
+    })
+    if etag_matches(request, etag):
+        return not_modified(etag, SEARCH_CACHE_CONTROL)
+    return ORJSONResponse(status, headers={"ETag": etag, "Cache-Control": SEARCH_CACHE_CONTROL})
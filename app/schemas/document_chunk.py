@@ -86,3 +86,23 @@ class ProcessPDFResponse(BaseModel):
             }
         }
     )
+
+
+class ProcessPDFJobResponse(BaseModel):
+    """Response schema for PDF processing started in the background."""
+    
+    file_id: int
+    status: str
+    progress_channel: str
+    message: str
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "file_id": 5,
+                "status": "queued",
+                "progress_channel": "pdf_processing:5",
+                "message": "PDF processing started"
+            }
+        }
+    )
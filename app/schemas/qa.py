@@ -1,13 +1,15 @@
 """Q&A request and response schemas."""
 
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, ConfigDict, StringConstraints
+from typing import List, Optional, Dict, Any, Annotated
 
 
 class QuestionRequest(BaseModel):
     """Request schema for asking a question."""
     
-    question: str = Field(..., description="The question to ask")
+    question: Annotated[str, StringConstraints(min_length=1, strip_whitespace=True)] = Field(
+        ..., description="The question to ask"
+    )
     file_id: Optional[int] = Field(None, description="Optional file ID to limit search to specific file")
     top_k: Optional[int] = Field(None, description="Number of chunks to retrieve (defaults to settings)")
     model: Optional[str] = Field(None, description="LLM model to use (defaults to settings)")
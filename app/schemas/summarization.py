@@ -1,7 +1,7 @@
 """Summarization request and response schemas."""
 
-from pydantic import ConfigDict, BaseModel, Field
-from typing import Optional
+from pydantic import ConfigDict, BaseModel, Field, StringConstraints
+from typing import Optional, Annotated
 
 
 class SummarizeRequest(BaseModel):
@@ -25,7 +25,9 @@ class SummarizeRequest(BaseModel):
 class CustomSummarizeRequest(BaseModel):
     """Request schema for custom prompt summarization."""
     
-    custom_prompt: str = Field(..., description="Custom prompt for summarization")
+    custom_prompt: Annotated[str, StringConstraints(min_length=1, strip_whitespace=True)] = Field(
+        ..., description="Custom prompt for summarization"
+    )
     model: Optional[str] = Field(None, description="LLM model to use (defaults to settings)")
     temperature: Optional[float] = Field(None, ge=0.0, le=2.0, description="Temperature for LLM generation")
     
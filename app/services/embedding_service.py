@@ -1,10 +1,15 @@
 """Service for generating embeddings using OpenAI."""
 
 import logging
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 import asyncio
+import numpy as np
 
 from app.config.settings import get_settings
+from app.services.openai_client import get_async_openai_client
+from app.utils.cache import TTLCache
+from app.utils.singleflight import SingleFlight
+from app.utils.errors import InvalidRequestError
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -13,6 +18,46 @@ settings = get_settings()
 class EmbeddingService:
     """Service for generating text embeddings using OpenAI."""
     
+    # Query embeddings keyed by (model, whitespace-normalized text); repeated questions skip the API
+    _query_cache = TTLCache(maxsize=4096, ttl=3600)
+    # Concurrent misses for the same query share one API call
+    _query_in_flight = SingleFlight()
+    
+    @staticmethod
+    async def embed_query(text: str, model: Optional[str] = None) -> List[float]:
+        """
+        Generate the embedding for a search query, reusing recent results.
+        
+        Args:
+            text: Query text
+            model: Embedding model to use (defaults to settings)
+        
+        Returns:
+            List of floats representing the embedding vector
+        """
+        model = model or settings.embedding_model
+        key = (model, " ".join(text.split()))
+        
+        cached = EmbeddingService._query_cache.get(key)
+        if cached is None:
+            cached = await EmbeddingService._query_in_flight.run(
+                key, lambda: EmbeddingService._embed_and_cache_query(key)
+            )
+        return list(cached)
+    
+    @staticmethod
+    async def _embed_and_cache_query(key: Tuple[str, str]) -> Tuple[float, ...]:
+        """Embed a normalized query and store it under key = (model, text)."""
+        model, text = key
+        vector = tuple(await EmbeddingService.generate_embedding(text, model))
+        EmbeddingService._query_cache.set(key, vector)
+        return vector
+    
+    @staticmethod
+    def query_cache_stats() -> Dict[str, Any]:
+        """Hit/miss counters for the query embedding cache."""
+        return EmbeddingService._query_cache.stats()
+    
     @staticmethod
     async def generate_embedding(text: str, model: Optional[str] = None) -> List[float]:
         """
@@ -26,17 +71,14 @@ class EmbeddingService:
             List of floats representing the embedding vector
         """
         if not settings.openai_api_key:
-            raise ValueError("OpenAI API key is required for embeddings")
+            raise InvalidRequestError("OpenAI API key is required for embeddings")
         
         model = model or settings.embedding_model
         
         try:
-            from openai import OpenAI
+            client = get_async_openai_client()
             
-            client = OpenAI(api_key=settings.openai_api_key)
-            
-            # OpenAI embeddings API (synchronous, but we'll run in executor)
-            response = client.embeddings.create(
+            response = await client.embeddings.create(
                 model=model,
                 input=text
             )
@@ -53,7 +95,7 @@ class EmbeddingService:
         texts: List[str],
         model: Optional[str] = None,
         batch_size: Optional[int] = None
-    ) -> List[List[float]]:
+    ) -> np.ndarray:
         """
         Generate embeddings for multiple texts in batches.
         
@@ -63,40 +105,44 @@ class EmbeddingService:
             batch_size: Batch size for processing (defaults to settings)
         
         Returns:
-            List of embedding vectors
+            Contiguous float32 array of shape (len(texts), dimension), in input order
         """
         if not settings.openai_api_key:
-            raise ValueError("OpenAI API key is required for embeddings")
+            raise InvalidRequestError("OpenAI API key is required for embeddings")
         
         model = model or settings.embedding_model
         batch_size = batch_size or settings.embedding_batch_size
         
         try:
-            from openai import OpenAI
+            client = get_async_openai_client()
+            
+            # Send batches concurrently (capped to respect rate limits); gather keeps order
+            semaphore = asyncio.Semaphore(settings.embedding_concurrency)
             
-            client = OpenAI(api_key=settings.openai_api_key)
+            async def embed_batch(batch: List[str]) -> np.ndarray:
+                async with semaphore:
+                    response = await client.embeddings.create(
+                        model=model,
+                        input=batch
+                    )
+                return np.asarray([item.embedding for item in response.data], dtype=np.float32)
             
-            # Process in batches
-            all_embeddings = []
+            # Embed each distinct text once (repeated headers/footers are common),
+            # then fan the rows back out to the input order
+            positions = {}
+            for text in texts:
+                positions.setdefault(text, len(positions))
+            unique_texts = list(positions)
             
-            for i in range(0, len(texts), batch_size):
-                batch = texts[i:i + batch_size]
-                
-                # Generate embeddings for batch
-                response = client.embeddings.create(
-                    model=model,
-                    input=batch
-                )
-                
-                # Extract embeddings
-                batch_embeddings = [item.embedding for item in response.data]
-                all_embeddings.extend(batch_embeddings)
-                
-                # Small delay to respect rate limits
-                if i + batch_size < len(texts):
-                    await asyncio.sleep(0.1)
+            batches = [unique_texts[i:i + batch_size] for i in range(0, len(unique_texts), batch_size)]
+            if not batches:
+                return np.empty((0, 0), dtype=np.float32)
+            results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
             
-            return all_embeddings
+            embeddings = np.concatenate(results, axis=0)
+            if len(unique_texts) == len(texts):
+                return embeddings
+            return embeddings[[positions[text] for text in texts]]
         except ImportError:
             raise ImportError("OpenAI library not installed. Install with: pip install openai")
         except Exception as e:
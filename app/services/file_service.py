@@ -1,32 +1,114 @@
 """File storage and management service."""
 
 import os
+import time
 import shutil
+import secrets
+import asyncio
 import logging
 from pathlib import Path
-from datetime import datetime
-from typing import Optional
+from types import MappingProxyType
+from typing import Optional, Union
 from fastapi import UploadFile, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete, func as sql_func
+from sqlalchemy import select, delete, insert, func as sql_func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 
+from app.config import database
 from app.config.settings import get_settings
 from app.models.file import FileMetadata, FileType
 from app.models.transcription import Transcription
 from app.models.document_chunk import DocumentChunk
 from app.models.embedding import ChunkEmbedding
+from app.utils.batching import BatchWriter
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
+class _FilenameCharFilter(dict):
+    """
+    str.translate table keeping alphanumerics, spaces, '-' and '_'.
+    
+    Each code point is classified on first sight and cached, so sanitizing is a
+    single C-level translate pass over the name (Unicode letters are kept).
+    """
+    
+    def __missing__(self, codepoint: int) -> Optional[int]:
+        char = chr(codepoint)
+        keep = char.isalnum() or char in " -_"
+        self[codepoint] = codepoint if keep else None
+        return self[codepoint]
+
+
+_SAFE_FILENAME_CHARS = _FilenameCharFilter()
+
+
+async def _insert_file_metadata(rows: list[dict]) -> list[Union[FileMetadata, Exception]]:
+    """
+    Insert metadata rows with one INSERT ... RETURNING and a single commit.
+    
+    If the batch violates a constraint, the rows are retried one at a time so
+    only the offending upload fails; its slot in the result holds the error.
+    """
+    try:
+        return await _insert_file_metadata_rows(rows)
+    except IntegrityError:
+        if len(rows) == 1:
+            raise
+    
+    logger.warning(f"Batched insert of {len(rows)} file metadata rows failed; retrying row by row")
+    results = []
+    for row in rows:
+        try:
+            results.extend(await _insert_file_metadata_rows([row]))
+        except IntegrityError as e:
+            results.append(e)
+    return results
+
+
+async def _insert_file_metadata_rows(rows: list[dict]) -> list[FileMetadata]:
+    """Insert metadata rows in one transaction; raises if any row is rejected."""
+    async with database.AsyncSessionLocal() as session:
+        try:
+            result = await session.scalars(
+                insert(FileMetadata).returning(FileMetadata, sort_by_parameter_order=True),
+                rows
+            )
+            files = list(result.all())
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+    return files
+
+
 class FileService:
     """Service for file operations."""
     
+    # Single writer for upload metadata, so concurrent uploads group-commit
+    # instead of contending for the SQLite write lock
+    _metadata_writer = BatchWriter(_insert_file_metadata, name="file metadata writer")
+    
     # Base storage directory
     STORAGE_BASE = Path("uploads")
     
+    # STORAGE_BASE whose type folders have been created; save_file still
+    # creates the target folder itself, so this only skips repeat mkdirs
+    _storage_dirs_ready: Optional[Path] = None
+    
+    # Bytes read from an upload and written to disk per step
+    UPLOAD_CHUNK_SIZE = 1024 * 1024
+    
+    # Large media is written once and read back much later (if at all), so its
+    # pages are evicted from the page cache after saving to spare hotter data
+    CACHE_DROP_TYPES = frozenset((FileType.AUDIO, FileType.VIDEO))
+    CACHE_DROP_MIN_BYTES = 16 * 1024 * 1024
+    
+    # References to fire-and-forget tasks so they aren't garbage collected mid-run
+    _background_tasks: set = set()
+    
     # File type to folder mapping
     TYPE_FOLDERS = {
         FileType.PDF: "pdfs",
@@ -37,8 +119,8 @@ class FileService:
         FileType.OTHER: "other"
     }
     
-    # MIME type to file type mapping
-    MIME_TYPE_MAPPING = {
+    # MIME type to file type mapping (read-only)
+    MIME_TYPE_MAPPING = MappingProxyType({
         # PDFs
         "application/pdf": FileType.PDF,
         # Audio
@@ -70,54 +152,195 @@ class FileService:
         "application/vnd.ms-powerpoint": FileType.DOCUMENT,
         "application/vnd.openxmlformats-officedocument.presentationml.presentation": FileType.DOCUMENT,
         "text/plain": FileType.DOCUMENT,
-    }
+    })
+    
+    # Extension (lowercase, no dot) to file type, used when the MIME type is unknown
+    EXTENSION_MAPPING = MappingProxyType({
+        "pdf": FileType.PDF,
+        **dict.fromkeys(("mp3", "wav", "ogg", "aac", "flac", "m4a"), FileType.AUDIO),
+        **dict.fromkeys(("mp4", "avi", "mov", "webm", "mkv"), FileType.VIDEO),
+        **dict.fromkeys(("jpg", "jpeg", "png", "gif", "webp"), FileType.IMAGE),
+        **dict.fromkeys(("doc", "docx", "xls", "xlsx", "ppt", "pptx", "txt"), FileType.DOCUMENT),
+    })
     
     @classmethod
     def _ensure_storage_dirs(cls):
-        """Ensure all storage directories exist."""
+        """Ensure all storage directories exist (once per storage base)."""
+        if cls._storage_dirs_ready == cls.STORAGE_BASE:
+            return
         cls.STORAGE_BASE.mkdir(parents=True, exist_ok=True)
         for folder in cls.TYPE_FOLDERS.values():
             (cls.STORAGE_BASE / folder).mkdir(parents=True, exist_ok=True)
+        cls._storage_dirs_ready = cls.STORAGE_BASE
     
     @classmethod
     def _get_file_type(cls, filename: str, mime_type: Optional[str] = None) -> FileType:
         """Determine file type from filename and MIME type."""
         # Try MIME type first
-        if mime_type and mime_type in cls.MIME_TYPE_MAPPING:
-            return cls.MIME_TYPE_MAPPING[mime_type]
+        if mime_type:
+            file_type = cls.MIME_TYPE_MAPPING.get(mime_type)
+            if file_type is not None:
+                return file_type
         
         # Fall back to file extension
         ext = Path(filename).suffix.lower().lstrip('.')
-        if ext == "pdf":
-            return FileType.PDF
-        elif ext in ["mp3", "wav", "ogg", "aac", "flac", "m4a"]:
-            return FileType.AUDIO
-        elif ext in ["mp4", "avi", "mov", "webm", "mkv"]:
-            return FileType.VIDEO
-        elif ext in ["jpg", "jpeg", "png", "gif", "webp"]:
-            return FileType.IMAGE
-        elif ext in ["doc", "docx", "xls", "xlsx", "ppt", "pptx", "txt"]:
-            return FileType.DOCUMENT
-        else:
-            return FileType.OTHER
+        return cls.EXTENSION_MAPPING.get(ext, FileType.OTHER)
     
     @classmethod
     def _generate_filename(cls, original_filename: str) -> str:
-        """Generate a unique filename with timestamp."""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-        ext = Path(original_filename).suffix
-        name = Path(original_filename).stem
+        """Generate a unique filename from the sanitized stem, a ns timestamp and a random token."""
+        path = Path(original_filename)
         # Sanitize filename
-        safe_name = "".join(c for c in name if c.isalnum() or c in (' ', '-', '_')).strip()
-        return f"{safe_name}_{timestamp}{ext}"
+        safe_name = path.stem.translate(_SAFE_FILENAME_CHARS).strip()
+        # Random suffix keeps names unique even for uploads in the same nanosecond
+        return f"{safe_name}_{time.time_ns():x}_{secrets.token_hex(4)}{path.suffix}"
+    
+    @staticmethod
+    def _validate_file_size(file_size: int):
+        """Raise 400 for an empty upload and 413 for one over the size limit."""
+        if file_size == 0:
+            raise HTTPException(
+                status_code=400,
+                detail="File is empty"
+            )
+        
+        file_size_mb = file_size / (1024 * 1024)
+        if file_size_mb > settings.max_file_size_mb:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File size ({file_size_mb:.2f} MB) exceeds maximum allowed size ({settings.max_file_size_mb} MB)"
+            )
+    
+    @staticmethod
+    def _upload_fileno(file: UploadFile) -> Optional[int]:
+        """Descriptor of an upload spooled to disk, or None while it is held in memory."""
+        if not getattr(file.file, "_rolled", True):
+            # fileno() would force the in-memory spool out to disk first
+            return None
+        try:
+            return file.file.fileno()
+        except (AttributeError, OSError):
+            return None
+    
+    @staticmethod
+    def _sendfile_copy(src_fd: int, file_path: Path, size: int) -> int:
+        """Copy size bytes from src_fd to a new file_path kernel-side with os.sendfile."""
+        dst_fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            offset = 0
+            while offset < size:
+                sent = os.sendfile(dst_fd, src_fd, offset, size - offset)
+                if sent == 0:
+                    raise OSError(f"sendfile stopped after {offset} of {size} bytes")
+                offset += sent
+            return offset
+        finally:
+            os.close(dst_fd)
+    
+    @staticmethod
+    def _drop_page_cache(file_path: Path):
+        """Flush a saved file to disk and advise the kernel to evict its cached pages."""
+        try:
+            fd = os.open(file_path, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            # DONTNEED only drops clean pages, so write the dirty ones out first
+            os.fdatasync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        except OSError as e:
+            logger.debug(f"Could not drop page cache for {file_path}: {str(e)}")
+        finally:
+            os.close(fd)
     
     @classmethod
-    async def save_file(
-        cls,
-        file: UploadFile,
-        db: AsyncSession
-    ) -> FileMetadata:
-        """Save uploaded file and create metadata record."""
+    def _schedule_cache_drop(cls, file_path: Path):
+        """Evict a saved file's pages in the background, off the request path."""
+        task = asyncio.create_task(asyncio.to_thread(cls._drop_page_cache, file_path))
+        cls._background_tasks.add(task)
+        task.add_done_callback(cls._background_tasks.discard)
+    
+    @classmethod
+    def _copy_spool(cls, src, file_path: Path) -> int:
+        """Copy an in-memory spooled upload to a new file_path; returns the bytes written."""
+        with open(file_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, cls.UPLOAD_CHUNK_SIZE)
+            return dst.tell()
+    
+    @classmethod
+    async def _copy_chunks(cls, file: UploadFile, file_path: Path) -> int:
+        """
+        Copy an upload to file_path in UPLOAD_CHUNK_SIZE pieces and return the bytes read.
+        
+        Stops as soon as the size limit is exceeded, so the count can be short of
+        the full upload. Every disk operation runs in a worker thread, including
+        open and close: closing flushes up to a full write buffer (megabytes),
+        which would otherwise stall the event loop.
+        """
+        max_bytes = settings.max_file_size_mb * 1024 * 1024
+        file_size = 0
+        f = await asyncio.to_thread(open, file_path, "wb", buffering=settings.file_write_buffer_bytes)
+        try:
+            while chunk := await file.read(cls.UPLOAD_CHUNK_SIZE):
+                file_size += len(chunk)
+                if file_size > max_bytes:
+                    break
+                await asyncio.to_thread(f.write, chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+        return file_size
+    
+    @classmethod
+    async def _write_upload(cls, file: UploadFile, file_path: Path) -> int:
+        """
+        Save an upload to file_path and return its size.
+        
+        Uploads already spooled to a temp file are copied with os.sendfile, which
+        never brings the payload into Python. Small uploads still in the
+        in-memory spool are already buffered, so open/write/close happen in a
+        single worker-thread call. Anything else (or a failed sendfile) is
+        streamed a chunk at a time, so concurrent uploads neither hold whole
+        files in memory nor block the event loop. The size limit is enforced
+        either way, and the partial file is removed on any error.
+        """
+        try:
+            src_fd = cls._upload_fileno(file)
+            if src_fd is not None and hasattr(os, "sendfile"):
+                file_size = os.fstat(src_fd).st_size
+                cls._validate_file_size(file_size)
+                try:
+                    return await asyncio.to_thread(cls._sendfile_copy, src_fd, file_path, file_size)
+                except OSError as e:
+                    logger.warning(f"sendfile copy failed, falling back to chunked copy: {str(e)}")
+                    await file.seek(0)
+                file_size = await cls._copy_chunks(file, file_path)
+            elif not getattr(file.file, "_rolled", True):
+                file_size = await asyncio.to_thread(cls._copy_spool, file.file, file_path)
+            else:
+                file_size = await cls._copy_chunks(file, file_path)
+            
+            # Reports the running size (over the limit) if the copy was cut short
+            cls._validate_file_size(file_size)
+            return file_size
+        except HTTPException:
+            file_path.unlink(missing_ok=True)
+            raise
+        except Exception as e:
+            file_path.unlink(missing_ok=True)
+            logger.error(f"Error writing file to disk: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to save file to disk: {str(e)}"
+            )
+    
+    @classmethod
+    async def save_file(cls, file: UploadFile) -> FileMetadata:
+        """
+        Save uploaded file and create metadata record.
+        
+        The metadata row is written by the shared _metadata_writer in its own
+        session, batched with other uploads in flight.
+        """
         try:
             # Ensure storage directories exist
             cls._ensure_storage_dirs()
@@ -129,30 +352,17 @@ class FileService:
                     detail="Filename is required"
                 )
             
-            # Validate file size
-            file_content = await file.read()
-            file_size = len(file_content)
-            
-            if file_size == 0:
-                raise HTTPException(
-                    status_code=400,
-                    detail="File is empty"
-                )
-            
-            file_size_mb = file_size / (1024 * 1024)
-            
-            if file_size_mb > settings.max_file_size_mb:
-                raise HTTPException(
-                    status_code=413,
-                    detail=f"File size ({file_size_mb:.2f} MB) exceeds maximum allowed size ({settings.max_file_size_mb} MB)"
-                )
+            # Reject from the declared size when the client sent one; the
+            # streamed byte count below is enforced either way
+            if file.size is not None:
+                cls._validate_file_size(file.size)
             
             # Determine file type
             file_type = cls._get_file_type(file.filename, file.content_type)
             
             # Check if file type is allowed
             ext = Path(file.filename).suffix.lower().lstrip('.')
-            if ext not in settings.allowed_file_types and file_type == FileType.OTHER:
+            if file_type == FileType.OTHER and ext not in settings.allowed_file_types_set:
                 raise HTTPException(
                     status_code=400,
                     detail=f"File type '{ext}' is not allowed. Allowed types: {', '.join(settings.allowed_file_types)}"
@@ -165,75 +375,42 @@ class FileService:
             type_folder = cls.TYPE_FOLDERS[file_type]
             file_path = cls.STORAGE_BASE / type_folder / unique_filename
             
-            # Save file to disk
+            # Stream file to disk
             file_path.parent.mkdir(parents=True, exist_ok=True)
+            file_size = await cls._write_upload(file, file_path)
+            file_size_mb = file_size / (1024 * 1024)
+            
+            if (
+                file_type in cls.CACHE_DROP_TYPES
+                and file_size >= cls.CACHE_DROP_MIN_BYTES
+                and hasattr(os, "posix_fadvise")
+            ):
+                cls._schedule_cache_drop(file_path)
+            
+            # Create metadata record; concurrent uploads share one INSERT and commit
             try:
-                with open(file_path, "wb") as f:
-                    f.write(file_content)
+                return await cls._metadata_writer.submit({
+                    "filename": unique_filename,
+                    "original_filename": file.filename,
+                    "file_type": file_type,
+                    "file_path": str(file_path),
+                    "file_size": file_size,
+                    "file_size_mb": round(file_size_mb, 2),
+                    "mime_type": file.content_type,
+                })
             except Exception as e:
-                logger.error(f"Error writing file to disk: {str(e)}")
+                file_path.unlink(missing_ok=True)
+                if "locked" in str(e).lower():
+                    logger.error("Database still locked after the busy timeout. Close DB Browser if open.")
+                    raise HTTPException(
+                        status_code=503,
+                        detail="Database is locked. Please close DB Browser for SQLite if it's open and try again."
+                    )
+                logger.error(f"Error saving file metadata to database: {str(e)}")
                 raise HTTPException(
                     status_code=500,
-                    detail=f"Failed to save file to disk: {str(e)}"
+                    detail=f"Failed to save file metadata: {str(e)}"
                 )
-            
-            # Create metadata record with retry logic for database locks
-            import asyncio
-            max_retries = 3
-            retry_delay = 0.5  # seconds
-            
-            for attempt in range(max_retries):
-                try:
-                    file_metadata = FileMetadata(
-                        filename=unique_filename,
-                        original_filename=file.filename,
-                        file_type=file_type,
-                        file_path=str(file_path),
-                        file_size=file_size,
-                        file_size_mb=round(file_size_mb, 2),
-                        mime_type=file.content_type
-                    )
-                    
-                    db.add(file_metadata)
-                    await db.commit()
-                    await db.refresh(file_metadata)
-                    
-                    return file_metadata
-                except Exception as e:
-                    error_str = str(e).lower()
-                    # Check if it's a database lock error
-                    if "locked" in error_str or "database is locked" in error_str:
-                        if attempt < max_retries - 1:
-                            logger.warning(f"Database locked, retrying ({attempt + 1}/{max_retries})...")
-                            await db.rollback()
-                            await asyncio.sleep(retry_delay * (attempt + 1))  # Exponential backoff
-                            continue
-                        else:
-                            # Final attempt failed
-                            await db.rollback()
-                            if file_path.exists():
-                                try:
-                                    file_path.unlink()
-                                except:
-                                    pass
-                            logger.error(f"Database locked after {max_retries} attempts. Close DB Browser if open.")
-                            raise HTTPException(
-                                status_code=503,
-                                detail="Database is locked. Please close DB Browser for SQLite if it's open and try again."
-                            )
-                    else:
-                        # Other database errors
-                        await db.rollback()
-                        if file_path.exists():
-                            try:
-                                file_path.unlink()
-                            except:
-                                pass
-                        logger.error(f"Error saving file metadata to database: {str(e)}")
-                        raise HTTPException(
-                            status_code=500,
-                            detail=f"Failed to save file metadata: {str(e)}"
-                        )
         except HTTPException:
             raise
         except Exception as e:
@@ -245,11 +422,27 @@ class FileService:
     
     @classmethod
     async def get_file_by_id(cls, file_id: int, db: AsyncSession) -> Optional[FileMetadata]:
-        """Get file metadata by ID."""
+        """Get file metadata by ID (served from the session identity map when already loaded)."""
+        return await db.get(FileMetadata, file_id)
+    
+    @classmethod
+    async def get_file_with_transcription(
+        cls,
+        file_id: int,
+        db: AsyncSession
+    ) -> tuple[Optional[FileMetadata], Optional[Transcription]]:
+        """Get file metadata and its latest transcription (if any) in a single query."""
         result = await db.execute(
-            select(FileMetadata).where(FileMetadata.id == file_id)
+            select(FileMetadata, Transcription)
+            .outerjoin(Transcription, Transcription.file_id == FileMetadata.id)
+            .where(FileMetadata.id == file_id)
+            .order_by(Transcription.created_at.desc())
+            .limit(1)
         )
-        return result.scalar_one_or_none()
+        row = result.first()
+        if row is None:
+            return None, None
+        return row[0], row[1]
     
     @classmethod
     async def list_files(
@@ -259,80 +452,88 @@ class FileService:
         page: int = 1,
         page_size: int = 20
     ) -> tuple[list[FileMetadata], int]:
-        """List files with pagination."""
-        query = select(FileMetadata)
+        """
+        List files with pagination.
         
-        if file_type:
-            query = query.where(FileMetadata.file_type == file_type)
+        The total comes back with the page via COUNT(*) OVER (); only a page past
+        the end, which has no rows to carry it, needs a separate COUNT.
+        """
+        query = select(FileMetadata, sql_func.count().over().label("total"))
         
-        # Get total count
-        count_query = select(sql_func.count()).select_from(FileMetadata)
         if file_type:
-            count_query = count_query.where(FileMetadata.file_type == file_type)
-        
-        total_result = await db.execute(count_query)
-        total = total_result.scalar() or 0
+            query = query.where(FileMetadata.file_type == file_type)
         
         # Apply pagination
         query = query.order_by(FileMetadata.upload_time.desc())
         query = query.offset((page - 1) * page_size).limit(page_size)
         
-        result = await db.execute(query)
-        files = result.scalars().all()
+        rows = (await db.execute(query)).all()
+        if rows:
+            return [row[0] for row in rows], rows[0].total
+        if page <= 1:
+            return [], 0
+        
+        count_query = select(sql_func.count()).select_from(FileMetadata)
+        if file_type:
+            count_query = count_query.where(FileMetadata.file_type == file_type)
+        total = await db.scalar(count_query) or 0
         
-        return list(files), total
+        return [], total
     
     @classmethod
     async def delete_file(cls, file_id: int, db: AsyncSession) -> bool:
-        """Delete file and all related data (transcriptions, chunks, embeddings)."""
-        file_metadata = await cls.get_file_by_id(file_id, db)
-        
-        if not file_metadata:
-            return False
+        """
+        Delete file and all related data (transcriptions, chunks, embeddings).
         
+        Runs one DELETE per table, children first, in a single transaction;
+        embeddings are matched through a chunk subquery and the metadata DELETE
+        returns the stored path, so no SELECT round trips are needed.
+        """
         try:
             # Delete related transcriptions first
             await db.execute(
                 delete(Transcription).where(Transcription.file_id == file_id)
             )
-            logger.info(f"Deleted transcriptions for file {file_id}")
-            
-            # Get all chunks for this file to delete their embeddings
-            chunks_result = await db.execute(
-                select(DocumentChunk.id).where(DocumentChunk.file_id == file_id)
-            )
-            chunk_ids = [row[0] for row in chunks_result.fetchall()]
             
-            # Delete embeddings for these chunks
-            if chunk_ids:
-                await db.execute(
-                    delete(ChunkEmbedding).where(ChunkEmbedding.chunk_id.in_(chunk_ids))
+            # Delete embeddings of this file's chunks
+            await db.execute(
+                delete(ChunkEmbedding).where(
+                    ChunkEmbedding.chunk_id.in_(
+                        select(DocumentChunk.id).where(DocumentChunk.file_id == file_id)
+                    )
                 )
-                logger.info(f"Deleted embeddings for {len(chunk_ids)} chunks of file {file_id}")
+            )
             
             # Delete document chunks
             await db.execute(
                 delete(DocumentChunk).where(DocumentChunk.file_id == file_id)
             )
-            logger.info(f"Deleted chunks for file {file_id}")
             
-            # Delete file from disk
-            file_path = Path(file_metadata.file_path)
-            if file_path.exists():
-                try:
-                    file_path.unlink()
-                    logger.info(f"Deleted file from disk: {file_path}")
-                except Exception as e:
-                    logger.warning(f"Failed to delete file from disk {file_path}: {e}")
+            # Delete file metadata, keeping its path for the disk cleanup
+            file_path = await db.scalar(
+                delete(FileMetadata)
+                .where(FileMetadata.id == file_id)
+                .returning(FileMetadata.file_path)
+            )
+            if file_path is None:
+                await db.rollback()
+                return False
             
-            # Delete file metadata (this will cascade delete any remaining relationships)
-            await db.delete(file_metadata)
             await db.commit()
-            
-            logger.info(f"Successfully deleted file {file_id} and all related data")
-            return True
         except Exception as e:
             await db.rollback()
             logger.error(f"Error deleting file {file_id}: {str(e)}")
             raise
+        
+        # Delete file from disk only once the rows are gone for good
+        file_path = Path(file_path)
+        try:
+            # unlink of a large file can block on the filesystem; keep it off the event loop
+            await asyncio.to_thread(file_path.unlink, missing_ok=True)
+            logger.info(f"Deleted file from disk: {file_path}")
+        except Exception as e:
+            logger.warning(f"Failed to delete file from disk {file_path}: {e}")
+        
+        logger.info(f"Successfully deleted file {file_id} and all related data")
+        return True
 
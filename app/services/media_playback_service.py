@@ -1,6 +1,7 @@
 """Media playback service for generating file URLs and timestamps."""
 
 import logging
+from functools import lru_cache
 from typing import Dict, Any, Optional
 from pathlib import Path
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -8,14 +9,23 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.config.settings import get_settings
 from app.services.file_service import FileService
 from app.models.file import FileType
+from app.utils.cache import TTLCache
+from app.utils.errors import InvalidRequestError
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Bound format of the download endpoint path; the prefix matches the files router mount
+FILE_URL_TEMPLATE = "/api/v1/files/{}/download"
+_build_file_url = FILE_URL_TEMPLATE.format
+
 
 class MediaPlaybackService:
     """Service for generating media playback URLs and timestamps."""
     
+    # Per-file playback fields that don't depend on the timestamp (seek/resume reuse them)
+    _static_info_cache = TTLCache(maxsize=1024, ttl=60)
+    
     @staticmethod
     async def get_playback_info(
         file_id: int,
@@ -33,33 +43,59 @@ class MediaPlaybackService:
         Returns:
             Dictionary with file URL, timestamp, and metadata
         """
+        static_info = await MediaPlaybackService._get_static_playback_info(file_id, db)
+        
+        # Validate timestamp if provided
+        if timestamp is not None and timestamp < 0:
+            raise InvalidRequestError("Timestamp must be non-negative")
+        
+        return {
+            **static_info,
+            "timestamp": timestamp if timestamp is not None else 0.0,
+            "formatted_timestamp": MediaPlaybackService._format_timestamp(timestamp) if timestamp is not None else "00:00.000"
+        }
+    
+    @staticmethod
+    async def _get_static_playback_info(file_id: int, db: AsyncSession) -> Dict[str, Any]:
+        """
+        Get the timestamp-independent playback fields for a file, cached per file ID.
+        
+        Args:
+            file_id: ID of the media file
+            db: Database session
+        
+        Returns:
+            Dictionary with file name, type, URL, MIME type and size
+        """
+        cached = MediaPlaybackService._static_info_cache.get(file_id)
+        if cached is not None:
+            return cached
+        
         # Get file metadata
         file_metadata = await FileService.get_file_by_id(file_id, db)
         
         if not file_metadata:
-            raise ValueError(f"File {file_id} not found")
+            raise InvalidRequestError(f"File {file_id} not found")
         
         # Check if file is audio or video
         if file_metadata.file_type not in [FileType.AUDIO, FileType.VIDEO]:
-            raise ValueError(f"File type {file_metadata.file_type} is not supported for playback. Only audio and video files are supported.")
-        
-        # Generate file URL
-        file_url = MediaPlaybackService._generate_file_url(file_id, file_metadata)
-        
-        # Validate timestamp if provided
-        if timestamp is not None and timestamp < 0:
-            raise ValueError("Timestamp must be non-negative")
+            raise InvalidRequestError(f"File type {file_metadata.file_type} is not supported for playback. Only audio and video files are supported.")
         
-        return {
+        static_info = {
             "file_id": file_id,
             "file_name": file_metadata.original_filename,
             "file_type": file_metadata.file_type.value,
-            "file_url": file_url,
-            "timestamp": timestamp if timestamp is not None else 0.0,
-            "formatted_timestamp": MediaPlaybackService._format_timestamp(timestamp) if timestamp is not None else "00:00.000",
+            "file_url": MediaPlaybackService._generate_file_url(file_id, file_metadata),
             "mime_type": file_metadata.mime_type,
             "file_size_mb": file_metadata.file_size_mb
         }
+        MediaPlaybackService._static_info_cache.set(file_id, static_info)
+        return static_info
+    
+    @staticmethod
+    def invalidate_cache(file_id: int) -> None:
+        """Drop cached playback info for a file (e.g. after it is deleted)."""
+        MediaPlaybackService._static_info_cache.invalidate(file_id)
     
     @staticmethod
     def _generate_file_url(file_id: int, file_metadata) -> str:
@@ -76,9 +112,7 @@ class MediaPlaybackService:
         # Use the download endpoint URL
         # In production, you might want to use a CDN or storage service URL
         # For now, use the API endpoint which works for both development and production
-        file_url = f"/api/v1/files/{file_id}/download"
-        
-        return file_url
+        return _build_file_url(file_id)
     
     @staticmethod
     def _format_timestamp(seconds: float) -> str:
@@ -91,13 +125,16 @@ class MediaPlaybackService:
         Returns:
             Formatted timestamp string
         """
-        if seconds is None:
-            return "00:00.000"
-        
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        milliseconds = int((seconds % 1) * 1000)
+        # Quantize to whole milliseconds so nearby floats share a cache entry
+        return MediaPlaybackService._format_milliseconds(round(seconds * 1000))
+    
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _format_milliseconds(total_ms: int) -> str:
+        """Format a whole number of milliseconds as HH:MM:SS.mmm (MM:SS.mmm under an hour)."""
+        secs, milliseconds = divmod(total_ms, 1000)
+        minutes, secs = divmod(secs, 60)
+        hours, minutes = divmod(minutes, 60)
         
         if hours > 0:
             return f"{hours:02d}:{minutes:02d}:{secs:02d}.{milliseconds:03d}"
@@ -0,0 +1,47 @@
+"""Shared OpenAI client."""
+
+import logging
+from typing import Optional
+
+from app.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_async_client = None
+
+
+def get_async_openai_client(api_key: Optional[str] = None):
+    """
+    Get the process-wide AsyncOpenAI client, creating it on first use.
+    
+    Reusing one client keeps its HTTP connection pool (and TLS sessions) warm
+    across requests instead of rebuilding it per call.
+    
+    Args:
+        api_key: API key to use (defaults to settings)
+    
+    Returns:
+        AsyncOpenAI client
+    """
+    global _async_client
+    if _async_client is None:
+        try:
+            from openai import AsyncOpenAI
+        except ImportError:
+            raise ImportError("OpenAI library not installed. Install with: pip install openai")
+        
+        _async_client = AsyncOpenAI(
+            api_key=api_key or settings.openai_api_key,
+            max_retries=2,
+            timeout=30.0
+        )
+    return _async_client
+
+
+async def close_async_openai_client() -> None:
+    """Close the shared client's connection pool (called on shutdown)."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
@@ -1,18 +1,234 @@
 """PDF processing service for text extraction and chunking."""
 
+import asyncio
+import itertools
 import logging
+import multiprocessing
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Awaitable, Callable, Iterable, Iterator, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, func as sql_func
 
+from app.config import database
 from app.config.settings import get_settings
 from app.models.document_chunk import DocumentChunk
 from app.models.file import FileMetadata, FileType
+from app.services import task_queue
+from app.utils.errors import InvalidRequestError
+
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Shared pool for page extraction; created on first multi-page PDF and reused
+_pdf_executor: Optional[ProcessPoolExecutor] = None
+
+# Upper bound on pages per pool task, so long documents stream back in pieces
+PAGES_PER_TASK = 16
+# Chunk rows inserted per statement while processing a PDF
+CHUNK_INSERT_BATCH = 256
+# Redis pub/sub channel for background processing progress, formatted with the file ID
+PDF_PROGRESS_CHANNEL = "pdf_processing:{}"
+
+# Threads tiktoken may use for one batch of chunk texts
+TOKENIZER_THREADS = min(8, os.cpu_count() or 1)
+
+# Sentence boundary used by the "sentence" chunking strategy
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+
+@lru_cache(maxsize=1)
+def _token_encoding():
+    """The cl100k_base encoding (used by GPT-4), loaded once per process."""
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def _pdf_worker_count() -> int:
+    """Processes used for page extraction (settings value, or the CPU count if 0)."""
+    return settings.pdf_extraction_workers or os.cpu_count() or 1
+
+
+def _get_pdf_executor() -> ProcessPoolExecutor:
+    """Return the page extraction process pool, creating it on first use."""
+    global _pdf_executor
+    if _pdf_executor is None:
+        # spawn rather than fork: the parent runs an event loop and DB/driver threads
+        _pdf_executor = ProcessPoolExecutor(
+            max_workers=_pdf_worker_count(),
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pdf_executor
+
+
+def shutdown_pdf_executor():
+    """Stop the page extraction process pool, if it was started."""
+    global _pdf_executor
+    if _pdf_executor is not None:
+        _pdf_executor.shutdown(wait=False, cancel_futures=True)
+        _pdf_executor = None
+
+
+def _page_ranges(page_count: int, parts: int) -> List[Tuple[int, int]]:
+    """Split pages [0, page_count) into at most `parts` contiguous ranges of near-equal size."""
+    parts = max(1, min(parts, page_count))
+    size, extra = divmod(page_count, parts)
+    ranges = []
+    start = 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def _count_pdf_pages(file_path: str) -> int:
+    """Number of pages in a PDF (no text extraction)."""
+    if PDFIUM_AVAILABLE:
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    
+    import pdfplumber
+    
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+
+def _extract_page_range(file_path: str, start: int, end: int) -> List[str]:
+    """Extract the non-empty page texts of pages [start, end); runs in a worker process or thread."""
+    if PDFIUM_AVAILABLE:
+        return _extract_page_range_pdfium(file_path, start, end)
+    
+    import pdfplumber
+    
+    texts = []
+    with pdfplumber.open(file_path) as pdf:
+        for page in pdf.pages[start:end]:
+            text = page.extract_text()
+            if text and text.strip():
+                texts.append(text)
+    return texts
+
+
+def _extract_page_range_pdfium(file_path: str, start: int, end: int) -> List[str]:
+    """
+    PDFium variant of _extract_page_range.
+    
+    Plain text only, which is all the chunker uses; PDFium does it in C instead of
+    pdfminer's per-character Python objects. CRLF line endings are normalized to LF.
+    """
+    texts = []
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        for index in range(start, end):
+            page = pdf[index]
+            textpage = page.get_textpage()
+            try:
+                text = textpage.get_text_range().replace("\r\n", "\n")
+            finally:
+                textpage.close()
+                page.close()
+            if text.strip():
+                texts.append(text)
+    finally:
+        pdf.close()
+    return texts
+
+
+def _require_pdf_backend():
+    """Raise ImportError if neither pypdfium2 nor pdfplumber is installed."""
+    if not PDFIUM_AVAILABLE:
+        try:
+            import pdfplumber  # noqa: F401
+        except ImportError:
+            raise ImportError("No PDF backend installed. Install with: pip install pypdfium2")
+
+
+def _iter_pdf_pages(file_path: str) -> Iterator[str]:
+    """
+    Yield the non-empty page texts of a PDF in page order (blocking; run it off the event loop).
+    
+    pdfminer layout analysis is CPU-bound Python, so longer documents are split into
+    page ranges parsed in parallel by the process pool; at most two ranges per worker
+    are in flight, so extracted text never runs far ahead of the consumer. Short
+    documents are parsed in the calling thread.
+    """
+    global _pdf_executor
+    _require_pdf_backend()
+    page_count = _count_pdf_pages(file_path)
+    if page_count < settings.pdf_parallel_min_pages:
+        yield from _extract_page_range(file_path, 0, page_count)
+        return
+    
+    workers = _pdf_worker_count()
+    ranges = _page_ranges(page_count, max(workers, -(-page_count // PAGES_PER_TASK)))
+    executor = _get_pdf_executor()
+    pending = deque()
+    try:
+        for start, end in ranges:
+            pending.append(executor.submit(_extract_page_range, file_path, start, end))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM on a huge page); start a fresh pool next time
+        _pdf_executor = None
+        raise
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _join_pages(pages: Iterable[str]) -> Iterator[str]:
+    """Yield the pages with blank lines between them, without building the joined string."""
+    for index, page in enumerate(pages):
+        if index:
+            yield "\n\n"
+        yield page
+
+
+def _iter_sentences(pages: Iterable[str]) -> Iterator[str]:
+    """Yield the sentences of the pages joined by blank lines, as _SENTENCE_BOUNDARY.split would."""
+    carry = None
+    for page in pages:
+        text = page if carry is None else carry + "\n\n" + page
+        cut = 0
+        for match in _SENTENCE_BOUNDARY.finditer(text):
+            if match.end() == len(text):
+                # Trailing whitespace may continue into the next page
+                break
+            yield text[cut:match.start()]
+            cut = match.end()
+        carry = text[cut:]
+    if carry is not None:
+        yield from _SENTENCE_BOUNDARY.split(carry)
+
+
+def _iter_paragraphs(pages: Iterable[str]) -> Iterator[str]:
+    """Yield the paragraphs of each page; pages are joined by blank lines, so they never span pages."""
+    for page in pages:
+        yield from page.split('\n\n')
+
 
 class PDFService:
     """Service for processing PDF files: extracting text and creating chunks."""
@@ -23,24 +239,30 @@ class PDFService:
         db: AsyncSession,
         chunk_size: Optional[int] = None,
         chunk_overlap: Optional[int] = None,
-        strategy: Optional[str] = None
-    ) -> List[DocumentChunk]:
+        strategy: Optional[str] = None,
+        on_progress: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
         """
         Extract text from PDF and split into chunks.
         
+        Pages are extracted and chunked lazily in a worker thread and the chunks are
+        inserted in batches of CHUNK_INSERT_BATCH, so memory stays bounded by the batch
+        rather than the document. Everything is committed once at the end.
+        
         Args:
             file_metadata: The PDF file metadata
             db: Database session
             chunk_size: Characters per chunk (defaults to settings)
             chunk_overlap: Character overlap between chunks (defaults to settings)
             strategy: Chunking strategy (defaults to settings)
+            on_progress: Optional coroutine called with the running stats after each batch
         
         Returns:
-            List of DocumentChunk objects
+            Dictionary with chunks_created, total_characters and total_tokens
         """
         # Check if file is PDF
         if file_metadata.file_type != FileType.PDF:
-            raise ValueError(f"File type {file_metadata.file_type} is not supported. Only PDF files are supported.")
+            raise InvalidRequestError(f"File type {file_metadata.file_type} is not supported. Only PDF files are supported.")
         
         # Use settings defaults if not provided
         chunk_size = chunk_size or settings.chunk_size
@@ -58,74 +280,104 @@ class PDFService:
         )
         await db.commit()
         
-        # Extract text from PDF
-        try:
-            extracted_text = await PDFService._extract_text_from_pdf(file_path)
-        except Exception as e:
-            logger.error(f"Error extracting text from PDF {file_metadata.id}: {str(e)}")
-            raise Exception(f"Failed to extract text from PDF: {str(e)}")
-        
-        if not extracted_text or not extracted_text.strip():
-            raise ValueError("No text could be extracted from the PDF")
-        
-        # Split text into chunks
-        chunks_data = PDFService._split_text_into_chunks(
-            extracted_text,
+        chunks = PDFService._chunk_stream(
+            _iter_pdf_pages(str(file_path)),
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
             strategy=strategy
         )
+        stats = {"chunks_created": 0, "total_characters": 0, "total_tokens": 0}
+        try:
+            while True:
+                try:
+                    batch = await asyncio.to_thread(list, itertools.islice(chunks, CHUNK_INSERT_BATCH))
+                except Exception as e:
+                    logger.error(f"Error extracting text from PDF {file_metadata.id}: {str(e)}")
+                    raise Exception(f"Failed to extract text from PDF: {str(e)}")
+                if not batch:
+                    break
+                
+                await DocumentChunk.bulk_insert(db, [
+                    {
+                        "file_id": file_metadata.id,
+                        "chunk_index": idx,
+                        "text": chunk_data["text"],
+                        "char_count": len(chunk_data["text"]),
+                        "token_count": chunk_data.get("token_count"),
+                        "page_number": chunk_data.get("page_number"),
+                        "start_char": chunk_data.get("start_char"),
+                        "end_char": chunk_data.get("end_char"),
+                        "chunk_metadata": chunk_data.get("metadata")
+                    }
+                    for idx, chunk_data in enumerate(batch, start=stats["chunks_created"])
+                ])
+                stats["chunks_created"] += len(batch)
+                stats["total_characters"] += sum(len(chunk_data["text"]) for chunk_data in batch)
+                stats["total_tokens"] += sum(chunk_data.get("token_count") or 0 for chunk_data in batch)
+                if on_progress is not None:
+                    await on_progress(dict(stats))
+            
+            if not stats["chunks_created"]:
+                raise InvalidRequestError("No text could be extracted from the PDF")
+            
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+        finally:
+            # Stops any page ranges still queued on the process pool
+            chunks.close()
         
-        # Create chunk records
-        chunk_objects = []
-        for idx, chunk_data in enumerate(chunks_data):
-            chunk = DocumentChunk(
-                file_id=file_metadata.id,
-                chunk_index=idx,
-                text=chunk_data["text"],
-                char_count=len(chunk_data["text"]),
-                token_count=chunk_data.get("token_count"),
-                page_number=chunk_data.get("page_number"),
-                start_char=chunk_data.get("start_char"),
-                end_char=chunk_data.get("end_char"),
-                chunk_metadata=chunk_data.get("metadata")
-            )
-            db.add(chunk)
-            chunk_objects.append(chunk)
+        logger.info(f"Successfully processed PDF {file_metadata.id} into {stats['chunks_created']} chunks")
+        return stats
+    
+    @staticmethod
+    async def run_processing_job(
+        file_id: int,
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        strategy: Optional[str] = None,
+        file_metadata: Optional[FileMetadata] = None
+    ) -> None:
+        """
+        Process a PDF with its own database session (background task or worker job).
         
-        await db.commit()
+        Progress is published on PDF_PROGRESS_CHANNEL as JSON messages with a
+        "status" of processing, completed or failed; completed and processing
+        messages carry the chunk stats, failed ones the error.
         
-        # Refresh all chunks to get IDs
-        for chunk in chunk_objects:
-            await db.refresh(chunk)
+        Args:
+            file_id: ID of the PDF file to process
+            chunk_size: Characters per chunk (defaults to settings)
+            chunk_overlap: Character overlap between chunks (defaults to settings)
+            strategy: Chunking strategy (defaults to settings)
+            file_metadata: Already-loaded file metadata, to skip the lookup
+        """
+        channel = PDF_PROGRESS_CHANNEL.format(file_id)
         
-        logger.info(f"Successfully processed PDF {file_metadata.id} into {len(chunk_objects)} chunks")
-        return chunk_objects
-    
-    @staticmethod
-    async def _extract_text_from_pdf(file_path: Path) -> str:
-        """Extract text from PDF file."""
-        try:
-            import pdfplumber
-            
-            full_text = []
-            page_texts = []
-            
-            with pdfplumber.open(file_path) as pdf:
-                for page_num, page in enumerate(pdf.pages, start=1):
-                    text = page.extract_text()
-                    if text:
-                        full_text.append(text)
-                        page_texts.append({
-                            "page": page_num,
-                            "text": text
-                        })
-            
-            return "\n\n".join(full_text)
-        except ImportError:
-            raise ImportError("pdfplumber not installed. Install with: pip install pdfplumber")
-        except Exception as e:
-            raise Exception(f"Error reading PDF: {str(e)}")
+        async def publish_progress(stats: Dict[str, Any]):
+            await task_queue.publish(channel, {"file_id": file_id, "status": "processing", **stats})
+        
+        async with database.AsyncSessionLocal() as db_session:
+            try:
+                if file_metadata is None:
+                    file_metadata = await db_session.get(FileMetadata, file_id)
+                if file_metadata is None:
+                    raise FileNotFoundError(f"File {file_id} not found")
+                stats = await PDFService.process_pdf(
+                    file_metadata,
+                    db_session,
+                    chunk_size=chunk_size,
+                    chunk_overlap=chunk_overlap,
+                    strategy=strategy,
+                    on_progress=publish_progress
+                )
+            except Exception as e:
+                logger.error(f"Background processing of PDF {file_id} failed: {str(e)}")
+                await task_queue.publish(channel, {"file_id": file_id, "status": "failed", "error": str(e)})
+                return
+        
+        await task_queue.publish(channel, {"file_id": file_id, "status": "completed", **stats})
     
     @staticmethod
     def _split_text_into_chunks(
@@ -146,64 +398,103 @@ class PDFService:
         Returns:
             List of chunk dictionaries with text and metadata
         """
+        return list(PDFService._chunk_stream([text], chunk_size, chunk_overlap, strategy))
+    
+    @staticmethod
+    def _chunk_stream(
+        pages: Iterable[str],
+        chunk_size: int,
+        chunk_overlap: int,
+        strategy: str = "fixed"
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily chunk page texts joined by blank lines.
+        
+        Yields the same chunks as _split_text_into_chunks on the joined text, reading
+        pages only as far as the next chunk needs.
+        """
         if strategy == "sentence":
-            return PDFService._chunk_by_sentence(text, chunk_size, chunk_overlap)
+            chunks = PDFService._chunk_by_sentence(_iter_sentences(pages), chunk_size, chunk_overlap)
         elif strategy == "paragraph":
-            return PDFService._chunk_by_paragraph(text, chunk_size, chunk_overlap)
+            chunks = PDFService._chunk_by_paragraph(_iter_paragraphs(pages), chunk_size, chunk_overlap)
         else:  # fixed
-            return PDFService._chunk_fixed_size(text, chunk_size, chunk_overlap)
+            chunks = PDFService._chunk_fixed_size(pages, chunk_size, chunk_overlap)
+        return PDFService._with_token_counts(chunks)
+    
+    @staticmethod
+    def _with_token_counts(
+        chunks: Iterator[Dict[str, Any]],
+        batch_size: int = CHUNK_INSERT_BATCH
+    ) -> Iterator[Dict[str, Any]]:
+        """Fill in each chunk's token_count, tokenizing batch_size chunk texts per call."""
+        while True:
+            batch = list(itertools.islice(chunks, batch_size))
+            if not batch:
+                return
+            counts = PDFService._estimate_tokens_batch([chunk["text"] for chunk in batch])
+            for chunk, count in zip(batch, counts):
+                chunk["token_count"] = count
+            yield from batch
     
     @staticmethod
     def _chunk_fixed_size(
-        text: str,
+        pages: Iterable[str],
         chunk_size: int,
         chunk_overlap: int
-    ) -> List[Dict[str, Any]]:
+    ) -> Iterator[Dict[str, Any]]:
         """Split text into fixed-size chunks."""
-        chunks = []
+        pieces = _join_pages(pages)
+        # Only text[offset:] is kept; everything before the current chunk is dropped
+        buffer = ""
+        offset = 0
+        exhausted = False
         start = 0
-        chunk_index = 0
         
-        while start < len(text):
+        while True:
+            # Read ahead past the chunk end so we know whether it is the last one
+            while not exhausted and offset + len(buffer) <= start + chunk_size:
+                piece = next(pieces, None)
+                if piece is None:
+                    exhausted = True
+                else:
+                    buffer += piece
+            text_length = offset + len(buffer)
+            if start >= text_length:
+                break
+            
             end = start + chunk_size
-            chunk_text = text[start:end]
+            min_break = start + int(chunk_size * 0.7) + 1
             
-            # Try to end at a word boundary
-            if end < len(text):
-                # Look for the last space before the end
-                last_space = chunk_text.rfind(' ')
-                if last_space > chunk_size * 0.7:  # Only if we're not too far from target
-                    chunk_text = chunk_text[:last_space]
-                    end = start + last_space
+            # Try to end at a word boundary: the last space past 70% of the chunk
+            # (not too far from target), found in place without slicing first
+            if end < text_length:
+                last_space = buffer.rfind(' ', min_break - offset, end - offset)
+                if last_space >= 0:
+                    end = offset + last_space
             
-            chunks.append({
-                "text": chunk_text.strip(),
+            chunk_end = min(end, text_length)
+            yield {
+                "text": buffer[start - offset:chunk_end - offset].strip(),
                 "start_char": start,
-                "end_char": start + len(chunk_text),
-                "token_count": PDFService._estimate_tokens(chunk_text)
-            })
+                "end_char": chunk_end
+            }
             
             start = end - chunk_overlap
-            chunk_index += 1
-        
-        return chunks
+            # Keep one chunk of history in case the overlap steps back past start
+            keep_from = start - chunk_size
+            if keep_from > offset:
+                buffer = buffer[keep_from - offset:]
+                offset = keep_from
     
     @staticmethod
     def _chunk_by_sentence(
-        text: str,
+        sentences: Iterable[str],
         chunk_size: int,
         chunk_overlap: int
-    ) -> List[Dict[str, Any]]:
+    ) -> Iterator[Dict[str, Any]]:
         """Split text into chunks at sentence boundaries."""
-        import re
-        
-        # Split by sentence endings
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        
-        chunks = []
         current_chunk = []
         current_size = 0
-        chunk_index = 0
         start_char = 0
         
         for sentence in sentences:
@@ -212,19 +503,22 @@ class PDFService:
             if current_size + sentence_size > chunk_size and current_chunk:
                 # Save current chunk
                 chunk_text = ' '.join(current_chunk)
-                chunks.append({
+                end_char = start_char + len(chunk_text)
+                yield {
                     "text": chunk_text,
                     "start_char": start_char,
-                    "end_char": start_char + len(chunk_text),
-                    "token_count": PDFService._estimate_tokens(chunk_text)
-                })
+                    "end_char": end_char
+                }
                 
                 # Start new chunk with overlap
                 overlap_text = chunk_text[-chunk_overlap:] if chunk_overlap > 0 else ""
-                current_chunk = [overlap_text, sentence] if overlap_text else [sentence]
-                current_size = len(' '.join(current_chunk))
-                start_char = chunks[-1]["end_char"] - len(overlap_text) if overlap_text else chunks[-1]["end_char"]
-                chunk_index += 1
+                if overlap_text:
+                    current_chunk = [overlap_text, sentence]
+                    current_size = len(overlap_text) + 1 + sentence_size
+                else:
+                    current_chunk = [sentence]
+                    current_size = sentence_size
+                start_char = end_char - len(overlap_text) if overlap_text else end_char
             else:
                 current_chunk.append(sentence)
                 current_size += sentence_size + 1  # +1 for space
@@ -232,28 +526,21 @@ class PDFService:
         # Add remaining chunk
         if current_chunk:
             chunk_text = ' '.join(current_chunk)
-            chunks.append({
+            yield {
                 "text": chunk_text,
                 "start_char": start_char,
-                "end_char": start_char + len(chunk_text),
-                "token_count": PDFService._estimate_tokens(chunk_text)
-            })
-        
-        return chunks
+                "end_char": start_char + len(chunk_text)
+            }
     
     @staticmethod
     def _chunk_by_paragraph(
-        text: str,
+        paragraphs: Iterable[str],
         chunk_size: int,
         chunk_overlap: int
-    ) -> List[Dict[str, Any]]:
+    ) -> Iterator[Dict[str, Any]]:
         """Split text into chunks at paragraph boundaries."""
-        paragraphs = text.split('\n\n')
-        
-        chunks = []
         current_chunk = []
         current_size = 0
-        chunk_index = 0
         start_char = 0
         
         for para in paragraphs:
@@ -266,18 +553,16 @@ class PDFService:
             if current_size + para_size > chunk_size and current_chunk:
                 # Save current chunk
                 chunk_text = '\n\n'.join(current_chunk)
-                chunks.append({
+                yield {
                     "text": chunk_text,
                     "start_char": start_char,
-                    "end_char": start_char + len(chunk_text),
-                    "token_count": PDFService._estimate_tokens(chunk_text)
-                })
+                    "end_char": start_char + len(chunk_text)
+                }
                 
                 # Start new chunk
                 current_chunk = [para]
                 current_size = para_size
-                start_char = chunks[-1]["end_char"]
-                chunk_index += 1
+                start_char = start_char + len(chunk_text)
             else:
                 current_chunk.append(para)
                 current_size += para_size + 2  # +2 for \n\n
@@ -285,27 +570,28 @@ class PDFService:
         # Add remaining chunk
         if current_chunk:
             chunk_text = '\n\n'.join(current_chunk)
-            chunks.append({
+            yield {
                 "text": chunk_text,
                 "start_char": start_char,
-                "end_char": start_char + len(chunk_text),
-                "token_count": PDFService._estimate_tokens(chunk_text)
-            })
-        
-        return chunks
+                "end_char": start_char + len(chunk_text)
+            }
     
     @staticmethod
-    def _estimate_tokens(text: str) -> Optional[int]:
-        """Estimate token count for text (for embedding purposes)."""
-        try:
-            import tiktoken
-            encoding = tiktoken.get_encoding("cl100k_base")  # Used by GPT-4
-            return len(encoding.encode(text))
-        except ImportError:
+    def _estimate_tokens_batch(texts: List[str]) -> List[Optional[int]]:
+        """
+        Estimate token counts for texts (for embedding purposes) in one tokenizer call.
+        
+        encode_ordinary_batch tokenizes on TOKENIZER_THREADS threads outside the GIL,
+        and treats special-token strings as plain text instead of raising.
+        """
+        if not TIKTOKEN_AVAILABLE:
             # Fallback: rough estimate (1 token ≈ 4 characters)
-            return len(text) // 4
+            return [len(text) // 4 for text in texts]
+        try:
+            encoded = _token_encoding().encode_ordinary_batch(texts, num_threads=TOKENIZER_THREADS)
         except Exception:
-            return None
+            return [None] * len(texts)
+        return [len(tokens) for tokens in encoded]
     
     @staticmethod
     async def get_chunks_by_file_id(
@@ -325,6 +611,37 @@ class PDFService:
         result = await db.execute(query)
         return list(result.scalars().all())
     
+    @staticmethod
+    async def stream_chunks_by_file_id(
+        file_id: int,
+        db: AsyncSession,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        batch_size: int = 100
+    ) -> AsyncIterator[DocumentChunk]:
+        """Stream chunks for a file in batches instead of materializing every row at once."""
+        query = select(DocumentChunk).where(
+            DocumentChunk.file_id == file_id
+        ).order_by(DocumentChunk.chunk_index)
+        
+        if limit:
+            query = query.limit(limit).offset(offset)
+        
+        result = await db.stream_scalars(query.execution_options(yield_per=batch_size))
+        async for chunk in result:
+            yield chunk
+    
+    @staticmethod
+    async def count_chunks_by_file_id(
+        file_id: int,
+        db: AsyncSession
+    ) -> int:
+        """Count chunks for a file without loading them."""
+        result = await db.execute(
+            select(sql_func.count()).select_from(DocumentChunk).where(DocumentChunk.file_id == file_id)
+        )
+        return result.scalar() or 0
+    
     @staticmethod
     async def get_chunk_by_id(
         chunk_id: int,
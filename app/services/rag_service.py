@@ -1,21 +1,59 @@
 """RAG (Retrieval-Augmented Generation) service for Q&A."""
 
+import heapq
 import logging
+from operator import itemgetter
 from typing import List, Dict, Any, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config.settings import get_settings
 from app.services.semantic_search_service import SemanticSearchService
 from app.services.timestamp_service import TimestampService
-from app.models.file import FileType
+from app.services.openai_client import get_async_openai_client
+from app.utils.concurrency import ConcurrencyLimiter, ServiceBusyError
+from app.utils.errors import InvalidRequestError
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Characters of chunk text shown in each source's text_preview
+PREVIEW_CHARS = 200
+
+# User prompt for answers; only {context} and {question} vary per request
+RAG_PROMPT_TEMPLATE = """You are a helpful assistant that answers questions based ONLY on the provided context from uploaded documents. 
+
+IMPORTANT INSTRUCTIONS:
+- Answer the question using ONLY the information provided in the context below
+- If the context does not contain enough information to answer the question, say "I cannot answer this question based on the provided documents."
+- Do not use any external knowledge or information not present in the context
+- Be concise and accurate
+- Cite which chunk(s) you used if relevant
+
+Context from documents:
+{context}
+
+Question: {question}
+
+Answer:"""
+
 
 class RAGService:
     """Service for RAG-based Q&A using retrieved document chunks."""
     
+    # Bounds simultaneous LLM generations; excess requests queue, then get 503
+    _limiter = ConcurrencyLimiter(
+        settings.max_llm_concurrency,
+        timeout=settings.concurrency_queue_timeout,
+        name="Q&A service"
+    )
+    
+    @staticmethod
+    def _text_preview(text: str) -> str:
+        """Truncate chunk text for a source preview (plain slicing, no regex pass)."""
+        if len(text) <= PREVIEW_CHARS:
+            return text
+        return text[:PREVIEW_CHARS] + "..."
+    
     @staticmethod
     def _build_context_from_chunks(chunks: List[Dict[str, Any]]) -> str:
         """
@@ -27,16 +65,22 @@ class RAGService:
         Returns:
             Formatted context string
         """
+        # Pieces go into one list and one join, so each chunk's text is copied once
+        # rather than into a per-chunk string first
         context_parts = []
         
         for idx, chunk in enumerate(chunks, 1):
             chunk_text = chunk.get("text", "").strip()
-            if chunk_text:
-                # Add chunk with metadata
-                page_info = f" (Page {chunk.get('page_number')})" if chunk.get("page_number") else ""
-                context_parts.append(f"[Chunk {idx}{page_info}]\n{chunk_text}\n")
+            if not chunk_text:
+                continue
+            if context_parts:
+                context_parts.append("\n")
+            # Add chunk with metadata
+            page_number = chunk.get("page_number")
+            page_info = f" (Page {page_number})" if page_number else ""
+            context_parts += ("[Chunk ", str(idx), page_info, "]\n", chunk_text, "\n")
         
-        return "\n".join(context_parts)
+        return "".join(context_parts)
     
     @staticmethod
     def _build_prompt(question: str, context: str) -> str:
@@ -50,22 +94,7 @@ class RAGService:
         Returns:
             Formatted prompt for LLM
         """
-        prompt = f"""You are a helpful assistant that answers questions based ONLY on the provided context from uploaded documents. 
-
-IMPORTANT INSTRUCTIONS:
-- Answer the question using ONLY the information provided in the context below
-- If the context does not contain enough information to answer the question, say "I cannot answer this question based on the provided documents."
-- Do not use any external knowledge or information not present in the context
-- Be concise and accurate
-- Cite which chunk(s) you used if relevant
-
-Context from documents:
-{context}
-
-Question: {question}
-
-Answer:"""
-        return prompt
+        return RAG_PROMPT_TEMPLATE.format(context=context, question=question)
     
     @staticmethod
     async def answer_question(
@@ -91,10 +120,10 @@ Answer:"""
             Dictionary with answer, sources, and metadata
         """
         if not question or not question.strip():
-            raise ValueError("Question cannot be empty")
+            raise InvalidRequestError("Question cannot be empty")
         
         if not settings.openai_api_key:
-            raise ValueError("OpenAI API key is required for Q&A")
+            raise InvalidRequestError("OpenAI API key is required for Q&A")
         
         # Retrieve relevant chunks using semantic search
         top_k = top_k or settings.rag_context_chunks
@@ -110,7 +139,8 @@ Answer:"""
                 "answer": "I couldn't find any relevant information in the uploaded documents to answer your question.",
                 "sources": [],
                 "confidence": 0.0,
-                "chunks_used": 0
+                "chunks_used": 0,
+                "model": model or settings.llm_model
             }
         
         # Build context from retrieved chunks
@@ -124,92 +154,79 @@ Answer:"""
         temperature = temperature if temperature is not None else settings.llm_temperature
         
         try:
-            from openai import OpenAI
-            
-            client = OpenAI(api_key=settings.openai_api_key)
+            client = get_async_openai_client()
             
             # Generate response
-            response = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a helpful assistant that answers questions based only on the provided context from documents. If the context doesn't contain enough information, say so."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=temperature,
-                max_tokens=1000
-            )
+            async with RAGService._limiter.slot():
+                response = await client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": "You are a helpful assistant that answers questions based only on the provided context from documents. If the context doesn't contain enough information, say so."
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    temperature=temperature,
+                    max_tokens=1000
+                )
             
             answer = response.choices[0].message.content.strip()
             
-            # Prepare sources
+            # Prepare sources; timestamps for every audio/video source come from one lookup
             sources = []
-            all_timestamps = []
+            per_source_timestamps = []
+            try:
+                source_timestamps = await TimestampService.extract_timestamps_for_texts(
+                    [(result["file_id"], result["text"]) for result in search_results],
+                    db
+                )
+            except Exception as e:
+                logger.warning(f"Could not extract timestamps for answer sources: {str(e)}")
+                source_timestamps = [None] * len(search_results)
             
-            for result in search_results:
+            for result, chunk_timestamps in zip(search_results, source_timestamps):
                 source_info = {
                     "chunk_id": result["chunk_id"],
                     "file_id": result["file_id"],
                     "chunk_index": result["chunk_index"],
-                    "text_preview": result["text"][:200] + "..." if len(result["text"]) > 200 else result["text"],
+                    "text_preview": RAGService._text_preview(result["text"]),
                     "score": result["score"],
                     "page_number": result.get("page_number"),
                     "timestamps": None
                 }
                 
-                # Extract timestamps for audio/video files
-                try:
-                    # Check if this is an audio/video file
-                    from app.services.file_service import FileService
-                    file_meta = await FileService.get_file_by_id(result["file_id"], db)
+                if chunk_timestamps is not None:
+                    # Format timestamps
+                    formatted_timestamps = [
+                        {
+                            "start": ts["start"],
+                            "end": ts["end"],
+                            "text": ts["text"],
+                            "duration": ts["duration"],
+                            "formatted_start": TimestampService.format_timestamp(ts["start"]),
+                            "formatted_end": TimestampService.format_timestamp(ts["end"])
+                        }
+                        for ts in chunk_timestamps
+                    ]
                     
-                    if file_meta and file_meta.file_type in [FileType.AUDIO, FileType.VIDEO]:
-                        # Extract timestamps for this chunk's text
-                        chunk_timestamps = await TimestampService.extract_timestamps_for_text(
-                            result["file_id"],
-                            result["text"],
-                            db
-                        )
-                        
-                        # Format timestamps
-                        formatted_timestamps = [
-                            {
-                                "start": ts["start"],
-                                "end": ts["end"],
-                                "text": ts["text"],
-                                "duration": ts["duration"],
-                                "formatted_start": TimestampService.format_timestamp(ts["start"]),
-                                "formatted_end": TimestampService.format_timestamp(ts["end"])
-                            }
-                            for ts in chunk_timestamps
-                        ]
-                        
-                        source_info["timestamps"] = formatted_timestamps
-                        all_timestamps.extend(formatted_timestamps)
-                except Exception as e:
-                    logger.warning(f"Could not extract timestamps for file {result['file_id']}: {str(e)}")
+                    source_info["timestamps"] = formatted_timestamps
+                    per_source_timestamps.append(formatted_timestamps)
                 
                 sources.append(source_info)
             
             # Calculate average confidence from search scores
             avg_confidence = sum(r["score"] for r in search_results) / len(search_results) if search_results else 0.0
             
-            # Remove duplicate timestamps (same start/end)
-            unique_timestamps = []
-            seen = set()
-            for ts in all_timestamps:
-                key = (ts["start"], ts["end"])
-                if key not in seen:
-                    seen.add(key)
-                    unique_timestamps.append(ts)
-            
-            # Sort timestamps by start time
-            unique_timestamps.sort(key=lambda x: x["start"])
+            # Each source's timestamps are already sorted by start, so merge them in start
+            # order instead of re-sorting; of duplicate (start, end) spans the first wins
+            timestamps_by_span = {}
+            for ts in heapq.merge(*per_source_timestamps, key=itemgetter("start")):
+                timestamps_by_span.setdefault((ts["start"], ts["end"]), ts)
+            unique_timestamps = list(timestamps_by_span.values())
             
             return {
                 "answer": answer,
@@ -222,6 +239,8 @@ Answer:"""
             
         except ImportError:
             raise ImportError("OpenAI library not installed. Install with: pip install openai")
+        except ServiceBusyError:
+            raise
         except Exception as e:
             logger.error(f"Error generating answer: {str(e)}")
             raise Exception(f"Failed to generate answer: {str(e)}")
@@ -242,10 +261,10 @@ Answer:"""
             Generator of answer chunks
         """
         if not question or not question.strip():
-            raise ValueError("Question cannot be empty")
+            raise InvalidRequestError("Question cannot be empty")
         
         if not settings.openai_api_key:
-            raise ValueError("OpenAI API key is required for Q&A")
+            raise InvalidRequestError("OpenAI API key is required for Q&A")
         
         # Retrieve relevant chunks
         top_k = top_k or settings.rag_context_chunks
@@ -271,34 +290,33 @@ Answer:"""
         temperature = temperature if temperature is not None else settings.llm_temperature
         
         try:
-            from openai import OpenAI
-            
-            client = OpenAI(api_key=settings.openai_api_key)
+            client = get_async_openai_client()
             
-            # Stream response
-            stream = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a helpful assistant that answers questions based only on the provided context from documents."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=temperature,
-                max_tokens=1000,
-                stream=True
-            )
-            
-            for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield {
-                        "type": "content",
-                        "content": chunk.choices[0].delta.content
-                    }
+            # Stream response (the slot is held until generation finishes)
+            async with RAGService._limiter.slot():
+                stream = await client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": "You are a helpful assistant that answers questions based only on the provided context from documents."
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    temperature=temperature,
+                    max_tokens=1000,
+                    stream=True
+                )
+                
+                async for chunk in stream:
+                    if chunk.choices[0].delta.content:
+                        yield {
+                            "type": "content",
+                            "content": chunk.choices[0].delta.content
+                        }
             
             # Send sources at the end
             sources = [
@@ -306,7 +324,7 @@ Answer:"""
                     "chunk_id": result["chunk_id"],
                     "file_id": result["file_id"],
                     "chunk_index": result["chunk_index"],
-                    "text_preview": result["text"][:200] + "..." if len(result["text"]) > 200 else result["text"],
+                    "text_preview": RAGService._text_preview(result["text"]),
                     "score": result["score"],
                     "page_number": result.get("page_number")
                 }
@@ -1,15 +1,18 @@
 """Semantic search service combining embeddings and vector search."""
 
 import logging
-from typing import List, Dict, Any, Optional
+import numpy as np
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, func
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.config.settings import get_settings
 from app.models.document_chunk import DocumentChunk
 from app.models.embedding import ChunkEmbedding
 from app.services.embedding_service import EmbeddingService
 from app.services.vector_store import get_vector_store
+from app.utils.errors import InvalidRequestError
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -53,37 +56,46 @@ class SemanticSearchService:
         # Store embeddings
         embedding_objects = {}
         vector_store = get_vector_store()
+        embedding_model = model or settings.embedding_model
         
+        # Look up existing embeddings for all chunks in one query
+        existing_result = await db.execute(
+            select(ChunkEmbedding).where(ChunkEmbedding.chunk_id.in_([chunk.id for chunk in chunks]))
+        )
+        existing_embeddings = {e.chunk_id: e for e in existing_result.scalars().all()}
+        
+        # Collect rows so inserts and updates each go out as one executemany
+        new_rows = []
+        update_rows = []
         for chunk, embedding_vector in zip(chunks, embeddings):
-            # Check if embedding already exists
-            existing = await db.execute(
-                select(ChunkEmbedding).where(ChunkEmbedding.chunk_id == chunk.id)
-            )
-            existing_embedding = existing.scalar_one_or_none()
+            values = {
+                "embedding_model": embedding_model,
+                **ChunkEmbedding.pack_embedding_vector(embedding_vector)
+            }
+            existing_embedding = existing_embeddings.get(chunk.id)
             
             if existing_embedding:
-                # Update existing
-                existing_embedding.set_embedding_vector(embedding_vector)
-                existing_embedding.embedding_model = model or settings.embedding_model
+                update_rows.append({"id": existing_embedding.id, **values})
                 embedding_objects[chunk.id] = existing_embedding
             else:
-                # Create new
-                chunk_embedding = ChunkEmbedding(
-                    chunk_id=chunk.id,
-                    embedding_model=model or settings.embedding_model
-                )
-                chunk_embedding.set_embedding_vector(embedding_vector)
-                db.add(chunk_embedding)
-                embedding_objects[chunk.id] = chunk_embedding
-            
-            # Add to vector store
-            await vector_store.add_embedding(chunk.id, embedding_vector, db)
+                new_rows.append({"chunk_id": chunk.id, **values})
         
-        await db.commit()
+        # Add all vectors to the vector store in one call
+        await vector_store.add_embeddings([chunk.id for chunk in chunks], embeddings)
+        
+        for chunk_embedding in await ChunkEmbedding.bulk_create(db, new_rows):
+            embedding_objects[chunk_embedding.chunk_id] = chunk_embedding
         
-        # Refresh embeddings to get IDs
-        for embedding in embedding_objects.values():
-            await db.refresh(embedding)
+        if update_rows:
+            # ORM bulk UPDATE by primary key; mirror the new values onto the loaded
+            # objects without marking them dirty (which would update them again)
+            await db.execute(update(ChunkEmbedding), update_rows)
+            embeddings_by_id = {e.id: e for e in existing_embeddings.values()}
+            for row in update_rows:
+                for key, value in row.items():
+                    set_committed_value(embeddings_by_id[row["id"]], key, value)
+        
+        await db.commit()
         
         # Save vector store
         vector_store.save_index()
@@ -115,7 +127,7 @@ class SemanticSearchService:
         chunks = result.scalars().all()
         
         if not chunks:
-            raise ValueError(f"No chunks found for file {file_id}")
+            raise InvalidRequestError(f"No chunks found for file {file_id}")
         
         chunk_ids = [chunk.id for chunk in chunks]
         embeddings = await SemanticSearchService.generate_embeddings_for_chunks(
@@ -124,6 +136,151 @@ class SemanticSearchService:
         
         return len(embeddings)
     
+    @staticmethod
+    async def _search_within_file(
+        query_embedding: List[float],
+        file_id: int,
+        top_k: int,
+        db: AsyncSession
+    ) -> List[Tuple[int, float]]:
+        """
+        Exact nearest-neighbour search over one file's stored embeddings.
+        
+        Args:
+            query_embedding: Query embedding vector
+            file_id: File whose chunks are searched
+            top_k: Number of results to return
+            db: Database session
+        
+        Returns:
+            List of tuples (chunk_id, squared L2 distance), closest first
+        """
+        result = await db.execute(
+            select(ChunkEmbedding.chunk_id, ChunkEmbedding.embedding_vector, ChunkEmbedding.scale)
+            .join(DocumentChunk, ChunkEmbedding.chunk_id == DocumentChunk.id)
+            .where(DocumentChunk.file_id == file_id)
+        )
+        rows = result.all()
+        if not rows:
+            return []
+        
+        query = np.asarray(query_embedding, dtype=np.float32)
+        dimension = query.shape[0]
+        
+        if all(scale is not None and not isinstance(raw, str) for _, raw, scale in rows):
+            # Score the stored int8 codes directly (x = scale * code) rather than
+            # dequantizing every row to float32 first
+            codes = np.frombuffer(b"".join(raw for _, raw, _ in rows), dtype=np.int8)
+            if codes.size != len(rows) * dimension:
+                raise ValueError(f"Embedding dimension mismatch: stored vectors do not match query dimension {dimension}")
+            codes = codes.reshape(len(rows), dimension)
+            scales = np.fromiter((scale for _, _, scale in rows), dtype=np.float32, count=len(rows))
+            
+            # ||x - q||^2 = s^2 ||c||^2 - 2 s (c.q) + ||q||^2, with ||c||^2 exact in int32
+            code_norms = np.einsum("ij,ij->i", codes, codes, dtype=np.int32)
+            distances = scales * scales * code_norms - 2.0 * scales * (codes @ query) + float(query @ query)
+        else:
+            # Legacy float32/JSON rows: decode each vector
+            matrix = np.stack([
+                ChunkEmbedding.decode_embedding_vector(raw, scale) for _, raw, scale in rows
+            ])
+            if matrix.shape[1] != dimension:
+                raise ValueError(f"Embedding dimension mismatch: expected {matrix.shape[1]}, got {dimension}")
+            
+            # ||x - q||^2 = ||x||^2 - 2 x.q + ||q||^2, one BLAS mat-vec for all rows
+            distances = np.einsum("ij,ij->i", matrix, matrix) - 2.0 * (matrix @ query) + float(query @ query)
+        
+        # Squared L2 to match the FAISS IndexFlatL2 distances used elsewhere
+        np.maximum(distances, 0.0, out=distances)
+        
+        k = min(top_k, len(distances))
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest])]
+        return [(rows[i].chunk_id, float(distances[i])) for i in nearest]
+    
+    @staticmethod
+    async def _nearest_chunks(
+        query_text: str,
+        db: AsyncSession,
+        top_k: Optional[int],
+        model: Optional[str],
+        file_id: Optional[int]
+    ) -> List[Tuple[int, float]]:
+        """Find the closest chunk IDs and their distances, closest first."""
+        if file_id:
+            # Score only this file's vectors instead of filtering a global top-k
+            query_embedding = await EmbeddingService.embed_query(query_text, model)
+            return await SemanticSearchService._search_within_file(
+                query_embedding, file_id, top_k or settings.search_top_k, db
+            )
+        
+        vector_store = get_vector_store()
+        
+        # Rebuild index if needed
+        if vector_store.index is None:
+            await vector_store.build_index(db)
+        
+        return await vector_store.search_by_text(query_text, top_k, model)
+    
+    @staticmethod
+    async def _load_chunks(
+        chunk_ids: List[int],
+        db: AsyncSession,
+        file_id: Optional[int]
+    ) -> Dict[int, DocumentChunk]:
+        """Load chunks by ID (restricted to file_id if given), keyed by ID."""
+        query = select(DocumentChunk).where(DocumentChunk.id.in_(chunk_ids))
+        if file_id:
+            query = query.where(DocumentChunk.file_id == file_id)
+        
+        result = await db.execute(query)
+        return {chunk.id: chunk for chunk in result.scalars().all()}
+    
+    @staticmethod
+    def _result_row(chunk: DocumentChunk, distance: float) -> Dict[str, Any]:
+        """Build a search result dict (SearchResult fields) for a chunk."""
+        return {
+            "chunk_id": chunk.id,
+            "file_id": chunk.file_id,
+            "chunk_index": chunk.chunk_index,
+            "text": chunk.text,
+            "score": 1.0 / (1.0 + distance),  # Convert distance to similarity score
+            "distance": distance,
+            "char_count": chunk.char_count,
+            "page_number": chunk.page_number
+        }
+    
+    @staticmethod
+    async def data_version(db: AsyncSession, file_id: Optional[int] = None) -> str:
+        """
+        Fingerprint of the rows search results are drawn from.
+        
+        Changes when chunks or embeddings are added, deleted or re-embedded, which
+        the in-memory index version alone misses (deletes never touch the index,
+        and file-scoped searches are served from the database).
+        
+        Args:
+            db: Database session
+            file_id: Optional file ID to limit the fingerprint to
+        
+        Returns:
+            Opaque version string
+        """
+        query = (
+            select(
+                func.count(DocumentChunk.id),
+                func.max(DocumentChunk.id),
+                func.count(ChunkEmbedding.id),
+                func.max(ChunkEmbedding.updated_at)
+            )
+            .select_from(DocumentChunk)
+            .outerjoin(ChunkEmbedding, ChunkEmbedding.chunk_id == DocumentChunk.id)
+        )
+        if file_id is not None:
+            query = query.where(DocumentChunk.file_id == file_id)
+        row = (await db.execute(query)).one()
+        return ".".join(str(value) for value in row)
+    
     @staticmethod
     async def search(
         query_text: str,
@@ -145,46 +302,62 @@ class SemanticSearchService:
         Returns:
             List of search results with chunks and scores
         """
-        vector_store = get_vector_store()
-        
-        # Rebuild index if needed
-        if vector_store.index is None:
-            await vector_store.build_index(db)
-        
-        # Search
-        results = await vector_store.search_by_text(query_text, top_k, model)
+        results = await SemanticSearchService._nearest_chunks(query_text, db, top_k, model, file_id)
         
         if not results:
             return []
         
         # Get chunks
-        chunk_ids = [chunk_id for chunk_id, _ in results]
-        
-        query = select(DocumentChunk).where(DocumentChunk.id.in_(chunk_ids))
-        if file_id:
-            query = query.where(DocumentChunk.file_id == file_id)
-        
-        result = await db.execute(query)
-        chunks = {chunk.id: chunk for chunk in result.scalars().all()}
+        chunks = await SemanticSearchService._load_chunks(
+            [chunk_id for chunk_id, _ in results], db, file_id
+        )
         
         # Build results
-        search_results = []
-        for chunk_id, distance in results:
-            if chunk_id in chunks:
-                chunk = chunks[chunk_id]
-                search_results.append({
-                    "chunk_id": chunk.id,
-                    "file_id": chunk.file_id,
-                    "chunk_index": chunk.chunk_index,
-                    "text": chunk.text,
-                    "score": 1.0 / (1.0 + distance),  # Convert distance to similarity score
-                    "distance": distance,
-                    "char_count": chunk.char_count,
-                    "page_number": chunk.page_number
-                })
+        search_results = [
+            SemanticSearchService._result_row(chunks[chunk_id], distance)
+            for chunk_id, distance in results
+            if chunk_id in chunks
+        ]
         
         # Sort by score (highest first)
         search_results.sort(key=lambda x: x["score"], reverse=True)
         
         return search_results
-
+    
+    @staticmethod
+    async def search_iter(
+        query_text: str,
+        db: AsyncSession,
+        top_k: Optional[int] = None,
+        model: Optional[str] = None,
+        file_id: Optional[int] = None,
+        batch_size: int = 32
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield search results one at a time, best first.
+        
+        Chunk text is loaded batch_size hits at a time, so only one batch of
+        chunks is held in memory however large top_k is.
+        
+        Args:
+            query_text: Search query
+            db: Database session
+            top_k: Number of results to return
+            model: Embedding model to use
+            file_id: Optional file ID to filter results
+            batch_size: Hits whose chunks are loaded per query
+        
+        Yields:
+            Search result dicts, same shape as search()
+        """
+        results = await SemanticSearchService._nearest_chunks(query_text, db, top_k, model, file_id)
+        
+        # Hits are ordered by ascending distance, i.e. descending score
+        for start in range(0, len(results), batch_size):
+            batch = results[start:start + batch_size]
+            chunks = await SemanticSearchService._load_chunks(
+                [chunk_id for chunk_id, _ in batch], db, file_id
+            )
+            for chunk_id, distance in batch:
+                if chunk_id in chunks:
+                    yield SemanticSearchService._result_row(chunks[chunk_id], distance)
@@ -10,14 +10,23 @@ from app.models.document_chunk import DocumentChunk
 from app.models.transcription import Transcription
 from app.models.file import FileMetadata, FileType
 from app.services.file_service import FileService
+from app.services.openai_client import get_async_openai_client
+from app.utils.singleflight import SingleFlight
+from app.utils.errors import InvalidRequestError
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Chunk texts fetched per batch when assembling a PDF's content
+CHUNK_STREAM_BATCH = 500
+
 
 class SummarizationService:
     """Service for generating summaries of PDFs, audio, and video transcripts."""
     
+    # In-flight summaries keyed by (file_id, model, temperature, max_length)
+    _in_flight = SingleFlight()
+    
     @staticmethod
     async def summarize_file(
         file_id: int,
@@ -40,12 +49,30 @@ class SummarizationService:
             Dictionary with summary and metadata
         """
         if not settings.openai_api_key:
-            raise ValueError("OpenAI API key is required for summarization")
+            raise InvalidRequestError("OpenAI API key is required for summarization")
+        
+        model = model or settings.llm_model
+        temperature = temperature if temperature is not None else settings.llm_temperature
         
+        # Concurrent identical requests share one LLM call
+        return await SummarizationService._in_flight.run(
+            (file_id, model, temperature, max_length),
+            lambda: SummarizationService._summarize_file(file_id, db, model, temperature, max_length)
+        )
+    
+    @staticmethod
+    async def _summarize_file(
+        file_id: int,
+        db: AsyncSession,
+        model: str,
+        temperature: float,
+        max_length: Optional[int]
+    ) -> Dict[str, Any]:
+        """Load the file's content and summarize it; see summarize_file."""
         # Get file metadata
         file_metadata = await FileService.get_file_by_id(file_id, db)
         if not file_metadata:
-            raise ValueError(f"File {file_id} not found")
+            raise InvalidRequestError(f"File {file_id} not found")
         
         # Get content based on file type
         if file_metadata.file_type == FileType.PDF:
@@ -55,15 +82,12 @@ class SummarizationService:
             content = await SummarizationService._get_transcript_content(file_id, db)
             content_type = f"{file_metadata.file_type.value} transcript"
         else:
-            raise ValueError(f"File type {file_metadata.file_type} is not supported for summarization. Only PDF, audio, and video files are supported.")
+            raise InvalidRequestError(f"File type {file_metadata.file_type} is not supported for summarization. Only PDF, audio, and video files are supported.")
         
         if not content or not content.strip():
-            raise ValueError(f"No content found for {content_type}. Please process the file first (extract text for PDFs or transcribe for audio/video).")
+            raise InvalidRequestError(f"No content found for {content_type}. Please process the file first (extract text for PDFs or transcribe for audio/video).")
         
         # Generate summary using LLM
-        model = model or settings.llm_model
-        temperature = temperature if temperature is not None else settings.llm_temperature
-        
         try:
             summary = await SummarizationService._generate_summary(
                 content=content,
@@ -90,19 +114,16 @@ class SummarizationService:
     @staticmethod
     async def _get_pdf_content(file_id: int, db: AsyncSession) -> str:
         """Get all text content from PDF chunks."""
-        result = await db.execute(
-            select(DocumentChunk)
+        # Stream just the text column in batches rather than loading every chunk row
+        result = await db.stream_scalars(
+            select(DocumentChunk.text)
             .where(DocumentChunk.file_id == file_id)
             .order_by(DocumentChunk.chunk_index)
+            .execution_options(yield_per=CHUNK_STREAM_BATCH)
         )
-        chunks = result.scalars().all()
-        
-        if not chunks:
-            return ""
         
         # Combine all chunks
-        texts = [chunk.text for chunk in chunks]
-        return "\n\n".join(texts)
+        return "\n\n".join([text async for text in result])
     
     @staticmethod
     async def _get_transcript_content(file_id: int, db: AsyncSession) -> str:
@@ -142,9 +163,7 @@ class SummarizationService:
             Generated summary
         """
         try:
-            from openai import OpenAI
-            
-            client = OpenAI(api_key=settings.openai_api_key)
+            client = get_async_openai_client()
             
             # Build prompt
             length_instruction = f" Keep the summary under {max_length} words." if max_length else ""
@@ -162,7 +181,7 @@ Focus on:
 Summary:"""
             
             # Generate summary
-            response = client.chat.completions.create(
+            response = await client.chat.completions.create(
                 model=model,
                 messages=[
                     {
@@ -209,12 +228,12 @@ Summary:"""
             Dictionary with summary and metadata
         """
         if not settings.openai_api_key:
-            raise ValueError("OpenAI API key is required for summarization")
+            raise InvalidRequestError("OpenAI API key is required for summarization")
         
         # Get file metadata
         file_metadata = await FileService.get_file_by_id(file_id, db)
         if not file_metadata:
-            raise ValueError(f"File {file_id} not found")
+            raise InvalidRequestError(f"File {file_id} not found")
         
         # Get content
         if file_metadata.file_type == FileType.PDF:
@@ -224,19 +243,17 @@ Summary:"""
             content = await SummarizationService._get_transcript_content(file_id, db)
             content_type = f"{file_metadata.file_type.value} transcript"
         else:
-            raise ValueError(f"File type {file_metadata.file_type} is not supported for summarization.")
+            raise InvalidRequestError(f"File type {file_metadata.file_type} is not supported for summarization.")
         
         if not content or not content.strip():
-            raise ValueError(f"No content found for {content_type}.")
+            raise InvalidRequestError(f"No content found for {content_type}.")
         
         # Generate summary with custom prompt
         model = model or settings.llm_model
         temperature = temperature if temperature is not None else settings.llm_temperature
         
         try:
-            from openai import OpenAI
-            
-            client = OpenAI(api_key=settings.openai_api_key)
+            client = get_async_openai_client()
             
             # Build prompt with custom instruction
             prompt = f"""{custom_prompt}
@@ -246,7 +263,7 @@ Summary:"""
 
 Response:"""
             
-            response = client.chat.completions.create(
+            response = await client.chat.completions.create(
                 model=model,
                 messages=[
                     {
@@ -0,0 +1,86 @@
+"""Background job queue backed by Redis (arq)."""
+
+import logging
+from typing import Any, Dict, Optional
+
+import orjson
+
+try:
+    from arq import create_pool
+    from arq.connections import ArqRedis, RedisSettings
+    ARQ_AVAILABLE = True
+except ImportError:
+    ARQ_AVAILABLE = False
+    create_pool = None
+    ArqRedis = None
+    RedisSettings = None
+
+from app.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Global Redis connection pool used to enqueue jobs
+_redis_pool: Optional["ArqRedis"] = None
+
+
+def is_enabled() -> bool:
+    """Whether jobs should go to the out-of-process worker queue."""
+    return bool(settings.redis_url) and ARQ_AVAILABLE
+
+
+async def get_queue() -> "ArqRedis":
+    """Get or create the global arq Redis pool."""
+    global _redis_pool
+    if _redis_pool is None:
+        _redis_pool = await create_pool(RedisSettings.from_dsn(settings.redis_url))
+    return _redis_pool
+
+
+async def enqueue(job_name: str, *args: Any) -> bool:
+    """
+    Enqueue a job for the arq worker.
+    
+    Args:
+        job_name: Name of the worker function (see app.worker.WorkerSettings)
+        *args: Positional arguments passed to the job
+    
+    Returns:
+        True if the job was enqueued, False if the queue is not configured
+    """
+    if not is_enabled():
+        return False
+    
+    queue = await get_queue()
+    await queue.enqueue_job(job_name, *args)
+    logger.info(f"Enqueued job {job_name} with args {args}")
+    return True
+
+
+async def publish(channel: str, message: Dict[str, Any]) -> bool:
+    """
+    Publish a JSON progress message on a Redis pub/sub channel.
+    
+    Best effort: failures are logged and never interrupt the job reporting progress.
+    
+    Returns:
+        True if the message was published, False if the queue is not configured or Redis failed
+    """
+    if not is_enabled():
+        return False
+    
+    try:
+        queue = await get_queue()
+        await queue.publish(channel, orjson.dumps(message))
+    except Exception as e:
+        logger.warning(f"Failed to publish progress on {channel}: {e}")
+        return False
+    return True
+
+
+async def close_queue():
+    """Close the global Redis pool."""
+    global _redis_pool
+    if _redis_pool is not None:
+        await _redis_pool.close()
+        _redis_pool = None
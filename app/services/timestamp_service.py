@@ -1,7 +1,8 @@
 """Timestamp extraction service for mapping answers to transcript segments."""
 
 import logging
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, FrozenSet, Iterable, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
@@ -9,6 +10,8 @@ from app.config.settings import get_settings
 from app.models.transcription import Transcription
 from app.models.file import FileMetadata, FileType
 from app.services.file_service import FileService
+from app.utils.cache import TTLCache
+from app.utils.errors import InvalidRequestError
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -17,6 +20,9 @@ settings = get_settings()
 class TimestampService:
     """Service for extracting timestamps from transcript segments."""
     
+    # Per-transcription word sets for each segment, keyed by (id, updated_at)
+    _segment_words_cache = TTLCache(maxsize=256, ttl=300)
+    
     @staticmethod
     async def extract_timestamps_for_text(
         file_id: int,
@@ -37,20 +43,22 @@ class TimestampService:
         # Get file metadata
         file_metadata = await FileService.get_file_by_id(file_id, db)
         if not file_metadata:
-            raise ValueError(f"File {file_id} not found")
+            raise InvalidRequestError(f"File {file_id} not found")
         
         # Check if file is audio or video
         if file_metadata.file_type not in [FileType.AUDIO, FileType.VIDEO]:
-            raise ValueError(f"File type {file_metadata.file_type} is not supported. Only audio and video files have timestamps.")
+            raise InvalidRequestError(f"File type {file_metadata.file_type} is not supported. Only audio and video files have timestamps.")
         
         # Get transcription
         transcription = await TimestampService._get_transcription(file_id, db)
         if not transcription or not transcription.segments:
-            raise ValueError(f"No transcription segments found for file {file_id}")
+            raise InvalidRequestError(f"No transcription segments found for file {file_id}")
         
         # Find segments containing the text
         matching_segments = TimestampService._find_matching_segments(
-            text, transcription.segments
+            text,
+            transcription.segments,
+            TimestampService._get_segment_words(transcription)
         )
         
         return matching_segments
@@ -78,10 +86,11 @@ class TimestampService:
             return []
         
         all_timestamps = []
+        segment_words = TimestampService._get_segment_words(transcription)
         
         for chunk_text in chunk_texts:
             matching_segments = TimestampService._find_matching_segments(
-                chunk_text, transcription.segments
+                chunk_text, transcription.segments, segment_words
             )
             
             if matching_segments:
@@ -92,6 +101,64 @@ class TimestampService:
         
         return all_timestamps
     
+    @staticmethod
+    async def extract_timestamps_for_texts(
+        items: List[Tuple[int, str]],
+        db: AsyncSession
+    ) -> List[Optional[List[Dict[str, Any]]]]:
+        """
+        Extract timestamps for many (file_id, text) pairs, e.g. every source of an answer.
+        
+        All transcriptions are loaded in one query instead of one lookup per pair.
+        
+        Args:
+            items: (file_id, text) pairs
+            db: Database session
+        
+        Returns:
+            Matching segments (sorted by start) for each pair, in order; None where
+            the file is not audio/video or has no completed transcription with segments
+        """
+        transcriptions = await TimestampService._get_transcriptions(
+            {file_id for file_id, _ in items}, db
+        )
+        
+        results = []
+        for file_id, text in items:
+            transcription = transcriptions.get(file_id)
+            if transcription is None or not transcription.segments:
+                results.append(None)
+                continue
+            results.append(TimestampService._find_matching_segments(
+                text,
+                transcription.segments,
+                TimestampService._get_segment_words(transcription)
+            ))
+        return results
+    
+    @staticmethod
+    async def _get_transcriptions(
+        file_ids: Iterable[int],
+        db: AsyncSession
+    ) -> Dict[int, Transcription]:
+        """Latest completed transcription of each audio/video file among file_ids."""
+        file_ids = list(file_ids)
+        if not file_ids:
+            return {}
+        
+        result = await db.execute(
+            select(Transcription)
+            .join(FileMetadata, FileMetadata.id == Transcription.file_id)
+            .where(Transcription.file_id.in_(file_ids))
+            .where(Transcription.status == "completed")
+            .where(FileMetadata.file_type.in_([FileType.AUDIO, FileType.VIDEO]))
+            .order_by(Transcription.created_at.desc())
+        )
+        transcriptions = {}
+        for transcription in result.scalars():
+            transcriptions.setdefault(transcription.file_id, transcription)
+        return transcriptions
+    
     @staticmethod
     async def _get_transcription(
         file_id: int,
@@ -106,10 +173,34 @@ class TimestampService:
         )
         return result.scalar_one_or_none()
     
+    @staticmethod
+    def _segment_word_sets(segments: List[Dict[str, Any]]) -> List[FrozenSet[str]]:
+        """Lower-cased word set of every segment, in segment order."""
+        return [frozenset(segment.get("text", "").lower().split()) for segment in segments]
+    
+    @staticmethod
+    def _get_segment_words(transcription: Transcription) -> List[FrozenSet[str]]:
+        """
+        Get segment word sets for a transcription, building them once per revision.
+        
+        Args:
+            transcription: Completed transcription with segments
+        
+        Returns:
+            List of word sets aligned with transcription.segments
+        """
+        key = (transcription.id, transcription.updated_at)
+        segment_words = TimestampService._segment_words_cache.get(key)
+        if segment_words is None:
+            segment_words = TimestampService._segment_word_sets(transcription.segments)
+            TimestampService._segment_words_cache.set(key, segment_words)
+        return segment_words
+    
     @staticmethod
     def _find_matching_segments(
         search_text: str,
-        segments: List[Dict[str, Any]]
+        segments: List[Dict[str, Any]],
+        segment_words: Optional[List[FrozenSet[str]]] = None
     ) -> List[Dict[str, Any]]:
         """
         Find transcript segments that contain the search text.
@@ -117,6 +208,7 @@ class TimestampService:
         Args:
             search_text: Text to search for
             segments: List of transcript segments with timestamps
+            segment_words: Precomputed word sets aligned with segments (optional)
         
         Returns:
             List of matching segments with timestamps
@@ -125,16 +217,18 @@ class TimestampService:
             return []
         
         # Normalize search text for matching
-        search_text_lower = search_text.lower().strip()
-        search_words = set(search_text_lower.split())
+        search_words = frozenset(search_text.lower().split())
+        if not search_words:
+            return []
+        
+        if segment_words is None:
+            segment_words = TimestampService._segment_word_sets(segments)
         
         matching_segments = []
         
-        for segment in segments:
-            segment_text = segment.get("text", "").lower()
-            
+        for segment, words in zip(segments, segment_words):
             # Check if segment contains significant overlap with search text
-            if TimestampService._text_overlap(search_text_lower, segment_text, threshold=0.3):
+            if TimestampService._word_overlap(search_words, words, threshold=0.3):
                 matching_segments.append({
                     "start": segment.get("start", 0.0),
                     "end": segment.get("end", 0.0),
@@ -163,21 +257,25 @@ class TimestampService:
         Returns:
             True if overlap exceeds threshold
         """
-        words1 = set(text1.split())
-        words2 = set(text2.split())
-        
+        return TimestampService._word_overlap(
+            frozenset(text1.split()), frozenset(text2.split()), threshold
+        )
+    
+    @staticmethod
+    def _word_overlap(
+        words1: FrozenSet[str],
+        words2: FrozenSet[str],
+        threshold: float = 0.3
+    ) -> bool:
+        """Check whether the Jaccard similarity of two word sets meets threshold."""
         if not words1 or not words2:
             return False
         
         # Calculate Jaccard similarity
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
-        
-        if not union:
-            return False
+        intersection = len(words1 & words2)
+        union = len(words1) + len(words2) - intersection
         
-        similarity = len(intersection) / len(union)
-        return similarity >= threshold
+        return intersection / union >= threshold
     
     @staticmethod
     def _merge_overlapping_segments(
@@ -214,6 +312,7 @@ class TimestampService:
         return merged
     
     @staticmethod
+    @lru_cache(maxsize=65536)
     def format_timestamp(seconds: float) -> str:
         """
         Format timestamp in seconds to HH:MM:SS format.
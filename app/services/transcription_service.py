@@ -8,12 +8,17 @@ from typing import Optional, Dict, Any, List
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
 
+from app.config import database
 from app.config.settings import get_settings
 from app.models.transcription import Transcription
 from app.models.file import FileMetadata, FileType
 from app.models.document_chunk import DocumentChunk
+from app.services.openai_client import get_async_openai_client
 from app.services.pdf_service import PDFService
 from app.services.semantic_search_service import SemanticSearchService
+from app.utils.singleflight import SingleFlight
+from app.utils.concurrency import ConcurrencyLimiter, ServiceBusyError
+from app.utils.errors import InvalidRequestError
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -27,6 +32,9 @@ MODEL_SIZES = {
     "large": 1550 * 1024 * 1024,   # ~1550 MB
 }
 
+# Seconds allowed for a Whisper API request (upload plus transcription)
+WHISPER_API_TIMEOUT = 600.0
+
 # Disable SSL verification for Whisper model downloads if needed
 # This is a workaround for environments with self-signed certificates
 _ssl_patched = False
@@ -183,6 +191,15 @@ def _patch_ssl_for_whisper():
 class TranscriptionService:
     """Service for transcribing audio and video files."""
     
+    # In-flight transcriptions keyed by (file_id, language, task)
+    _in_flight = SingleFlight()
+    # Bounds simultaneous Whisper runs so bursts queue instead of exhausting GPU/RAM
+    _limiter = ConcurrencyLimiter(
+        settings.max_transcription_concurrency,
+        timeout=settings.concurrency_queue_timeout,
+        name="Transcription service"
+    )
+    
     @staticmethod
     async def transcribe_file(
         file_metadata: FileMetadata,
@@ -204,8 +221,22 @@ class TranscriptionService:
         """
         # Check if file is audio or video
         if file_metadata.file_type not in [FileType.AUDIO, FileType.VIDEO]:
-            raise ValueError(f"File type {file_metadata.file_type} is not supported for transcription")
+            raise InvalidRequestError(f"File type {file_metadata.file_type} is not supported for transcription")
         
+        # Concurrent requests for the same file and options share one Whisper run
+        return await TranscriptionService._in_flight.run(
+            (file_metadata.id, language, task),
+            lambda: TranscriptionService._transcribe_file(file_metadata, db, language, task)
+        )
+    
+    @staticmethod
+    async def _transcribe_file(
+        file_metadata: FileMetadata,
+        db: AsyncSession,
+        language: Optional[str],
+        task: str
+    ) -> Transcription:
+        """Run (or reuse) the transcription for a file; see transcribe_file."""
         # Check if transcription already exists
         existing = await TranscriptionService.get_transcription_by_file_id(file_metadata.id, db)
         if existing and existing.status == "completed":
@@ -224,7 +255,6 @@ class TranscriptionService:
             )
             db.add(transcription)
             await db.commit()
-            await db.refresh(transcription)
         
         try:
             file_path = Path(file_metadata.file_path)
@@ -233,14 +263,15 @@ class TranscriptionService:
                 raise FileNotFoundError(f"File not found: {file_path}")
             
             # Use OpenAI API or local Whisper
-            if settings.use_openai_whisper_api and settings.openai_api_key:
-                result = await TranscriptionService._transcribe_with_openai_api(
-                    file_path, language, task
-                )
-            else:
-                result = await TranscriptionService._transcribe_with_local_whisper(
-                    file_path, language, task
-                )
+            async with TranscriptionService._limiter.slot():
+                if settings.use_openai_whisper_api and settings.openai_api_key:
+                    result = await TranscriptionService._transcribe_with_openai_api(
+                        file_path, language, task
+                    )
+                else:
+                    result = await TranscriptionService._transcribe_with_local_whisper(
+                        file_path, language, task
+                    )
             
             # Update transcription with results
             transcription.full_text = result["text"]
@@ -251,7 +282,6 @@ class TranscriptionService:
             transcription.error_message = None
             
             await db.commit()
-            await db.refresh(transcription)
             
             logger.info(f"Successfully transcribed file {file_metadata.id}")
             
@@ -281,6 +311,11 @@ class TranscriptionService:
             
             return transcription
             
+        except ServiceBusyError:
+            # Not a transcription failure; leave the record retryable
+            transcription.status = "pending"
+            await db.commit()
+            raise
         except Exception as e:
             logger.error(f"Error transcribing file {file_metadata.id}: {str(e)}")
             transcription.status = "failed"
@@ -288,6 +323,59 @@ class TranscriptionService:
             await db.commit()
             raise
     
+    @staticmethod
+    async def run_transcription_job(
+        file_id: int,
+        language: Optional[str] = None,
+        task: str = "transcribe",
+        file_metadata: Optional[FileMetadata] = None,
+        retry_when_busy: bool = False
+    ) -> None:
+        """
+        Run a transcription with its own database session (background task or worker job).
+        
+        Args:
+            file_id: ID of the file to transcribe
+            language: Optional language code (auto-detect if None)
+            task: "transcribe" or "translate"
+            file_metadata: Already-loaded file metadata, to skip the lookup
+            retry_when_busy: Re-raise ServiceBusyError with the record left pending,
+                for callers that reschedule the job; otherwise the record is marked failed
+        """
+        async with database.AsyncSessionLocal() as db_session:
+            try:
+                if file_metadata is None:
+                    result = await db_session.execute(
+                        select(FileMetadata).where(FileMetadata.id == file_id)
+                    )
+                    file_metadata = result.scalar_one_or_none()
+                if file_metadata:
+                    await TranscriptionService.transcribe_file(
+                        file_metadata,
+                        db_session,
+                        language=language,
+                        task=task
+                    )
+            except ServiceBusyError as e:
+                if retry_when_busy:
+                    # _transcribe_file left the record pending; the caller reschedules it
+                    logger.warning(f"Transcription of file {file_id} deferred: {e}")
+                    raise
+                # Nothing will pick a pending record up again, so surface it to the client
+                logger.warning(f"Transcription of file {file_id} shed at capacity: {e}")
+                transcription = await TranscriptionService.get_transcription_by_file_id(file_id, db_session)
+                if transcription:
+                    transcription.status = "failed"
+                    transcription.error_message = f"Transcription service busy; retry the request ({e})"
+                    await db_session.commit()
+            except Exception as e:
+                # Update transcription status on error
+                transcription = await TranscriptionService.get_transcription_by_file_id(file_id, db_session)
+                if transcription:
+                    transcription.status = "failed"
+                    transcription.error_message = str(e)
+                    await db_session.commit()
+    
     @staticmethod
     async def _transcribe_with_openai_api(
         file_path: Path,
@@ -296,17 +384,16 @@ class TranscriptionService:
     ) -> Dict[str, Any]:
         """Transcribe using OpenAI Whisper API."""
         try:
-            from openai import OpenAI
-            
-            client = OpenAI(api_key=settings.openai_api_key)
+            # Shared async client (the file is read without blocking the loop); uploads
+            # plus transcription take far longer than its default 30s timeout
+            client = get_async_openai_client().with_options(timeout=WHISPER_API_TIMEOUT)
             
-            with open(file_path, "rb") as audio_file:
-                transcript = client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    language=language if language else None,
-                    response_format="verbose_json"
-                )
+            transcript = await client.audio.transcriptions.create(
+                model="whisper-1",
+                file=file_path,
+                language=language if language else None,
+                response_format="verbose_json"
+            )
             
             # Format segments with timestamps
             segments = []
@@ -576,29 +663,24 @@ class TranscriptionService:
             strategy=strategy
         )
         
-        # Create chunk records
-        chunk_objects = []
-        for idx, chunk_data in enumerate(chunks_data):
-            chunk = DocumentChunk(
-                file_id=file_id,
-                chunk_index=idx,
-                text=chunk_data["text"],
-                char_count=len(chunk_data["text"]),
-                token_count=chunk_data.get("token_count"),
-                page_number=None,  # Not applicable for transcriptions
-                start_char=chunk_data.get("start_char"),
-                end_char=chunk_data.get("end_char"),
-                chunk_metadata=None  # Can add timestamp info later if needed
-            )
-            db.add(chunk)
-            chunk_objects.append(chunk)
+        # Create chunk records in a single multi-row INSERT (IDs come back via RETURNING)
+        chunk_objects = await DocumentChunk.bulk_create(db, [
+            {
+                "file_id": file_id,
+                "chunk_index": idx,
+                "text": chunk_data["text"],
+                "char_count": len(chunk_data["text"]),
+                "token_count": chunk_data.get("token_count"),
+                "page_number": None,  # Not applicable for transcriptions
+                "start_char": chunk_data.get("start_char"),
+                "end_char": chunk_data.get("end_char"),
+                "chunk_metadata": None  # Can add timestamp info later if needed
+            }
+            for idx, chunk_data in enumerate(chunks_data)
+        ])
         
         await db.commit()
         
-        # Refresh all chunks to get IDs
-        for chunk in chunk_objects:
-            await db.refresh(chunk)
-        
         logger.info(f"Successfully created {len(chunk_objects)} chunks from transcription for file {file_id}")
         return chunk_objects
     
@@ -1,13 +1,14 @@
 """FAISS vector store service for semantic search."""
 
 import os
+import asyncio
 import logging
 import json
 import numpy as np
 from pathlib import Path
 from typing import List, Tuple, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func
 
 try:
     import faiss
@@ -20,10 +21,15 @@ from app.config.settings import get_settings
 from app.models.embedding import ChunkEmbedding
 from app.models.document_chunk import DocumentChunk
 from app.services.embedding_service import EmbeddingService
+from app.utils.concurrency import ReadWriteLock
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Bits per PQ code: 8 normally, fewer when there are too few vectors to train 256 centroids
+PQ_MAX_NBITS = 8
+PQ_MIN_NBITS = 4
+
 
 class VectorStore:
     """FAISS-based vector store for semantic search."""
@@ -32,13 +38,39 @@ class VectorStore:
         self.index = None
         self.dimension = None
         self.chunk_id_map = {}  # Maps FAISS index position to chunk_id
+        self.is_mmapped = False  # Index loaded read-only from a memory-mapped file
         self.index_path = Path(settings.faiss_index_path)
         self._ensure_index_dir()
+        # Version is the persisted index file's mtime plus changes not yet saved,
+        # so workers serving the same saved index report the same version
+        self._file_mtime_ns = 0
+        self._unsaved_changes = 0
+        # Searches run on worker threads; FAISS indexes aren't safe to modify while
+        # being read, so searches hold this shared and index changes exclusively
+        self._index_lock = ReadWriteLock()
+        
+        if FAISS_AVAILABLE:
+            # Searches now run on worker threads; cap OpenMP so they don't oversubscribe cores
+            faiss.omp_set_num_threads(settings.faiss_omp_threads or min(4, os.cpu_count() or 1))
     
     def _ensure_index_dir(self):
         """Ensure index directory exists."""
         self.index_path.parent.mkdir(parents=True, exist_ok=True)
     
+    @property
+    def version(self) -> str:
+        """Opaque identifier that changes whenever the indexed vectors change."""
+        return f"{self._file_mtime_ns}.{self._unsaved_changes}"
+    
+    def _mark_changed(self):
+        """Invalidate version-keyed caches (e.g. search ETags)."""
+        self._unsaved_changes += 1
+    
+    def _mark_persisted(self):
+        """Tie the version to the index file the in-memory index now matches."""
+        self._file_mtime_ns = self.index_path.stat().st_mtime_ns
+        self._unsaved_changes = 0
+    
     async def build_index(self, db: AsyncSession):
         """
         Build or rebuild FAISS index from all embeddings in database.
@@ -49,43 +81,153 @@ class VectorStore:
         if not FAISS_AVAILABLE:
             raise ImportError("FAISS not installed. Install with: pip install faiss-cpu")
         
-        # Get all embeddings
-        result = await db.execute(
-            select(ChunkEmbedding).order_by(ChunkEmbedding.id)
+        # Get dimension from first embedding
+        dimension = await db.scalar(
+            select(ChunkEmbedding.embedding_dimension).order_by(ChunkEmbedding.id).limit(1)
         )
-        embeddings = result.scalars().all()
         
-        if not embeddings:
+        if dimension is None:
             logger.warning("No embeddings found in database")
-            self.index = None
+            async with self._index_lock.write():
+                self.index = None
+                self.dimension = None
+                self.chunk_id_map = {}
+                self._mark_changed()
             return
         
-        # Get dimension from first embedding
-        first_embedding = embeddings[0]
-        self.dimension = first_embedding.embedding_dimension
+        # Size the matrix up front so rows are decoded straight into place;
+        # rows of another dimension can't share the index and are skipped
+        same_dimension = ChunkEmbedding.embedding_dimension == dimension
+        num_vectors = await db.scalar(
+            select(func.count(ChunkEmbedding.id)).where(same_dimension)
+        )
+        skipped = await db.scalar(
+            select(func.count(ChunkEmbedding.id)).where(~same_dimension)
+        )
+        if skipped:
+            logger.warning(f"Skipping {skipped} embeddings whose dimension is not {dimension}")
+        
+        vectors_array = np.empty((num_vectors, dimension), dtype=np.float32)
+        chunk_ids = np.empty(num_vectors, dtype=np.int64)
         
-        # Build vectors array
-        vectors = []
-        self.chunk_id_map = {}
+        # Stream only the needed columns rather than loading every ORM object
+        result = await db.stream(
+            select(ChunkEmbedding.chunk_id, ChunkEmbedding.embedding_vector, ChunkEmbedding.scale)
+            .where(same_dimension)
+            .order_by(ChunkEmbedding.id)
+            .limit(num_vectors)
+            .execution_options(yield_per=1000)
+        )
+        count = 0
+        async for chunk_id, raw, scale in result:
+            vectors_array[count] = ChunkEmbedding.decode_embedding_vector(raw, scale)
+            chunk_ids[count] = chunk_id
+            count += 1
+        
+        # Rows deleted between the count and the scan leave an unused tail
+        vectors_array = vectors_array[:count]
+        
+        # Train and fill the index on a worker thread (k-means training takes
+        # seconds); it is built aside and swapped in, so in-flight searches keep the old one
+        index = await asyncio.to_thread(self._build_filled_index, vectors_array)
         
-        for idx, embedding in enumerate(embeddings):
-            vector = embedding.get_embedding_vector()
-            vectors.append(vector)
-            self.chunk_id_map[idx] = embedding.chunk_id
+        async with self._index_lock.write():
+            self.index = index
+            self.dimension = dimension
+            self.chunk_id_map = dict(enumerate(chunk_ids[:count].tolist()))
+            self.is_mmapped = False
+            self._apply_search_params()
+            self._mark_changed()
+            
+            logger.info(
+                f"Built FAISS {type(self.index).__name__} with {count} vectors "
+                f"of dimension {self.dimension}"
+            )
+            
+            # Save index
+            self.save_index()
+    
+    @staticmethod
+    def _build_filled_index(vectors: np.ndarray):
+        """Create an index for vectors, train it if needed, and add them (blocking)."""
+        num_vectors, dimension = vectors.shape
+        index = VectorStore._create_index(dimension, num_vectors)
+        if not index.is_trained:
+            index.train(vectors)
+        index.add(vectors)
+        return index
+    
+    @staticmethod
+    def _create_index(dimension: int, num_vectors: int):
+        """
+        Create an empty index sized for num_vectors.
         
-        # Convert to numpy array
-        vectors_array = np.array(vectors, dtype=np.float32)
+        Small stores use an exact IndexFlatL2. From settings.faiss_ivf_min_vectors
+        up, an IVF index is used: queries scan only nprobe of nlist clusters and
+        compare against compressed codes instead of full float vectors, either
+        PQ codes (8-bit, fewer bits for small stores) or int8 scalar-quantized
+        (SQ8, 4x smaller than float32) per settings.faiss_ivf_encoding. IVF indexes must be trained before
+        vectors are added.
+        """
+        if num_vectors < settings.faiss_ivf_min_vectors:
+            return faiss.IndexFlatL2(dimension)
         
-        # Create FAISS index (L2 distance)
-        self.index = faiss.IndexFlatL2(self.dimension)
+        # ~4*sqrt(N) clusters, keeping >= 39 training points per centroid
+        nlist = settings.faiss_nlist or int(4 * np.sqrt(num_vectors))
+        nlist = max(1, min(nlist, num_vectors // 39))
         
-        # Add vectors to index
-        self.index.add(vectors_array)
+        if settings.faiss_ivf_encoding.lower() == "sq8":
+            encoding = "SQ8"
+        else:
+            # PQ needs the sub-quantizer count to divide the dimension
+            pq_m = settings.faiss_pq_m
+            while pq_m > 1 and dimension % pq_m:
+                pq_m -= 1
+            # Training a codebook of 2**nbits centroids needs at least that many
+            # points; shrink the codes for small stores, or stay exact if too small
+            pq_nbits = min(PQ_MAX_NBITS, int(np.log2(num_vectors)))
+            if pq_nbits < PQ_MIN_NBITS:
+                return faiss.IndexFlatL2(dimension)
+            encoding = f"PQ{pq_m}x{pq_nbits}"
         
-        logger.info(f"Built FAISS index with {len(vectors)} vectors of dimension {self.dimension}")
+        return faiss.index_factory(dimension, f"IVF{nlist},{encoding}", faiss.METRIC_L2)
+    
+    def _apply_search_params(self):
+        """Apply query-time settings (nprobe) to the current index, if it is IVF."""
+        if not FAISS_AVAILABLE or self.index is None:
+            return
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is not None:
+            ivf.nprobe = min(settings.faiss_nprobe, ivf.nlist)
+    
+    @property
+    def nprobe(self) -> Optional[int]:
+        """IVF clusters scanned per query, or None for an exact index."""
+        if not FAISS_AVAILABLE or self.index is None:
+            return None
+        ivf = faiss.try_extract_index_ivf(self.index)
+        return ivf.nprobe if ivf is not None else None
+    
+    def _detach_from_file(self):
+        """
+        Copy a memory-mapped index into process memory so it can be modified.
         
-        # Save index
-        self.save_index()
+        Read-only mmapped IVF inverted lists reject additions, so they are copied
+        into in-memory lists; flat indexes copy their codes on the first add.
+        """
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is not None:
+            invlists = faiss.ArrayInvertedLists(ivf.nlist, ivf.code_size)
+            for list_no in range(ivf.nlist):
+                invlists.add_entries(
+                    list_no,
+                    ivf.invlists.list_size(list_no),
+                    ivf.invlists.get_ids(list_no),
+                    ivf.invlists.get_codes(list_no)
+                )
+            ivf.replace_invlists(invlists, True)
+            invlists.this.disown()
+        self.is_mmapped = False
     
     async def add_embedding(
         self,
@@ -101,24 +243,45 @@ class VectorStore:
             embedding_vector: Embedding vector
             db: Database session
         """
+        await self.add_embeddings([chunk_id], np.asarray([embedding_vector], dtype=np.float32))
+    
+    async def add_embeddings(self, chunk_ids: List[int], vectors: np.ndarray):
+        """
+        Add a batch of embeddings to the index in one call.
+        
+        Args:
+            chunk_ids: Chunk IDs, aligned with the rows of vectors
+            vectors: float32 array of shape (len(chunk_ids), dimension)
+        """
         if not FAISS_AVAILABLE:
             raise ImportError("FAISS not installed. Install with: pip install faiss-cpu")
         
-        # Initialize index if needed
-        if self.index is None:
-            self.dimension = len(embedding_vector)
-            self.index = faiss.IndexFlatL2(self.dimension)
-            self.chunk_id_map = {}
-        elif self.dimension != len(embedding_vector):
-            raise ValueError(f"Embedding dimension mismatch: expected {self.dimension}, got {len(embedding_vector)}")
+        if not len(chunk_ids):
+            return
         
-        # Add to index
-        vector_array = np.array([embedding_vector], dtype=np.float32)
-        index_position = self.index.ntotal
-        self.index.add(vector_array)
-        self.chunk_id_map[index_position] = chunk_id
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        dimension = vectors.shape[1]
         
-        logger.info(f"Added embedding for chunk {chunk_id} to FAISS index")
+        async with self._index_lock.write():
+            # Initialize index if needed
+            if self.index is None:
+                self.dimension = dimension
+                self.index = faiss.IndexFlatL2(self.dimension)
+                self.chunk_id_map = {}
+                self.is_mmapped = False
+            elif self.dimension != dimension:
+                raise ValueError(f"Embedding dimension mismatch: expected {self.dimension}, got {dimension}")
+            elif self.is_mmapped:
+                self._detach_from_file()
+            
+            # Add to index
+            start_position = self.index.ntotal
+            self.index.add(vectors)
+            for offset, chunk_id in enumerate(chunk_ids):
+                self.chunk_id_map[start_position + offset] = chunk_id
+            self._mark_changed()
+        
+        logger.info(f"Added {len(chunk_ids)} embeddings to FAISS index")
     
     async def search(
         self,
@@ -138,24 +301,27 @@ class VectorStore:
         if not FAISS_AVAILABLE:
             raise ImportError("FAISS not installed. Install with: pip install faiss-cpu")
         
-        if self.index is None or self.index.ntotal == 0:
-            logger.warning("FAISS index is empty")
-            return []
-        
         top_k = top_k or settings.search_top_k
         
         # Convert query to numpy array
         query_vector = np.array([query_embedding], dtype=np.float32)
         
-        # Search
-        distances, indices = self.index.search(query_vector, min(top_k, self.index.ntotal))
-        
-        # Map indices to chunk IDs
-        results = []
-        for idx, distance in zip(indices[0], distances[0]):
-            if idx in self.chunk_id_map:
-                chunk_id = self.chunk_id_map[idx]
-                results.append((chunk_id, float(distance)))
+        async with self._index_lock.read():
+            if self.index is None or self.index.ntotal == 0:
+                logger.warning("FAISS index is empty")
+                return []
+            
+            # Search off the event loop; FAISS releases the GIL while it scans
+            distances, indices = await asyncio.to_thread(
+                self.index.search, query_vector, min(top_k, self.index.ntotal)
+            )
+            
+            # Map indices to chunk IDs
+            results = []
+            for idx, distance in zip(indices[0], distances[0]):
+                if idx in self.chunk_id_map:
+                    chunk_id = self.chunk_id_map[idx]
+                    results.append((chunk_id, float(distance)))
         
         return results
     
@@ -176,8 +342,8 @@ class VectorStore:
         Returns:
             List of tuples (chunk_id, distance)
         """
-        # Generate query embedding
-        query_embedding = await EmbeddingService.generate_embedding(query_text, model)
+        # Generate query embedding (cached for repeated questions)
+        query_embedding = await EmbeddingService.embed_query(query_text, model)
         
         # Search
         return await self.search(query_embedding, top_k)
@@ -188,14 +354,21 @@ class VectorStore:
             return
         
         try:
-            # Save FAISS index
-            faiss.write_index(self.index, str(self.index_path))
+            # Write to temp files and rename over the old ones: workers that have
+            # the previous index memory-mapped keep reading the old file intact
+            index_tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+            faiss.write_index(self.index, str(index_tmp))
             
             # Save chunk ID mapping
             mapping_path = self.index_path.with_suffix('.json')
-            with open(mapping_path, 'w') as f:
+            mapping_tmp = mapping_path.with_name(mapping_path.name + ".tmp")
+            with open(mapping_tmp, 'w') as f:
                 json.dump(self.chunk_id_map, f)
             
+            os.replace(index_tmp, self.index_path)
+            os.replace(mapping_tmp, mapping_path)
+            self._mark_persisted()
+            
             logger.info(f"Saved FAISS index to {self.index_path}")
         except Exception as e:
             logger.error(f"Error saving FAISS index: {str(e)}")
@@ -210,9 +383,14 @@ class VectorStore:
             return False
         
         try:
-            # Load FAISS index
-            self.index = faiss.read_index(str(self.index_path))
+            # Load FAISS index; when mmapped, pages are faulted in on demand and
+            # shared between worker processes through the page cache
+            io_flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if settings.faiss_mmap else 0
+            self.index = faiss.read_index(str(self.index_path), io_flags)
+            self.is_mmapped = settings.faiss_mmap
             self.dimension = self.index.d
+            self._mark_persisted()
+            self._apply_search_params()
         
             # Load chunk ID mapping
             mapping_path = self.index_path.with_suffix('.json')
@@ -0,0 +1,83 @@
+"""Group small writes from concurrent requests into batched calls."""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Deque, Generic, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class BatchWriter(Generic[T, R]):
+    """
+    Funnel items through one writer task that flushes them in batches.
+
+    The writer takes whatever is pending (up to max_batch items) and hands it
+    to `flush` in a single call, so concurrent submitters share one statement
+    and one commit. A lone item is flushed immediately; batches form from items
+    that arrive while the previous flush is running. The writer task exits once
+    nothing is pending and is restarted by the next submit.
+
+    `flush` must return one result per item, in order; an exception instance in
+    place of a result fails just that item. If `flush` raises, every item in
+    that batch gets the exception.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[List[T]], Awaitable[List[R]]],
+        max_batch: int = 32,
+        name: str = "batch writer"
+    ):
+        self._flush = flush
+        self.max_batch = max_batch
+        self.name = name
+        self._pending: Deque[Tuple[T, "asyncio.Future[R]"]] = deque()
+        self._task: Optional[asyncio.Task] = None
+
+    async def submit(self, item: T) -> R:
+        """Queue an item and wait for the result of the flush that writes it."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._drain(), name=self.name)
+        return await future
+
+    async def _drain(self):
+        while self._pending:
+            batch = []
+            while self._pending and len(batch) < self.max_batch:
+                item, future = self._pending.popleft()
+                # Skip items whose submitter has gone away (e.g. cancelled request)
+                if not future.done():
+                    batch.append((item, future))
+            if not batch:
+                continue
+
+            try:
+                results = await self._flush([item for item, _ in batch])
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    future.cancel()
+                raise
+            except Exception as exc:
+                logger.warning(f"{self.name} flush of {len(batch)} items failed: {exc}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def __len__(self) -> int:
+        return len(self._pending)
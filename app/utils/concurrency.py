@@ -0,0 +1,97 @@
+"""Concurrency limits for expensive model calls and shared in-memory resources."""
+
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Optional
+
+
+class ServiceBusyError(RuntimeError):
+    """Raised when no slot frees up within the limiter's queue timeout."""
+
+
+class ConcurrencyLimiter:
+    """
+    Cap concurrent calls to a resource, queueing the excess.
+    
+    Callers that wait longer than `timeout` seconds for a slot get a
+    ServiceBusyError (mapped to 503 by the app) instead of piling on.
+    """
+    
+    def __init__(self, limit: int, timeout: Optional[float] = None, name: str = "service"):
+        self.limit = limit
+        self.timeout = timeout
+        self.name = name
+        self._semaphore = asyncio.Semaphore(limit)
+    
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one slot for the duration of the block."""
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise ServiceBusyError(f"{self.name} is at capacity; try again shortly")
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+
+class ReadWriteLock:
+    """
+    Many concurrent readers or one exclusive writer.
+    
+    Writers are preferred: once a writer is waiting, new readers queue behind it
+    so a steady stream of reads can't starve writes. Waiters are woken together
+    and re-check, which keeps the lock independent of any one event loop.
+    """
+    
+    def __init__(self):
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+    
+    @asynccontextmanager
+    async def read(self) -> AsyncIterator[None]:
+        """Hold the lock shared for the duration of the block."""
+        while self._writer or self._writers_waiting:
+            await self._wait()
+        self._readers += 1
+        try:
+            yield
+        finally:
+            self._readers -= 1
+            if not self._readers:
+                self._wake()
+    
+    @asynccontextmanager
+    async def write(self) -> AsyncIterator[None]:
+        """Hold the lock exclusively for the duration of the block."""
+        self._writers_waiting += 1
+        try:
+            while self._writer or self._readers:
+                await self._wait()
+        except BaseException:
+            # Readers queued behind this writer may go ahead now
+            self._writers_waiting -= 1
+            self._wake()
+            raise
+        self._writers_waiting -= 1
+        self._writer = True
+        try:
+            yield
+        finally:
+            self._writer = False
+            self._wake()
+    
+    async def _wait(self):
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        await future
+    
+    def _wake(self):
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
@@ -0,0 +1,10 @@
+"""Exceptions that services raise for API clients."""
+
+
+class InvalidRequestError(ValueError):
+    """
+    Bad input or a missing prerequisite for a service call (mapped to 400 by the app).
+    
+    Only this type is reported to clients with its message; other ValueErrors,
+    e.g. from libraries, are treated as internal errors.
+    """
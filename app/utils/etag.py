@@ -0,0 +1,42 @@
+"""Conditional GET helpers (ETag / If-None-Match)."""
+
+import hashlib
+from typing import Any, Dict
+
+import orjson
+from fastapi import Request, Response
+
+
+def weak_etag(*parts: Any) -> str:
+    """Build a weak ETag from version-identifying parts (e.g. id and updated_at)."""
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def content_etag(payload: Dict[str, Any]) -> str:
+    """Build a weak ETag from a digest of a small JSON-serializable payload."""
+    digest = hashlib.blake2b(
+        orjson.dumps(payload, option=orjson.OPT_SORT_KEYS),
+        digest_size=8
+    ).hexdigest()
+    return weak_etag(digest)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Check the request's If-None-Match header against an ETag.
+
+    Uses weak comparison, so W/ prefixes on either side are ignored.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+
+    target = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == target for tag in header.split(","))
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    """Empty 304 response carrying the current validators."""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
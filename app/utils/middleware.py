@@ -0,0 +1,67 @@
+"""ASGI middleware."""
+
+import logging
+from typing import Iterable
+
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.responses import ORJSONResponse
+
+logger = logging.getLogger(__name__)
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """
+    GZip middleware that passes selected paths through uncompressed.
+    
+    Used for streaming endpoints (SSE), where compression would buffer
+    events until the compressor flushes.
+    """
+    
+    def __init__(self, app: ASGIApp, exclude_paths: Iterable[str] = (), **kwargs) -> None:
+        super().__init__(app, **kwargs)
+        self.exclude_paths = frozenset(exclude_paths)
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+class UnhandledErrorMiddleware:
+    """
+    Turn unexpected exceptions into a uniform 500 JSON body.
+    
+    An app-level Exception handler runs in Starlette's outermost error
+    middleware, so its response skips CORS (and gzip) and browsers only see an
+    opaque CORS failure. Installed innermost instead, this response passes back
+    through the rest of the stack. Errors raised after the response has started
+    (e.g. mid-stream) can't be replaced and are re-raised.
+    """
+    
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        response_started = False
+        
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as exc:
+            if response_started:
+                raise
+            logger.error(f"Unhandled error on {scope['method']} {scope['path']}", exc_info=exc)
+            response = ORJSONResponse({"detail": "Internal server error"}, status_code=500)
+            await response(scope, receive, send)
@@ -0,0 +1,47 @@
+"""Request coalescing for expensive async work."""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time; concurrent callers share its result.
+
+    The first caller for a key runs the work; callers arriving while it is in
+    flight await the same future and receive the same result or exception.
+    Nothing is cached once the call finishes.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Await func() for key, or join the call already in flight for it."""
+        future = self._in_flight.get(key)
+        if future is not None:
+            # Shield so a cancelled follower doesn't cancel the shared call
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Mark retrieved so an unawaited future doesn't log a warning
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._in_flight.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
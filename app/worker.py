@@ -0,0 +1,61 @@
+"""arq worker for long-running background jobs.
+
+Run with: arq app.worker.WorkerSettings
+"""
+
+from arq import Retry
+from arq.connections import RedisSettings
+
+from app.config.settings import get_settings
+from app.services.pdf_service import PDFService, shutdown_pdf_executor
+from app.services.transcription_service import TranscriptionService
+from app.utils.concurrency import ServiceBusyError
+
+settings = get_settings()
+
+BUSY_RETRY_DELAY_SECONDS = 30
+
+
+async def transcribe_job(ctx, file_id: int, language: str | None, task: str):
+    """Transcribe a file outside the web process."""
+    try:
+        await TranscriptionService.run_transcription_job(
+            file_id,
+            language=language,
+            task=task,
+            retry_when_busy=True
+        )
+    except ServiceBusyError:
+        # Requeue with backoff instead of recording the job as done; the record stays pending
+        raise Retry(defer=BUSY_RETRY_DELAY_SECONDS * ctx["job_try"])
+
+
+async def process_pdf_job(
+    ctx,
+    file_id: int,
+    chunk_size: int | None,
+    chunk_overlap: int | None,
+    strategy: str | None
+):
+    """Extract and chunk a PDF outside the web process."""
+    await PDFService.run_processing_job(
+        file_id,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        strategy=strategy
+    )
+
+
+async def shutdown(ctx):
+    """Stop the PDF extraction process pool so its workers don't outlive the worker."""
+    shutdown_pdf_executor()
+
+
+class WorkerSettings:
+    """arq worker configuration."""
+    
+    functions = [transcribe_job, process_pdf_job]
+    redis_settings = RedisSettings.from_dsn(settings.redis_url or "redis://localhost:6379")
+    on_shutdown = shutdown
+    max_jobs = 2  # Whisper inference and PDF extraction are CPU heavy; keep concurrency low per worker
+    job_timeout = 3600
@@ -11,6 +11,8 @@ if __name__ == "__main__":
         host=settings.host,
         port=8000,  # Local development on default port
         reload=settings.debug,
-        log_level="info"
+        log_level="info",
+        access_log=settings.debug,
+        backlog=2048
     )
 
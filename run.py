@@ -10,6 +10,8 @@ if __name__ == "__main__":
         host=settings.host,
         port=settings.port,
         reload=settings.debug,
-        log_level="info"
+        log_level="info",
+        access_log=settings.debug,
+        backlog=2048
     )
 
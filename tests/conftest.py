@@ -51,6 +51,22 @@ async def _create_tables(test_engine):
         await conn.run_sync(Base.metadata.create_all)
 
 
+@pytest.fixture()
+async def isolated_session_maker():
+    """Sessionmaker on a fresh, empty in-memory DB, for tests that scan whole tables."""
+    from app.config.database import Base
+
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
 @pytest.fixture()
 def uploads_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
     # Force uploads into a temp dir for each test
@@ -88,3 +104,35 @@ async def client(app):
         yield ac
 
 
+
+
+@pytest.fixture()
+def make_file():
+    """
+    Factory adding a FileMetadata row to a session and flushing it (so it has an id).
+
+    Path, size and MIME type default from the filename and type; keyword
+    arguments override any column.
+    """
+    import mimetypes
+
+    from app.models.file import FileMetadata, FileType
+    from app.services.file_service import FileService
+
+    async def _make_file(db, filename, file_type=FileType.PDF, **fields):
+        file_size = fields.pop("file_size", 123)
+        f = FileMetadata(**{
+            "filename": filename,
+            "original_filename": filename,
+            "file_type": file_type,
+            "file_path": f"uploads/{FileService.TYPE_FOLDERS[file_type]}/{filename}",
+            "file_size": file_size,
+            "file_size_mb": file_size / (1024 * 1024),
+            "mime_type": mimetypes.guess_type(filename)[0],
+            **fields,
+        })
+        db.add(f)
+        await db.flush()
+        return f
+
+    return _make_file
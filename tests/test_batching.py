@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from app.utils.batching import BatchWriter
+
+
+@pytest.mark.asyncio
+async def test_concurrent_submits_share_batches():
+    batches = []
+
+    async def flush(items):
+        batches.append(list(items))
+        await asyncio.sleep(0.01)
+        return [item * 10 for item in items]
+
+    writer = BatchWriter(flush, max_batch=3)
+    results = await asyncio.gather(*(writer.submit(i) for i in range(7)))
+
+    assert results == [i * 10 for i in range(7)]
+    # Everything queued before the writer runs is flushed max_batch at a time
+    assert batches == [[0, 1, 2], [3, 4, 5], [6]]
+    assert len(writer) == 0
+
+    # The writer restarts after going idle
+    assert await writer.submit(9) == 90
+
+
+@pytest.mark.asyncio
+async def test_flush_errors_reach_every_item_in_the_batch():
+    async def flush(items):
+        await asyncio.sleep(0)
+        if 2 in items:
+            raise RuntimeError("boom")
+        return items
+
+    writer = BatchWriter(flush)
+    first = asyncio.create_task(writer.submit(1))
+    await asyncio.sleep(0)
+    rest = [asyncio.create_task(writer.submit(i)) for i in (2, 3)]
+
+    assert await first == 1
+    for task in rest:
+        with pytest.raises(RuntimeError, match="boom"):
+            await task
+
+
+@pytest.mark.asyncio
+async def test_exception_results_fail_only_their_item():
+    async def flush(items):
+        return [ValueError(f"bad {item}") if item == 2 else item for item in items]
+
+    writer = BatchWriter(flush)
+    results = await asyncio.gather(*(writer.submit(i) for i in range(4)), return_exceptions=True)
+
+    assert results[0] == 0 and results[1] == 1 and results[3] == 3
+    assert isinstance(results[2], ValueError)
@@ -0,0 +1,48 @@
+from app.utils import cache as cache_module
+from app.utils.cache import TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    c = TTLCache(maxsize=2, ttl=60)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1  # "a" becomes most recently used
+    c.set("c", 3)
+
+    assert c.get("b") is None
+    assert c.get("a") == 1
+    assert c.get("c") == 3
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+
+    c = TTLCache(maxsize=10, ttl=5)
+    c.set("k", "v")
+    assert c.get("k") == "v"
+
+    now[0] += 6
+    assert c.get("k") is None
+    assert len(c) == 0
+
+
+def test_ttl_cache_invalidate():
+    c = TTLCache()
+    c.set(1, "x")
+    c.invalidate(1)
+    c.invalidate(2)  # missing keys are ignored
+    assert c.get(1) is None
+
+
+def test_ttl_cache_stats_count_hits_and_misses():
+    c = TTLCache(maxsize=10, ttl=60)
+    c.get("missing")
+    c.set("k", 1)
+    c.get("k")
+    c.get("k")
+    stats = c.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == round(2 / 3, 4)
+    assert stats["size"] == 1
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from app.utils.concurrency import ConcurrencyLimiter, ReadWriteLock, ServiceBusyError
+
+
+@pytest.mark.asyncio
+async def test_limiter_caps_concurrency():
+    limiter = ConcurrencyLimiter(2, timeout=1.0)
+    active = 0
+    peak = 0
+
+    async def work():
+        nonlocal active, peak
+        async with limiter.slot():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*(work() for _ in range(6)))
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_limiter_raises_busy_after_timeout():
+    limiter = ConcurrencyLimiter(1, timeout=0.01, name="Test service")
+
+    async with limiter.slot():
+        with pytest.raises(ServiceBusyError, match="Test service"):
+            async with limiter.slot():
+                pass
+
+    # The slot is released again once the holder exits
+    async with limiter.slot():
+        pass
+
+
+@pytest.mark.asyncio
+async def test_read_write_lock_shares_reads_and_excludes_writes():
+    lock = ReadWriteLock()
+    events = []
+
+    async def reader(name):
+        async with lock.read():
+            events.append(f"{name} start")
+            await asyncio.sleep(0.02)
+            events.append(f"{name} end")
+
+    async def writer():
+        await asyncio.sleep(0.005)
+        async with lock.write():
+            events.append("write")
+
+    async def late_reader():
+        await asyncio.sleep(0.01)
+        await reader("late")
+
+    await asyncio.gather(reader("a"), reader("b"), writer(), late_reader())
+
+    # Both early readers overlap; the writer waits for them, and the reader
+    # arriving while the writer waits queues behind it
+    assert events[:2] == ["a start", "b start"]
+    assert events.index("write") > events.index("b end")
+    assert events.index("late start") > events.index("write")
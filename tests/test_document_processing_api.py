@@ -0,0 +1,87 @@
+import pytest
+
+from app.models.file import FileType
+from app.models.document_chunk import DocumentChunk
+from app.services import task_queue
+from app.services.pdf_service import PDFService
+
+
+@pytest.mark.asyncio
+async def test_get_file_chunks_paginated(client, session_maker, make_file):
+    async with session_maker() as db:
+        f = await make_file(db, "doc.pdf")
+
+        for idx in range(5):
+            text = f"chunk {idx}"
+            db.add(DocumentChunk(file_id=f.id, chunk_index=idx, text=text, char_count=len(text)))
+        await db.commit()
+
+        file_id = f.id
+
+    r = await client.get(f"/api/v1/files/{file_id}/chunks", params={"limit": 2, "offset": 1})
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert data["total"] == 5
+    assert [c["chunk_index"] for c in data["chunks"]] == [1, 2]
+
+    r = await client.get(f"/api/v1/files/{file_id}/chunks")
+    assert r.status_code == 200, r.text
+    assert len(r.json()["chunks"]) == 5
+
+
+@pytest.mark.asyncio
+async def test_process_pdf_async_enqueues_worker_job(client, session_maker, monkeypatch, make_file):
+    async with session_maker() as db:
+        file_id = (await make_file(db, "queued.pdf")).id
+        await db.commit()
+    enqueued = []
+
+    async def fake_enqueue(job_name, *args):
+        enqueued.append((job_name, *args))
+        return True
+
+    async def fail_process_pdf(*args, **kwargs):
+        raise AssertionError("PDF processing should not run in-process")
+
+    monkeypatch.setattr(task_queue, "enqueue", fake_enqueue)
+    monkeypatch.setattr(PDFService, "process_pdf", fail_process_pdf)
+
+    r = await client.post(f"/api/v1/files/{file_id}/process/async", json={"strategy": "sentence"})
+    assert r.status_code == 202, r.text
+    assert r.json()["progress_channel"] == f"pdf_processing:{file_id}"
+    assert enqueued == [("process_pdf_job", file_id, None, None, "sentence")]
+
+
+@pytest.mark.asyncio
+async def test_process_pdf_async_runs_in_process_without_queue(client, session_maker, monkeypatch, make_file):
+    async with session_maker() as db:
+        file_id = (await make_file(db, "inline.pdf")).id
+        await db.commit()
+    published = []
+
+    async def fake_process_pdf(file_metadata, db, chunk_size=None, chunk_overlap=None, strategy=None, on_progress=None):
+        stats = {"chunks_created": 3, "total_characters": 30, "total_tokens": 0}
+        await on_progress(stats)
+        return stats
+
+    async def fake_publish(channel, message):
+        published.append((channel, message["status"]))
+        return True
+
+    monkeypatch.setattr(PDFService, "process_pdf", fake_process_pdf)
+    monkeypatch.setattr(task_queue, "publish", fake_publish)
+
+    r = await client.post(f"/api/v1/files/{file_id}/process/async", json={})
+    assert r.status_code == 202, r.text
+    channel = f"pdf_processing:{file_id}"
+    assert published == [(channel, "processing"), (channel, "completed")]
+
+
+@pytest.mark.asyncio
+async def test_process_pdf_async_rejects_non_pdf(client, session_maker, make_file):
+    async with session_maker() as db:
+        file_id = (await make_file(db, "song.mp3", FileType.AUDIO)).id
+        await db.commit()
+
+    r = await client.post(f"/api/v1/files/{file_id}/process/async", json={})
+    assert r.status_code == 400, r.text
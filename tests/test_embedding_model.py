@@ -0,0 +1,24 @@
+import numpy as np
+
+from app.models.embedding import ChunkEmbedding
+
+
+def test_embedding_vector_roundtrip():
+    e = ChunkEmbedding(chunk_id=1, embedding_model="test-model")
+    e.set_embedding_vector([0.5, -0.25, 1.0])
+
+    assert isinstance(e.embedding_vector, bytes)
+    assert len(e.embedding_vector) == 3  # one int8 per dimension
+    assert e.embedding_dimension == 3
+    assert np.allclose(e.get_embedding_vector(), [0.5, -0.25, 1.0], atol=1e-2)
+
+
+def test_embedding_vector_reads_float32_rows():
+    vector = np.array([0.1, 0.2], dtype=np.float32)
+    e = ChunkEmbedding(chunk_id=1, embedding_model="test-model", embedding_vector=vector.tobytes())
+    assert np.allclose(e.get_embedding_vector(), vector)
+
+
+def test_embedding_vector_reads_legacy_json():
+    e = ChunkEmbedding(chunk_id=1, embedding_model="test-model", embedding_vector="[1.0, 2.0]")
+    assert np.allclose(e.get_embedding_vector(), [1.0, 2.0])
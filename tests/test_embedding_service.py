@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services.embedding_service import EmbeddingService
+
+
+@pytest.mark.asyncio
+async def test_embed_query_reuses_cached_vector(monkeypatch):
+    EmbeddingService._query_cache.clear()
+    calls = []
+
+    async def fake_generate_embedding(text, model=None):
+        calls.append((text, model))
+        return [0.1, 0.2, 0.3]
+
+    monkeypatch.setattr(EmbeddingService, "generate_embedding", fake_generate_embedding)
+
+    first = await EmbeddingService.embed_query("what is  machine learning?", model="m")
+    second = await EmbeddingService.embed_query(" what is machine learning? ", model="m")
+    assert first == second == [0.1, 0.2, 0.3]
+    assert calls == [("what is machine learning?", "m")]
+
+    # Returned lists are copies; mutating one doesn't corrupt the cache
+    first.append(9.9)
+    assert await EmbeddingService.embed_query("what is machine learning?", model="m") == [0.1, 0.2, 0.3]
+
+    await EmbeddingService.embed_query("what is machine learning?", model="other")
+    assert len(calls) == 2
+    EmbeddingService._query_cache.clear()
+
+
+class _FakeEmbeddings:
+    def __init__(self):
+        self.inputs = []
+
+    async def create(self, model, input):
+        self.inputs.append(input)
+        texts = input if isinstance(input, list) else [input]
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(t))]) for t in texts])
+
+
+@pytest.mark.asyncio
+async def test_generate_embeddings_use_shared_async_client(monkeypatch):
+    from app.services import embedding_service
+
+    fake = SimpleNamespace(embeddings=_FakeEmbeddings())
+    monkeypatch.setattr(embedding_service, "get_async_openai_client", lambda: fake)
+    monkeypatch.setattr(embedding_service.settings, "openai_api_key", "test-key")
+
+    assert await EmbeddingService.generate_embedding("abc", model="m") == [3.0]
+    vectors = await EmbeddingService.generate_embeddings_batch(["a", "bb", "ccc"], model="m", batch_size=2)
+    assert vectors.dtype == np.float32
+    assert vectors.tolist() == [[1.0], [2.0], [3.0]]
+    assert fake.embeddings.inputs == ["abc", ["a", "bb"], ["ccc"]]
+
+
+@pytest.mark.asyncio
+async def test_generate_embeddings_batch_embeds_duplicates_once(monkeypatch):
+    from app.services import embedding_service
+
+    fake = SimpleNamespace(embeddings=_FakeEmbeddings())
+    monkeypatch.setattr(embedding_service, "get_async_openai_client", lambda: fake)
+    monkeypatch.setattr(embedding_service.settings, "openai_api_key", "test-key")
+
+    vectors = await EmbeddingService.generate_embeddings_batch(["a", "bb", "a", "ccc", "bb"], model="m", batch_size=2)
+    assert vectors.tolist() == [[1.0], [2.0], [1.0], [3.0], [2.0]]
+    assert vectors.flags["C_CONTIGUOUS"]
+    assert fake.embeddings.inputs == [["a", "bb"], ["ccc"]]
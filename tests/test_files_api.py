@@ -1,3 +1,5 @@
+import io
+
 import pytest
 
 
@@ -34,3 +36,282 @@ async def test_upload_list_download_delete_roundtrip(client, uploads_dir):
     # Ensure it is gone
     r = await client.get(f"/api/v1/files/{file_id}")
     assert r.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_upload_multiple_files_concurrently(client, uploads_dir):
+    files = [
+        ("files", (f"doc{i}.pdf", b"%PDF-1.4\n%test\n%%EOF\n", "application/pdf"))
+        for i in range(3)
+    ] + [("files", ("empty.pdf", b"", "application/pdf"))]
+
+    r = await client.post("/api/v1/files/upload/multiple", files=files)
+    assert r.status_code == 201, r.text
+    payload = r.json()
+    assert len(payload) == 3
+    assert len({f["id"] for f in payload}) == 3
+    assert sorted(f["original_filename"] for f in payload) == ["doc0.pdf", "doc1.pdf", "doc2.pdf"]
+
+
+@pytest.mark.asyncio
+async def test_upload_over_size_limit_leaves_no_file(client, uploads_dir, monkeypatch):
+    from app.services import file_service
+
+    monkeypatch.setattr(file_service.settings, "max_file_size_mb", 1)
+    files = {"file": ("big.pdf", b"x" * (1024 * 1024 + 1), "application/pdf")}
+
+    r = await client.post("/api/v1/files/upload", files=files)
+    assert r.status_code == 413, r.text
+    assert not [p for p in uploads_dir.rglob("*") if p.is_file()]
+
+
+@pytest.mark.asyncio
+async def test_write_upload_streams_chunks_and_enforces_limit(tmp_path, monkeypatch):
+    from fastapi import HTTPException, UploadFile
+
+    from app.services import file_service
+    from app.services.file_service import FileService
+
+    monkeypatch.setattr(FileService, "UPLOAD_CHUNK_SIZE", 1000)
+    content = bytes(range(256)) * 20
+
+    target = tmp_path / "ok.bin"
+    size = await FileService._write_upload(UploadFile(io.BytesIO(content)), target)
+    assert size == len(content)
+    assert target.read_bytes() == content
+
+    # No declared size: the limit is enforced while streaming
+    monkeypatch.setattr(file_service.settings, "max_file_size_mb", 1)
+    target = tmp_path / "big.bin"
+    with pytest.raises(HTTPException) as exc:
+        await FileService._write_upload(UploadFile(io.BytesIO(b"x" * (1024 * 1024 + 1))), target)
+    assert exc.value.status_code == 413
+    assert not target.exists()
+
+
+@pytest.mark.asyncio
+async def test_write_upload_copies_spooled_file_with_sendfile(tmp_path, monkeypatch):
+    import os
+    import tempfile
+
+    from fastapi import UploadFile
+
+    from app.services.file_service import FileService
+
+    if not hasattr(os, "sendfile"):
+        pytest.skip("os.sendfile not available")
+
+    calls = []
+    real_sendfile = os.sendfile
+
+    def counting_sendfile(*args):
+        calls.append(args)
+        return real_sendfile(*args)
+
+    monkeypatch.setattr(os, "sendfile", counting_sendfile)
+
+    content = os.urandom(64 * 1024)
+    spool = tempfile.SpooledTemporaryFile(max_size=1024)
+    spool.write(content)  # exceeds max_size, so it rolls over to a real file
+    spool.seek(0)
+
+    target = tmp_path / "spooled.bin"
+    size = await FileService._write_upload(UploadFile(spool), target)
+    assert size == len(content)
+    assert target.read_bytes() == content
+    assert calls
+
+
+@pytest.mark.parametrize(
+    ("filename", "mime_type", "expected"),
+    [
+        ("a.bin", "application/pdf", "pdf"),
+        ("clip.MKV", None, "video"),
+        ("song.m4a", "application/octet-stream", "audio"),
+        ("notes.txt", None, "document"),
+        ("archive.zip", None, "other"),
+    ],
+)
+def test_get_file_type_prefers_mime_then_extension(filename, mime_type, expected):
+    from app.services.file_service import FileService
+
+    assert FileService._get_file_type(filename, mime_type).value == expected
+
+
+def test_generate_filename_sanitizes_and_is_unique():
+    from app.services.file_service import FileService
+
+    names = {FileService._generate_filename("My Résumé (v2)!.pdf") for _ in range(100)}
+    assert len(names) == 100
+    name = names.pop()
+    assert name.startswith("My Résumé v2_")
+    assert name.endswith(".pdf")
+
+
+@pytest.mark.asyncio
+async def test_delete_file_removes_related_rows_and_disk_file(session_maker, uploads_dir, make_file):
+    from sqlalchemy import func, select
+
+    from app.models.document_chunk import DocumentChunk
+    from app.models.embedding import ChunkEmbedding
+    from app.models.file import FileMetadata, FileType
+    from app.models.transcription import Transcription
+    from app.services.file_service import FileService
+
+    disk_file = uploads_dir / "audio" / "cascade.mp3"
+    disk_file.parent.mkdir(parents=True, exist_ok=True)
+    disk_file.write_bytes(b"ID3")
+
+    async with session_maker() as db:
+        f = await make_file(db, "cascade.mp3", FileType.AUDIO, file_path=str(disk_file))
+        db.add(Transcription(file_id=f.id, full_text="hello", status="completed"))
+        chunks = await DocumentChunk.bulk_create(db, [
+            {"file_id": f.id, "chunk_index": idx, "text": f"c {idx}", "char_count": 3}
+            for idx in range(2)
+        ])
+        await ChunkEmbedding.bulk_create(db, [
+            {"chunk_id": chunk.id, "embedding_model": "m", **ChunkEmbedding.pack_embedding_vector([1.0, 0.0])}
+            for chunk in chunks
+        ])
+        await db.commit()
+        file_id = f.id
+        chunk_ids = [c.id for c in chunks]
+
+    async with session_maker() as db:
+        assert await FileService.delete_file(file_id, db) is True
+        assert await FileService.delete_file(file_id, db) is False
+
+    assert not disk_file.exists()
+    async with session_maker() as db:
+        assert await db.scalar(select(func.count()).select_from(Transcription).where(Transcription.file_id == file_id)) == 0
+        assert await db.scalar(select(func.count()).select_from(DocumentChunk).where(DocumentChunk.file_id == file_id)) == 0
+        assert await db.scalar(
+            select(func.count()).select_from(ChunkEmbedding).where(ChunkEmbedding.chunk_id.in_(chunk_ids))
+        ) == 0
+        assert await db.get(FileMetadata, file_id) is None
+
+
+@pytest.mark.asyncio
+async def test_list_files_total_matches_count_on_every_page(session_maker, make_file):
+    from sqlalchemy import func, select
+
+    from app.models.file import FileMetadata, FileType
+    from app.services.file_service import FileService
+
+    async with session_maker() as db:
+        for idx in range(3):
+            await make_file(db, f"list{idx}.png", FileType.IMAGE)
+        await db.commit()
+
+    async with session_maker() as db:
+        expected = await db.scalar(
+            select(func.count()).select_from(FileMetadata).where(FileMetadata.file_type == FileType.IMAGE)
+        )
+        files, total = await FileService.list_files(db, file_type=FileType.IMAGE, page=1, page_size=2)
+        assert len(files) == 2
+        assert all(isinstance(f, FileMetadata) for f in files)
+        assert total == expected
+
+        files, total = await FileService.list_files(db, file_type=FileType.IMAGE, page=100, page_size=2)
+        assert files == []
+        assert total == expected
+
+
+@pytest.mark.asyncio
+async def test_concurrent_uploads_group_commit_metadata(client, uploads_dir, monkeypatch):
+    import asyncio
+
+    from app.services import file_service
+    from app.services.file_service import FileService
+    from app.utils.batching import BatchWriter
+
+    batch_sizes = []
+
+    async def recording_insert(rows):
+        batch_sizes.append(len(rows))
+        return await file_service._insert_file_metadata(rows)
+
+    monkeypatch.setattr(FileService, "_metadata_writer", BatchWriter(recording_insert))
+
+    responses = await asyncio.gather(*(
+        client.post("/api/v1/files/upload", files={"file": (f"group{i}.pdf", b"%PDF-1.4\n%%EOF\n", "application/pdf")})
+        for i in range(5)
+    ))
+    assert all(r.status_code == 201 for r in responses), [r.text for r in responses]
+    assert len({r.json()["id"] for r in responses}) == 5
+    assert sum(batch_sizes) == 5
+
+
+@pytest.mark.asyncio
+async def test_metadata_batch_conflict_fails_only_the_offending_row(app):
+    from sqlalchemy.exc import IntegrityError
+
+    from app.models.file import FileType
+    from app.services import file_service
+
+    def row(name, path):
+        return {
+            "filename": name,
+            "original_filename": name,
+            "file_type": FileType.PDF,
+            "file_path": path,
+            "file_size": 1,
+            "file_size_mb": 0.0,
+            "mime_type": "application/pdf",
+        }
+
+    results = await file_service._insert_file_metadata([
+        row("ok1.pdf", "uploads/pdfs/batch-ok1.pdf"),
+        row("dup1.pdf", "uploads/pdfs/batch-dup.pdf"),
+        row("dup2.pdf", "uploads/pdfs/batch-dup.pdf"),
+        row("ok2.pdf", "uploads/pdfs/batch-ok2.pdf"),
+    ])
+
+    assert isinstance(results[2], IntegrityError)
+    assert [r.original_filename for r in results if not isinstance(r, Exception)] == ["ok1.pdf", "dup1.pdf", "ok2.pdf"]
+
+
+@pytest.mark.asyncio
+async def test_write_upload_copies_in_memory_spool_in_one_call(tmp_path):
+    import tempfile
+
+    from fastapi import UploadFile
+
+    from app.services.file_service import FileService
+
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    spool.write(b"small upload")
+    spool.seek(0)
+    assert not spool._rolled
+
+    target = tmp_path / "small.txt"
+    assert await FileService._write_upload(UploadFile(spool), target) == len(b"small upload")
+    assert target.read_bytes() == b"small upload"
+    assert not spool._rolled
+
+
+@pytest.mark.asyncio
+async def test_large_media_upload_schedules_page_cache_drop(client, uploads_dir, monkeypatch):
+    import asyncio
+
+    from app.services.file_service import FileService
+
+    dropped = []
+    monkeypatch.setattr(FileService, "CACHE_DROP_MIN_BYTES", 1024)
+    monkeypatch.setattr(FileService, "_drop_page_cache", staticmethod(dropped.append))
+
+    r = await client.post("/api/v1/files/upload", files={"file": ("big.mp3", b"\0" * 4096, "audio/mpeg")})
+    assert r.status_code == 201, r.text
+    r = await client.post("/api/v1/files/upload", files={"file": ("big.pdf", b"\0" * 4096, "application/pdf")})
+    assert r.status_code == 201, r.text
+
+    while FileService._background_tasks:
+        await asyncio.sleep(0.01)
+    assert [p.suffix for p in dropped] == [".mp3"]
+
+
+@pytest.mark.asyncio
+async def test_upload_of_unknown_extension_is_rejected(client, uploads_dir):
+    r = await client.post("/api/v1/files/upload", files={"file": ("data.xyz", b"abc", "application/octet-stream")})
+    assert r.status_code == 400
+    assert "not allowed" in r.json()["detail"]
@@ -1,6 +1,7 @@
 import pytest
 
 from app.models.file import FileMetadata, FileType
+from app.services.media_playback_service import MediaPlaybackService
 
 
 @pytest.mark.asyncio
@@ -29,3 +30,80 @@ async def test_media_playback_endpoint(client, session_maker):
     assert data["file_url"].endswith(f"/api/v1/files/{file_id}/download")
 
 
+@pytest.mark.asyncio
+async def test_media_playback_missing_file_returns_400(client):
+    r = await client.get("/api/v1/files/999999/playback")
+    assert r.status_code == 400
+    assert r.json() == {"detail": "File 999999 not found"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("error", [RuntimeError("boom"), ValueError("library detail")])
+async def test_unexpected_errors_return_500_with_cors_headers(client, monkeypatch, error):
+    async def fail(*args, **kwargs):
+        raise error
+
+    monkeypatch.setattr(MediaPlaybackService, "get_playback_info", fail)
+
+    r = await client.get("/api/v1/files/1/playback", headers={"Origin": "http://localhost:3000"})
+    assert r.status_code == 500
+    assert r.json() == {"detail": "Internal server error"}
+    assert r.headers["access-control-allow-origin"] == "http://localhost:3000"
+
+
+@pytest.mark.asyncio
+async def test_media_playback_conditional_get(client, session_maker, make_file):
+    async with session_maker() as db:
+        f = await make_file(db, "etag.mp3", FileType.AUDIO)
+        await db.commit()
+        await db.refresh(f)
+        file_id = f.id
+
+    url = f"/api/v1/files/{file_id}/playback"
+    r = await client.get(url, params={"timestamp": 5})
+    assert r.status_code == 200
+    etag = r.headers["etag"]
+
+    r = await client.get(url, params={"timestamp": 5}, headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+
+    # A different seek position is a different representation
+    r = await client.get(url, params={"timestamp": 6}, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_media_playback_post_and_path_variants(client, session_maker, make_file):
+    async with session_maker() as db:
+        f = await make_file(db, "variants.mp4", FileType.VIDEO)
+        await db.commit()
+        await db.refresh(f)
+        file_id = f.id
+
+    r = await client.post(f"/api/v1/files/{file_id}/playback", json={"timestamp": 7.0})
+    assert r.status_code == 200, r.text
+    assert r.json()["timestamp"] == 7.0
+    assert "etag" not in r.headers
+
+    r = await client.get(f"/api/v1/files/{file_id}/playback/from-timestamp/3")
+    assert r.status_code == 200, r.text
+    assert r.json()["timestamp"] == 3.0
+
+
+def test_media_playback_get_has_no_request_body(app):
+    operations = app.openapi()["paths"]["/api/v1/files/{file_id}/playback"]
+    assert "requestBody" not in operations["get"]
+    assert "requestBody" in operations["post"]
+
+
+def test_format_timestamp_rounds_to_milliseconds():
+    assert MediaPlaybackService._format_timestamp(0) == "00:00.000"
+    assert MediaPlaybackService._format_timestamp(61.2) == "01:01.200"
+    assert MediaPlaybackService._format_timestamp(2.3) == "00:02.300"
+    assert MediaPlaybackService._format_timestamp(3725.0425) == "01:02:05.042"
+
+
+
+def test_generate_file_url():
+    assert MediaPlaybackService._generate_file_url(7, None) == "/api/v1/files/7/download"
@@ -0,0 +1,223 @@
+import asyncio
+import sys
+import types
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql.asyncpg import PGDialect_asyncpg
+
+from app.models.document_chunk import DocumentChunk, ZSTD_MAGIC
+from app.services import pdf_service
+from app.services.pdf_service import PDFService
+
+
+@pytest.mark.asyncio
+async def test_document_chunk_bulk_create_returns_ids_in_order(session_maker, make_file):
+    async with session_maker() as db:
+        f = await make_file(db, "bulk.pdf")
+
+        rows = [
+            {"file_id": f.id, "chunk_index": idx, "text": f"text {idx}", "char_count": 6}
+            for idx in range(3)
+        ]
+        chunks = await DocumentChunk.bulk_create(db, rows)
+        await db.commit()
+
+    assert [c.chunk_index for c in chunks] == [0, 1, 2]
+    assert all(c.id is not None for c in chunks)
+    assert all(c.created_at is not None for c in chunks)
+
+
+def test_page_ranges_cover_every_page_once():
+    assert pdf_service._page_ranges(10, 4) == [(0, 3), (3, 6), (6, 8), (8, 10)]
+    assert pdf_service._page_ranges(3, 8) == [(0, 1), (1, 2), (2, 3)]
+    assert pdf_service._page_ranges(0, 4) == [(0, 0)]
+
+
+@pytest.mark.asyncio
+async def test_iter_pdf_pages_short_pdf_skips_process_pool(monkeypatch, tmp_path):
+    class FakePage:
+        def __init__(self, text):
+            self.text = text
+
+        def extract_text(self):
+            return self.text
+
+    class FakePDF:
+        pages = [FakePage("one"), FakePage(""), FakePage("three")]
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    fake = types.ModuleType("pdfplumber")
+    fake.open = lambda path: FakePDF()
+    monkeypatch.setitem(sys.modules, "pdfplumber", fake)
+    monkeypatch.setattr(pdf_service, "PDFIUM_AVAILABLE", False)
+    monkeypatch.setattr(pdf_service, "_get_pdf_executor", lambda: pytest.fail("pool used for a short PDF"))
+
+    pages = await asyncio.to_thread(list, pdf_service._iter_pdf_pages(str(tmp_path / "short.pdf")))
+    assert pages == ["one", "three"]
+
+
+def test_extract_page_range_pdfium_normalizes_line_endings(monkeypatch):
+    closed = []
+
+    class FakeTextPage:
+        def __init__(self, text):
+            self.text = text
+
+        def get_text_range(self):
+            return self.text
+
+        def close(self):
+            closed.append("textpage")
+
+    class FakePage(FakeTextPage):
+        def get_textpage(self):
+            return FakeTextPage(self.text)
+
+        def close(self):
+            closed.append("page")
+
+    class FakeDocument:
+        def __init__(self, path):
+            self.pages = [FakePage("a\r\nb"), FakePage("  "), FakePage("c")]
+
+        def __getitem__(self, index):
+            return self.pages[index]
+
+        def close(self):
+            closed.append("document")
+
+    monkeypatch.setattr(pdf_service, "pdfium", types.SimpleNamespace(PdfDocument=FakeDocument), raising=False)
+    monkeypatch.setattr(pdf_service, "PDFIUM_AVAILABLE", True)
+
+    assert pdf_service._extract_page_range("doc.pdf", 0, 3) == ["a\nb", "c"]
+    assert closed.count("page") == 3 and closed[-1] == "document"
+
+
+PAGES = [
+    "First page talks about cats. It ends mid",
+    "sentence on the second page! Then a paragraph.\n\nAnother paragraph here.   ",
+    "Last page. Short.",
+]
+
+
+@pytest.mark.parametrize("strategy", ["fixed", "sentence", "paragraph"])
+def test_chunk_stream_matches_chunking_joined_text(strategy):
+    expected = PDFService._split_text_into_chunks("\n\n".join(PAGES), 30, 8, strategy)
+    assert list(PDFService._chunk_stream(PAGES, 30, 8, strategy)) == expected
+    assert expected
+
+
+@pytest.mark.asyncio
+async def test_process_pdf_inserts_chunks_in_batches(monkeypatch, session_maker, tmp_path, make_file):
+    pdf_path = tmp_path / "streamed.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4")
+    monkeypatch.setattr(pdf_service, "_iter_pdf_pages", lambda path: iter(PAGES))
+    monkeypatch.setattr(pdf_service, "CHUNK_INSERT_BATCH", 2)
+
+    async with session_maker() as db:
+        f = await make_file(db, "streamed.pdf", file_path=str(pdf_path))
+        await db.commit()
+
+        stats = await PDFService.process_pdf(f, db, chunk_size=30, chunk_overlap=8, strategy="fixed")
+        chunks = await PDFService.get_chunks_by_file_id(f.id, db)
+
+    expected = PDFService._split_text_into_chunks("\n\n".join(PAGES), 30, 8, "fixed")
+    assert stats["chunks_created"] == len(expected) == len(chunks)
+    assert [c.chunk_index for c in chunks] == list(range(len(expected)))
+    assert [c.text for c in chunks] == [c["text"] for c in expected]
+    assert stats["total_characters"] == sum(len(c["text"]) for c in expected)
+
+
+@pytest.mark.asyncio
+async def test_document_chunk_bulk_insert_uses_copy_on_asyncpg():
+    copied = {}
+
+    class FakeDriverConnection:
+        async def copy_records_to_table(self, table, records, columns):
+            copied.update(table=table, records=records, columns=columns)
+
+    class FakeConnection:
+        dialect = PGDialect_asyncpg()
+
+        async def get_raw_connection(self):
+            return types.SimpleNamespace(driver_connection=FakeDriverConnection())
+
+    class FakeSession:
+        async def connection(self):
+            return FakeConnection()
+
+        async def execute(self, *args, **kwargs):
+            raise AssertionError("COPY path should not run an INSERT")
+
+    await DocumentChunk.bulk_insert(FakeSession(), [
+        {"file_id": 1, "chunk_index": 0, "text": "hello", "char_count": 5},
+    ])
+
+    assert copied["table"] == "document_chunks"
+    assert copied["columns"][:4] == ["file_id", "chunk_index", "text", "char_count"]
+    assert copied["records"] == [(1, 0, b"hello", 5, None, None, None, None, None)]
+
+
+@pytest.mark.asyncio
+async def test_document_chunk_text_is_compressed_at_rest(session_maker, make_file):
+    long_text = "The quick brown fox jumps over the lazy dog. " * 20
+    async with session_maker() as db:
+        f = await make_file(db, "zstd.pdf")
+
+        await DocumentChunk.bulk_insert(db, [
+            {"file_id": f.id, "chunk_index": 0, "text": long_text, "char_count": len(long_text)},
+            {"file_id": f.id, "chunk_index": 1, "text": "short", "char_count": 5},
+        ])
+        raw = (await db.execute(
+            text("SELECT text FROM document_chunks WHERE file_id = :file_id ORDER BY chunk_index"),
+            {"file_id": f.id}
+        )).scalars().all()
+        texts = (await db.scalars(
+            select(DocumentChunk.text).where(DocumentChunk.file_id == f.id).order_by(DocumentChunk.chunk_index)
+        )).all()
+        await db.rollback()
+
+    assert raw[0].startswith(ZSTD_MAGIC) and len(raw[0]) < len(long_text)
+    assert raw[1] == b"short"
+    assert texts == [long_text, "short"]
+
+
+def test_chunk_token_counts_are_batched(monkeypatch):
+    calls = []
+
+    def fake_batch(texts):
+        calls.append(len(texts))
+        return [len(text) // 4 for text in texts]
+
+    monkeypatch.setattr(PDFService, "_estimate_tokens_batch", staticmethod(fake_batch))
+    chunks = list(PDFService._with_token_counts(iter([{"text": "x" * n} for n in range(5)]), batch_size=2))
+
+    assert calls == [2, 2, 1]
+    assert [c["token_count"] for c in chunks] == [0, 0, 0, 0, 1]
+
+
+def test_estimate_tokens_batch_fallback_without_tiktoken(monkeypatch):
+    monkeypatch.setattr(pdf_service, "TIKTOKEN_AVAILABLE", False)
+    assert PDFService._estimate_tokens_batch(["abcdefgh", "abc"]) == [2, 0]
+
+
+@pytest.mark.asyncio
+async def test_summary_pdf_content_streams_chunk_texts_in_order(session_maker, make_file):
+    from app.services.summarization_service import SummarizationService
+
+    async with session_maker() as db:
+        f = await make_file(db, "summary.pdf")
+        await DocumentChunk.bulk_insert(db, [
+            {"file_id": f.id, "chunk_index": idx, "text": f"part {idx}", "char_count": 6}
+            for idx in (2, 0, 1)
+        ])
+        await db.commit()
+
+        assert await SummarizationService._get_pdf_content(f.id, db) == "part 0\n\npart 1\n\npart 2"
+        assert await SummarizationService._get_pdf_content(-1, db) == ""
@@ -78,3 +78,96 @@ async def test_qa_stream_endpoint_mocked(client, monkeypatch):
     assert "final_response" in body
 
 
+
+
+@pytest.mark.asyncio
+async def test_qa_rejects_blank_question(client):
+    r = await client.post("/api/v1/ask", json={"question": "  "})
+    assert r.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_qa_stream_is_not_compressed(client, monkeypatch):
+    async def fake_stream(*args, **kwargs):
+        yield {"answer_chunk": "x" * 4096}
+
+    monkeypatch.setattr(RAGService, "answer_question_with_streaming", fake_stream)
+
+    r = await client.post(
+        "/api/v1/ask/stream",
+        json={"question": "stream"},
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert r.status_code == 200
+    assert "content-encoding" not in r.headers
+
+
+@pytest.mark.asyncio
+async def test_streaming_answer_uses_shared_async_client(monkeypatch):
+    from types import SimpleNamespace
+    from app.services import rag_service
+    from app.services.semantic_search_service import SemanticSearchService
+
+    async def fake_search(**kwargs):
+        return [{"chunk_id": 1, "file_id": 1, "chunk_index": 0, "text": "context", "score": 0.5}]
+
+    async def fake_stream():
+        for piece in ["Hel", None, "lo"]:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+    class FakeCompletions:
+        async def create(self, **kwargs):
+            assert kwargs["stream"] is True
+            return fake_stream()
+
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+    monkeypatch.setattr(rag_service, "get_async_openai_client", lambda: fake)
+    monkeypatch.setattr(rag_service.settings, "openai_api_key", "test-key")
+    monkeypatch.setattr(SemanticSearchService, "search", staticmethod(fake_search))
+
+    events = [event async for event in RAGService.answer_question_with_streaming("q?", db=None)]
+    assert [e["content"] for e in events if e["type"] == "content"] == ["Hel", "lo"]
+    assert events[-1]["type"] == "sources"
+
+
+@pytest.mark.asyncio
+async def test_answer_question_dedupes_and_sorts_timestamps(monkeypatch):
+    from types import SimpleNamespace
+    from app.services import rag_service
+    from app.services.semantic_search_service import SemanticSearchService
+    from app.services.timestamp_service import TimestampService
+
+    async def fake_search(**kwargs):
+        return [
+            {"chunk_id": i, "file_id": 1, "chunk_index": i, "text": f"chunk {i}", "score": 0.5}
+            for i in range(2)
+        ]
+
+    async def fake_timestamps(items, db):
+        seg = lambda start, text: {"start": start, "end": start + 1, "text": text, "duration": 1.0}
+        return [[seg(10.0, "a"), seg(30.0, "b")], [seg(10.0, "a again"), seg(20.0, "c")]]
+
+    class FakeCompletions:
+        async def create(self, **kwargs):
+            message = SimpleNamespace(content=" answer ")
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+    monkeypatch.setattr(rag_service, "get_async_openai_client", lambda: fake)
+    monkeypatch.setattr(rag_service.settings, "openai_api_key", "test-key")
+    monkeypatch.setattr(SemanticSearchService, "search", staticmethod(fake_search))
+    monkeypatch.setattr(TimestampService, "extract_timestamps_for_texts", staticmethod(fake_timestamps))
+
+    result = await RAGService.answer_question("q?", db=None)
+    assert result["answer"] == "answer"
+    assert [(ts["start"], ts["text"]) for ts in result["timestamps"]] == [(10.0, "a"), (20.0, "c"), (30.0, "b")]
+    assert len(result["sources"][1]["timestamps"]) == 2
+
+
+def test_build_context_from_chunks_format():
+    context = RAGService._build_context_from_chunks([
+        {"text": " first "},
+        {"text": ""},
+        {"text": "third", "page_number": 3},
+    ])
+    assert context == "[Chunk 1]\nfirst\n\n[Chunk 3 (Page 3)]\nthird\n"
@@ -0,0 +1,143 @@
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from app.models.document_chunk import DocumentChunk
+from app.models.embedding import ChunkEmbedding
+from app.services.embedding_service import EmbeddingService
+from app.services.semantic_search_service import SemanticSearchService
+
+
+@pytest.mark.asyncio
+async def test_file_scoped_search_ranks_file_embeddings(session_maker, monkeypatch, make_file):
+    async with session_maker() as db:
+        files = []
+        for name in ("scoped-a.pdf", "scoped-b.pdf"):
+            f = await make_file(db, name)
+            files.append(f)
+        await db.flush()
+
+        vectors = {
+            (0, 0): [1.0, 0.0, 0.0],
+            (0, 1): [0.0, 1.0, 0.0],
+            (0, 2): [0.9, 0.1, 0.0],
+            (1, 0): [1.0, 0.0, 0.0],  # closest overall, but in the other file
+        }
+        rows = [
+            {"file_id": files[f].id, "chunk_index": idx, "text": f"chunk {f}-{idx}", "char_count": 9}
+            for f, idx in vectors
+        ]
+        chunks = await DocumentChunk.bulk_create(db, rows)
+        await ChunkEmbedding.bulk_create(db, [
+            {"chunk_id": chunk.id, "embedding_model": "m", **ChunkEmbedding.pack_embedding_vector(vector)}
+            for chunk, vector in zip(chunks, vectors.values())
+        ])
+        await db.commit()
+        file_id = files[0].id
+
+    async def fake_embed_query(text, model=None):
+        return [1.0, 0.0, 0.0]
+
+    monkeypatch.setattr(EmbeddingService, "embed_query", fake_embed_query)
+
+    async with session_maker() as db:
+        results = await SemanticSearchService.search("q", db, top_k=2, file_id=file_id)
+
+    assert [r["text"] for r in results] == ["chunk 0-0", "chunk 0-2"]
+    assert all(r["file_id"] == file_id for r in results)
+    assert results[0]["distance"] == pytest.approx(0.0, abs=1e-3)
+
+    async with session_maker() as db:
+        streamed = [
+            r async for r in SemanticSearchService.search_iter("q", db, top_k=2, file_id=file_id, batch_size=1)
+        ]
+    assert streamed == results
+
+
+class _FakeVectorStore:
+    def __init__(self):
+        self.added = []
+
+    async def add_embeddings(self, chunk_ids, vectors):
+        self.added.extend(chunk_ids)
+
+    def save_index(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_generate_embeddings_inserts_new_and_updates_existing(session_maker, monkeypatch, make_file):
+    from app.services import semantic_search_service
+
+    async with session_maker() as db:
+        f = await make_file(db, "reembed.pdf")
+        chunks = await DocumentChunk.bulk_create(db, [
+            {"file_id": f.id, "chunk_index": idx, "text": f"re {idx}", "char_count": 4}
+            for idx in range(2)
+        ])
+        await ChunkEmbedding.bulk_create(db, [
+            {"chunk_id": chunks[0].id, "embedding_model": "old", **ChunkEmbedding.pack_embedding_vector([0.0, 1.0])}
+        ])
+        await db.commit()
+        chunk_ids = [c.id for c in chunks]
+
+    async def fake_batch(texts, model=None):
+        return np.array([[1.0, 0.0]] * len(texts), dtype=np.float32)
+
+    store = _FakeVectorStore()
+    monkeypatch.setattr(EmbeddingService, "generate_embeddings_batch", fake_batch)
+    monkeypatch.setattr(semantic_search_service, "get_vector_store", lambda: store)
+
+    async with session_maker() as db:
+        result = await SemanticSearchService.generate_embeddings_for_chunks(chunk_ids, db, model="new")
+        assert set(result) == set(chunk_ids)
+        assert result[chunk_ids[0]].embedding_model == "new"
+
+    assert sorted(store.added) == sorted(chunk_ids)
+
+    async with session_maker() as db:
+        rows = (await db.execute(
+            select(ChunkEmbedding).where(ChunkEmbedding.chunk_id.in_(chunk_ids))
+        )).scalars().all()
+    assert len(rows) == 2
+    assert all(r.embedding_model == "new" for r in rows)
+    assert all(np.allclose(r.get_embedding_vector(), [1.0, 0.0], atol=1e-2) for r in rows)
+
+
+@pytest.mark.asyncio
+async def test_file_scoped_search_int8_distances_match_dequantized(session_maker, make_file):
+    rng = np.random.default_rng(7)
+    vectors = rng.standard_normal((6, 4)).astype(np.float32)
+    query = rng.standard_normal(4).astype(np.float32)
+
+    async with session_maker() as db:
+        files = []
+        for name in ("int8-a.pdf", "int8-b.pdf"):
+            f = await make_file(db, name)
+            files.append(f)
+        await db.flush()
+        chunks = await DocumentChunk.bulk_create(db, [
+            {"file_id": f.id, "chunk_index": idx, "text": f"q {idx}", "char_count": 3}
+            for f in files
+            for idx in range(3)
+        ])
+        packed = [ChunkEmbedding.pack_embedding_vector(vec) for vec in vectors]
+        # Second file holds one unquantized float32 row, forcing the decode path
+        packed[3] = {"embedding_vector": vectors[3].tobytes(), "scale": None, "embedding_dimension": 4}
+        embeddings = await ChunkEmbedding.bulk_create(db, [
+            {"chunk_id": chunk.id, "embedding_model": "m", **values}
+            for chunk, values in zip(chunks, packed)
+        ])
+        await db.commit()
+        expected = {
+            e.chunk_id: float(np.sum((e.get_embedding_vector() - query) ** 2))
+            for e in embeddings
+        }
+
+    async with session_maker() as db:
+        for f in files:
+            results = await SemanticSearchService._search_within_file(query.tolist(), f.id, 3, db)
+            assert len(results) == 3
+            assert [d for _, d in results] == sorted(d for _, d in results)
+            for chunk_id, distance in results:
+                assert distance == pytest.approx(expected[chunk_id], rel=1e-4, abs=1e-4)
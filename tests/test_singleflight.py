@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+from app.utils.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_run():
+    flight = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "done"
+
+    results = await asyncio.gather(*(flight.run("k", work) for _ in range(5)))
+    assert results == ["done"] * 5
+    assert calls == 1
+    assert len(flight) == 0
+
+    # Finished calls are not cached
+    assert await flight.run("k", work) == "done"
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate_to_all_callers():
+    flight = SingleFlight()
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise ValueError("bad")
+
+    results = await asyncio.gather(flight.run("k", boom), flight.run("k", boom), return_exceptions=True)
+    assert all(isinstance(r, ValueError) for r in results)
+    assert len(flight) == 0
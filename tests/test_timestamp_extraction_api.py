@@ -44,3 +44,7 @@ async def test_timestamp_extraction_endpoint(client, session_maker):
     assert any(ts["start"] == 10.0 for ts in data["timestamps"])
 
 
+@pytest.mark.asyncio
+async def test_timestamp_extraction_rejects_blank_text(client):
+    r = await client.post("/api/v1/files/1/timestamps", json={"text": "   "})
+    assert r.status_code == 422
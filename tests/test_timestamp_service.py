@@ -1,3 +1,7 @@
+import pytest
+
+from app.models.file import FileType
+from app.models.transcription import Transcription
 from app.services.timestamp_service import TimestampService
 
 
@@ -24,3 +28,45 @@ def test_format_timestamp():
     assert TimestampService.format_timestamp(61.2) == "01:01.200"
 
 
+def test_find_matching_segments_with_precomputed_words():
+    segments = [
+        {"start": 0.0, "end": 2.0, "text": "Machine learning is fun"},
+        {"start": 30.0, "end": 32.0, "text": "Cooking pasta tonight"},
+    ]
+    words = TimestampService._segment_word_sets(segments)
+    assert TimestampService._find_matching_segments("machine learning", segments, words) == \
+        TimestampService._find_matching_segments("machine learning", segments)
+    matches = TimestampService._find_matching_segments("machine learning", segments, words)
+    assert [m["start"] for m in matches] == [0.0]
+
+
+@pytest.mark.asyncio
+async def test_extract_timestamps_for_texts_batches_files(session_maker, make_file):
+    async with session_maker() as db:
+        files = [
+            await make_file(db, "timestamps-talk.mp3", FileType.AUDIO),
+            await make_file(db, "timestamps-notes.pdf"),
+            await make_file(db, "timestamps-silent.mp4", FileType.VIDEO),
+        ]
+        db.add(Transcription(
+            file_id=files[0].id,
+            full_text="Machine learning talk.",
+            status="completed",
+            segments=[
+                {"start": 1.0, "end": 2.0, "text": "Machine learning basics"},
+                {"start": 5.0, "end": 6.0, "text": "Cooking pasta"},
+            ],
+        ))
+        await db.commit()
+
+        results = await TimestampService.extract_timestamps_for_texts([
+            (files[0].id, "machine learning"),
+            (files[1].id, "machine learning"),
+            (files[2].id, "machine learning"),
+            (files[0].id, "quantum physics"),
+        ], db)
+
+    assert [ts["start"] for ts in results[0]] == [1.0]
+    assert results[1] is None
+    assert results[2] is None
+    assert results[3] == []
@@ -0,0 +1,179 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models.file import FileType
+from app.models.transcription import Transcription
+from app.services.file_service import FileService
+from app.services.transcription_service import TranscriptionService
+from app.utils.concurrency import ConcurrencyLimiter, ServiceBusyError
+
+
+@pytest.mark.asyncio
+async def test_transcribe_async_endpoint(client, session_maker, monkeypatch, make_file):
+    async with session_maker() as db:
+        f = await make_file(db, "talk.mp3", FileType.AUDIO)
+        await db.commit()
+        await db.refresh(f)
+
+        file_id = f.id
+
+    calls = []
+
+    async def fake_transcribe_file(file_metadata, db, language=None, task="transcribe"):
+        calls.append((file_metadata.id, language, task))
+
+    monkeypatch.setattr(TranscriptionService, "transcribe_file", fake_transcribe_file)
+
+    r = await client.post(f"/api/v1/files/{file_id}/transcribe/async", json={"task": "transcribe"})
+    assert r.status_code == 202, r.text
+    data = r.json()
+    assert data["file_id"] == file_id
+    assert data["status"] == "pending"
+    assert calls == [(file_id, None, "transcribe")]
+
+    r = await client.post("/api/v1/files/999999/transcribe/async", json={})
+    assert r.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_transcribe_async_uses_worker_queue_when_configured(client, session_maker, monkeypatch, make_file):
+    from app.services import task_queue
+
+    async with session_maker() as db:
+        f = await make_file(db, "queued.mp3", FileType.AUDIO)
+        await db.commit()
+        await db.refresh(f)
+
+        file_id = f.id
+
+    enqueued = []
+
+    async def fake_enqueue(job_name, *args):
+        enqueued.append((job_name, *args))
+        return True
+
+    async def fail_transcribe_file(*args, **kwargs):
+        raise AssertionError("transcription should not run in-process")
+
+    monkeypatch.setattr(task_queue, "enqueue", fake_enqueue)
+    monkeypatch.setattr(TranscriptionService, "transcribe_file", fail_transcribe_file)
+
+    r = await client.post(f"/api/v1/files/{file_id}/transcribe/async", json={"language": "en"})
+    assert r.status_code == 202, r.text
+    assert enqueued == [("transcribe_job", file_id, "en", "transcribe")]
+
+
+@pytest.mark.asyncio
+async def test_get_transcription_conditional_get(client, session_maker, make_file):
+    async with session_maker() as db:
+        f = await make_file(db, "etag.wav", FileType.AUDIO, mime_type="audio/wav")
+        t = Transcription(
+            file_id=f.id,
+            full_text="hello",
+            segments=[{"start": 0.0, "end": 1.0, "text": "hello"}],
+            status="completed",
+        )
+        db.add(t)
+        await db.commit()
+        file_id, transcription_id = f.id, t.id
+
+    r = await client.get(f"/api/v1/files/{file_id}/transcription")
+    assert r.status_code == 200, r.text
+    etag = r.headers["etag"]
+    assert r.headers["cache-control"] == "private, max-age=5"
+
+    r = await client.get(f"/api/v1/files/{file_id}/transcription", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+
+    r = await client.get(f"/api/v1/transcriptions/{transcription_id}", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_transcribe_returns_completed_transcription_without_rerun(client, session_maker, monkeypatch, make_file):
+    async with session_maker() as db:
+        f = await make_file(db, "done.mp3", FileType.AUDIO)
+        db.add(Transcription(file_id=f.id, full_text="already done", segments=[], status="completed"))
+        await db.commit()
+        file_id = f.id
+
+    async def fail_transcribe(*args, **kwargs):
+        raise AssertionError("completed transcription should be reused")
+
+    monkeypatch.setattr(TranscriptionService, "transcribe_file", fail_transcribe)
+
+    r = await client.post(f"/api/v1/files/{file_id}/transcribe")
+    assert r.status_code == 201, r.text
+    assert r.json()["full_text"] == "already done"
+
+
+@pytest.mark.asyncio
+async def test_transcription_timestamps_loaded_without_refresh(session_maker, make_file):
+    async with session_maker() as db:
+        f = await make_file(db, "eager.mp3", FileType.AUDIO)
+
+        t = Transcription(file_id=f.id, full_text="", status="processing")
+        db.add(t)
+        await db.commit()
+        # Server defaults came back with the INSERT; reading them issues no lazy load
+        assert t.id is not None
+        assert t.created_at is not None and t.updated_at is not None
+
+        t.status = "completed"
+        await db.commit()
+        assert t.updated_at is not None
+
+
+@pytest.mark.asyncio
+async def test_run_transcription_job_when_busy(app, session_maker, tmp_path, monkeypatch, make_file):
+    audio = tmp_path / "busy.mp3"
+    audio.write_bytes(b"ID3")
+    async with session_maker() as db:
+        f = await make_file(db, "busy.mp3", FileType.AUDIO, file_path=str(audio))
+        await db.commit()
+        file_id = f.id
+
+    async def fail_whisper(*args, **kwargs):
+        raise AssertionError("transcription should not run without a slot")
+
+    limiter = ConcurrencyLimiter(1, timeout=0.01, name="Transcription")
+    monkeypatch.setattr(TranscriptionService, "_limiter", limiter)
+    monkeypatch.setattr(TranscriptionService, "_transcribe_with_local_whisper", staticmethod(fail_whisper))
+    monkeypatch.setattr(TranscriptionService, "_transcribe_with_openai_api", staticmethod(fail_whisper))
+
+    # Worker jobs get the error back to reschedule, with the record left pending
+    async with limiter.slot():
+        with pytest.raises(ServiceBusyError):
+            await TranscriptionService.run_transcription_job(file_id, retry_when_busy=True)
+
+    async with session_maker() as db:
+        transcription = await TranscriptionService.get_transcription_by_file_id(file_id, db)
+    assert transcription.status == "pending"
+    assert transcription.error_message is None
+
+    # Background tasks have no retry, so the record is failed for the client to resubmit
+    async with limiter.slot():
+        await TranscriptionService.run_transcription_job(file_id)
+
+    async with session_maker() as db:
+        transcription = await TranscriptionService.get_transcription_by_file_id(file_id, db)
+    assert transcription.status == "failed"
+    assert "busy" in transcription.error_message
+
+
+@pytest.mark.asyncio
+async def test_get_file_with_transcription_returns_latest(session_maker, make_file):
+    now = datetime.now(timezone.utc)
+    async with session_maker() as db:
+        f = await make_file(db, "retranscribed.mp3", FileType.AUDIO)
+        db.add_all([
+            Transcription(file_id=f.id, full_text="old", status="failed", created_at=now - timedelta(hours=1)),
+            Transcription(file_id=f.id, full_text="new", status="completed", created_at=now),
+            Transcription(file_id=f.id, full_text="older", status="failed", created_at=now - timedelta(hours=2)),
+        ])
+        await db.commit()
+
+        file_metadata, transcription = await FileService.get_file_with_transcription(f.id, db)
+    assert file_metadata.id == f.id
+    assert transcription.full_text == "new"
@@ -0,0 +1,151 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.models.document_chunk import DocumentChunk
+from app.services.embedding_service import EmbeddingService
+from app.services.semantic_search_service import SemanticSearchService
+from app.services.vector_store import get_vector_store
+
+
+@pytest.mark.asyncio
+async def test_search_serializes_service_results(client, monkeypatch):
+    async def fake_search(*args, **kwargs):
+        return [
+            {
+                "chunk_id": 1,
+                "file_id": 2,
+                "chunk_index": 0,
+                "text": "Machine learning is...",
+                "score": 0.5,
+                "distance": np.float32(1.0),
+                "char_count": 22,
+                "page_number": None,
+            }
+        ]
+
+    monkeypatch.setattr(SemanticSearchService, "search", fake_search)
+
+    r = await client.post("/api/v1/search", json={"query": "machine learning"})
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert data["query"] == "machine learning"
+    assert data["total_results"] == 1
+    assert data["results"][0]["chunk_id"] == 1
+    assert data["results"][0]["distance"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_search_get_conditional_skips_search(client, monkeypatch):
+    calls = []
+
+    async def fake_search(*args, **kwargs):
+        calls.append(kwargs)
+        return []
+
+    monkeypatch.setattr(SemanticSearchService, "search", fake_search)
+    vector_store = get_vector_store()
+
+    r = await client.get("/api/v1/search", params={"query": "etag me", "top_k": 3})
+    assert r.status_code == 200, r.text
+    etag = r.headers["ETag"]
+    assert r.headers["Cache-Control"] == "private, no-cache"
+    assert len(calls) == 1
+
+    r = await client.get("/api/v1/search", params={"query": "etag me", "top_k": 3}, headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert len(calls) == 1
+
+    # Any index change invalidates cached results
+    vector_store._mark_changed()
+    r = await client.get("/api/v1/search", params={"query": "etag me", "top_k": 3}, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_search_get_etag_changes_when_file_is_deleted(client, session_maker, monkeypatch, make_file):
+    async with session_maker() as db:
+        f = await make_file(db, "etag-delete.pdf")
+        db.add(DocumentChunk(file_id=f.id, chunk_index=0, text="to be deleted", char_count=13))
+        await db.commit()
+        file_id = f.id
+
+    async def fake_search(*args, **kwargs):
+        return []
+
+    monkeypatch.setattr(SemanticSearchService, "search", fake_search)
+    params = {"query": "deleted", "file_id": file_id}
+
+    r = await client.get("/api/v1/search", params=params)
+    etag = r.headers["ETag"]
+
+    r = await client.delete(f"/api/v1/files/{file_id}")
+    assert r.status_code == 204, r.text
+
+    # The index never saw the delete, but the searched rows did change
+    r = await client.get("/api/v1/search", params=params, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_vector_store_status_conditional_get(client):
+    r = await client.get("/api/v1/vector-store/status")
+    assert r.status_code == 200, r.text
+    etag = r.headers["ETag"]
+
+    r = await client.get("/api/v1/vector-store/status", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+
+
+@pytest.mark.asyncio
+async def test_vector_store_status_etag_ignores_query_cache_counters(client, monkeypatch):
+    monkeypatch.setattr(EmbeddingService, "query_cache_stats", staticmethod(lambda: {"hits": 0}))
+    etag = (await client.get("/api/v1/vector-store/status")).headers["ETag"]
+
+    monkeypatch.setattr(EmbeddingService, "query_cache_stats", staticmethod(lambda: {"hits": 5}))
+    r = await client.get("/api/v1/vector-store/status", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+
+    get_vector_store()._mark_changed()
+    r = await client.get("/api/v1/vector-store/status", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.json()["query_cache"] == {"hits": 5}
+
+
+@pytest.mark.asyncio
+async def test_generate_embeddings_for_file_without_chunks_is_404(client):
+    r = await client.post("/api/v1/files/999999/embeddings")
+    assert r.status_code == 404
+    assert "No chunks found" in r.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_search_stream_returns_ndjson_lines(client, monkeypatch):
+    async def fake_search_iter(*args, **kwargs):
+        for idx in range(3):
+            yield {
+                "chunk_id": idx,
+                "file_id": 1,
+                "chunk_index": idx,
+                "text": f"hit {idx}",
+                "score": 1.0 / (1.0 + idx),
+                "distance": np.float32(idx),
+                "char_count": 5,
+                "page_number": None,
+            }
+
+    monkeypatch.setattr(SemanticSearchService, "search_iter", fake_search_iter)
+
+    r = await client.post("/api/v1/search/stream", json={"query": "stream me", "top_k": 3})
+    assert r.status_code == 200, r.text
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    assert "content-encoding" not in r.headers
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert lines[0] == {"query": "stream me"}
+    assert [line["chunk_id"] for line in lines[1:4]] == [0, 1, 2]
+    assert lines[-1] == {"total_results": 3}
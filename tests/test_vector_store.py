@@ -0,0 +1,181 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+from app.models.document_chunk import DocumentChunk
+from app.models.embedding import ChunkEmbedding
+from app.services import vector_store as vector_store_module
+from app.services.vector_store import VectorStore
+
+
+def test_small_store_uses_exact_index():
+    index = VectorStore._create_index(8, 100)
+    assert isinstance(index, faiss.IndexFlatL2)
+
+
+@pytest.mark.asyncio
+async def test_large_store_uses_trained_ivfpq(monkeypatch):
+    monkeypatch.setattr(vector_store_module.settings, "faiss_ivf_min_vectors", 500)
+    monkeypatch.setattr(vector_store_module.settings, "faiss_nlist", 8)
+    monkeypatch.setattr(vector_store_module.settings, "faiss_pq_m", 3)  # 16 % 3 != 0 -> falls back to 2
+    monkeypatch.setattr(vector_store_module.settings, "faiss_nprobe", 4)
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((1000, 16)).astype(np.float32)
+
+    store = VectorStore()
+    store.dimension = 16
+    store.index = VectorStore._create_index(16, len(vectors))
+    assert faiss.try_extract_index_ivf(store.index) is not None
+    assert not store.index.is_trained
+
+    store.index.train(vectors)
+    store._apply_search_params()
+    store.index.add(vectors)
+    store.chunk_id_map = {i: i + 1 for i in range(len(vectors))}
+
+    assert store.nprobe == 4
+    results = await store.search(vectors[10].tolist(), top_k=5)
+    assert 11 in [chunk_id for chunk_id, _ in results]
+
+
+def test_small_pq_store_trains_with_fewer_bits(monkeypatch):
+    monkeypatch.setattr(vector_store_module.settings, "faiss_ivf_min_vectors", 8)
+    monkeypatch.setattr(vector_store_module.settings, "faiss_nlist", 1)
+    monkeypatch.setattr(vector_store_module.settings, "faiss_pq_m", 4)
+
+    rng = np.random.default_rng(3)
+    vectors = rng.standard_normal((100, 16)).astype(np.float32)
+
+    # 100 points can't train 256 centroids; 6-bit codes (64 centroids) can
+    index = VectorStore._build_filled_index(vectors)
+    assert faiss.downcast_index(faiss.extract_index_ivf(index)).pq.nbits == 6
+    assert index.ntotal == 100
+
+    # Too few points for even 4-bit codes: stay exact
+    assert isinstance(VectorStore._create_index(16, 10), faiss.IndexFlatL2)
+
+
+def test_sq8_encoding_stores_one_byte_per_dimension(monkeypatch):
+    monkeypatch.setattr(vector_store_module.settings, "faiss_ivf_min_vectors", 500)
+    monkeypatch.setattr(vector_store_module.settings, "faiss_nlist", 4)
+    monkeypatch.setattr(vector_store_module.settings, "faiss_ivf_encoding", "sq8")
+
+    index = VectorStore._create_index(16, 1000)
+    assert faiss.try_extract_index_ivf(index) is not None
+    assert index.code_size == 16  # vs. 64 bytes as float32
+
+
+@pytest.mark.asyncio
+async def test_build_index_streams_rows_into_matrix(isolated_session_maker, monkeypatch, make_file):
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((5, 8)).astype(np.float32)
+
+    async with isolated_session_maker() as db:
+        f = await make_file(db, "build.pdf")
+        chunks = await DocumentChunk.bulk_create(db, [
+            {"file_id": f.id, "chunk_index": idx, "text": f"b {idx}", "char_count": 3}
+            for idx in range(len(vectors))
+        ])
+        await ChunkEmbedding.bulk_create(db, [
+            {"chunk_id": chunk.id, "embedding_model": "test", **ChunkEmbedding.pack_embedding_vector(vec)}
+            for chunk, vec in zip(chunks, vectors)
+        ])
+        # A later embedding of another dimension can't share the index and is skipped
+        [other_chunk] = await DocumentChunk.bulk_create(db, [
+            {"file_id": f.id, "chunk_index": len(vectors), "text": "other", "char_count": 5}
+        ])
+        await ChunkEmbedding.bulk_create(db, [
+            {"chunk_id": other_chunk.id, "embedding_model": "test", **ChunkEmbedding.pack_embedding_vector(np.ones(4, dtype=np.float32))}
+        ])
+        await db.commit()
+        chunk_ids = [c.id for c in chunks]
+
+    store = VectorStore()
+    monkeypatch.setattr(store, "save_index", lambda: None)
+    async with isolated_session_maker() as db:
+        await store.build_index(db)
+
+    assert store.dimension == 8
+    assert store.chunk_id_map == dict(enumerate(chunk_ids))
+    assert store.index.ntotal == len(vectors)
+    results = await store.search(vectors[2].tolist(), top_k=1)
+    assert results[0][0] == chunk_ids[2]
+
+
+@pytest.mark.asyncio
+async def test_mmapped_ivf_index_accepts_new_embeddings(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store_module.settings, "faiss_ivf_min_vectors", 500)
+    monkeypatch.setattr(vector_store_module.settings, "faiss_nlist", 4)
+    monkeypatch.setattr(vector_store_module.settings, "faiss_ivf_encoding", "sq8")
+    monkeypatch.setattr(vector_store_module.settings, "faiss_mmap", True)
+
+    rng = np.random.default_rng(2)
+    vectors = rng.standard_normal((600, 8)).astype(np.float32)
+
+    store = VectorStore()
+    store.index_path = tmp_path / "mmap.index"
+    store.dimension = 8
+    store.index = VectorStore._create_index(8, len(vectors))
+    store.index.train(vectors)
+    store.index.add(vectors)
+    store.chunk_id_map = {i: i + 1 for i in range(len(vectors))}
+    store.save_index()
+    assert not list(tmp_path.glob("*.tmp"))
+
+    loaded = VectorStore()
+    loaded.index_path = store.index_path
+    assert loaded.load_index()
+    assert loaded.is_mmapped
+    assert loaded.index.ntotal == len(vectors)
+    # Versions come from the saved file, so every worker loading it agrees
+    assert loaded.version == store.version
+
+    extra = rng.standard_normal((1, 8)).astype(np.float32) * 10
+    await loaded.add_embeddings([9999], extra)
+    assert not loaded.is_mmapped
+    assert loaded.version != store.version
+    assert loaded.index.ntotal == len(vectors) + 1
+    loaded.index.nprobe = 4
+    results = await loaded.search(extra[0].tolist(), top_k=1)
+    assert results[0][0] == 9999
+
+
+@pytest.mark.asyncio
+async def test_add_embeddings_waits_for_in_flight_search(monkeypatch, tmp_path):
+    store = VectorStore()
+    store.index_path = tmp_path / "lock.index"
+    await store.add_embeddings([1], np.ones((1, 4), dtype=np.float32))
+
+    search_started = asyncio.Event()
+    release_search = threading.Event()
+    original_search = store.index.search
+
+    def slow_search(*args):
+        release_search.wait(5)
+        return original_search(*args)
+
+    monkeypatch.setattr(store.index, "search", slow_search)
+
+    async def search():
+        search_started.set()
+        return await store.search([1.0] * 4, top_k=1)
+
+    search_task = asyncio.create_task(search())
+    await search_started.wait()
+    await asyncio.sleep(0.01)
+    add_task = asyncio.create_task(store.add_embeddings([2], np.zeros((1, 4), dtype=np.float32)))
+    await asyncio.sleep(0.01)
+
+    # The add is held back while the search thread is still reading the index
+    assert not add_task.done()
+    assert store.index.ntotal == 1
+
+    release_search.set()
+    assert await search_task == [(1, 0.0)]
+    await add_task
+    assert store.index.ntotal == 2